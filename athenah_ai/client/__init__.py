@@ -3,7 +3,13 @@
 
 
 import os
-from typing import Dict, Any, List
+import time
+import asyncio
+import threading
+from typing import AsyncIterator, Dict, Any, Hashable, Iterator, List, Tuple
+from weakref import WeakKeyDictionary
+
+from cachetools import LRUCache
 
 from dotenv import load_dotenv
 
@@ -13,8 +19,24 @@ from langchain_openai import ChatOpenAI
 from langchain_community.vectorstores import FAISS
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain import hub
-from athenah_ai.client.vector_store import VectorStore
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from athenah_ai.client.answer_cache import SemanticAnswerCache
+from athenah_ai.client.embedding_cache import CachedEmbeddings
+from athenah_ai.client.pool import (
+    get_async_http_client,
+    get_async_openai,
+    get_openai,
+)
+from athenah_ai.client.prompts import prompt_registry, RETRIEVAL_QA_CHAT
+from athenah_ai.client.tokenizer import count_tokens
+from athenah_ai.client.vector_store import (
+    VectorStore,
+    INDEX_LOAD_MODE,
+    count_chunks,
+    search_by_vectors,
+)
 from athenah_ai.logger import logger
 from langchain.agents import (
     AgentType,
@@ -27,7 +49,9 @@ load_dotenv()
 
 OPENAI_API_KEY: str = os.environ.get("OPENAI_API_KEY")
 openai.api_key = OPENAI_API_KEY
+OPENAI_BASE_URL: str = os.environ.get("OPENAI_BASE_URL")
 OPENAI_API_MODEL: str = "gpt-4o"
+OPENAI_MAX_CONCURRENCY: int = int(os.environ.get("OPENAI_MAX_CONCURRENCY", 8))
 MAX_TOKENS: int = 2000
 
 MODEL_MAP = {
@@ -37,13 +61,13 @@ MODEL_MAP = {
     "gpt-4": 8191,
 }
 
+# Assembled RAG chains keyed by client class, model settings and store.
+chain_cache: LRUCache = LRUCache(maxsize=32)
+chain_cache_lock = threading.Lock()
 
-def get_token_total(prompt: str) -> int:
-    import tiktoken
 
-    openai_model = OPENAI_API_MODEL
-    encoding = tiktoken.encoding_for_model(openai_model)
-    return len(encoding.encode(prompt))
+def get_token_total(prompt: str, model: str = None, estimate: bool = False) -> int:
+    return count_tokens(prompt, model or OPENAI_API_MODEL, estimate)
 
 
 class AthenahClient(VectorStore):
@@ -68,6 +92,8 @@ class AthenahClient(VectorStore):
         has_history (bool): Whether the client has chat history.
         chat_history (List[str]): The chat history of the client.
         db (FAISS): The FAISS vector store for document retrieval.
+        max_concurrency (int): The maximum number of in-flight async requests.
+        answer_cache (SemanticAnswerCache): The cache of answers to past prompts.
     """
 
     id: str = ""
@@ -86,6 +112,8 @@ class AthenahClient(VectorStore):
     has_history: bool = False
     chat_history: List[str] = []
     db: FAISS = None
+    max_concurrency: int = OPENAI_MAX_CONCURRENCY
+    answer_cache: SemanticAnswerCache = None
 
     def __init__(
         cls,
@@ -101,6 +129,9 @@ class AthenahClient(VectorStore):
         frequency_penalty: float = 0,
         presence_penalty: float = 0,
         stop: List[str] = [],
+        load_mode: str = INDEX_LOAD_MODE,
+        max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+        answer_cache: SemanticAnswerCache = None,
     ):
         """
         Initializes the AthenahClient.
@@ -120,6 +151,10 @@ class AthenahClient(VectorStore):
             presence_penalty (float): The presence penalty parameter for generating
             responses.
             stop (List[str]): The list of stop words for generating responses.
+            load_mode (str): How to load the index, "memory" or "mmap".
+            max_concurrency (int): The maximum number of in-flight async requests.
+            answer_cache (SemanticAnswerCache): Serve prompts similar to a past
+            prompt from this cache instead of the LLM, off when None.
         """
         cls.id = id
         cls.model_group = model_group
@@ -133,8 +168,16 @@ class AthenahClient(VectorStore):
         cls.frequency_penalty = frequency_penalty
         cls.presence_penalty = presence_penalty
         cls.stop = stop
+        cls.max_concurrency = max_concurrency
+        cls.answer_cache = answer_cache
+        cls.semaphores: "WeakKeyDictionary[Any, asyncio.Semaphore]" = (
+            WeakKeyDictionary()
+        )
 
-        super().__init__(storage_type="local" if model_group == "dist" else "gcs")
+        super().__init__(
+            storage_type="local" if model_group == "dist" else "gcs",
+            load_mode=load_mode,
+        )
 
         if cls.model_group and cls.custom_model:
             cls.db = cls.load(cls.custom_model, cls.model_group, cls.version)
@@ -152,15 +195,153 @@ class AthenahClient(VectorStore):
             str: The generated response.
         """
 
-        if MAX_TOKENS + get_token_total(prompt) > MODEL_MAP[cls.model_name]:
+        cls.select_model(prompt)
+        rag_chain = cls.get_rag_chain()
+        if cls.answer_cache is None:
+            return rag_chain.invoke({"input": prompt})["answer"]
+
+        key = cls.answer_cache_key()
+        vector = cls.db.embeddings.embed_query(prompt)
+        answer = cls.answer_cache.get(key, cls.db, vector)
+        if answer is not None:
+            return answer
+        start = time.perf_counter()
+        answer = rag_chain.invoke({"input": prompt})["answer"]
+        cls.answer_cache.put(
+            key, cls.db, vector, answer, time.perf_counter() - start
+        )
+        return answer
+
+    async def aprompt(cls, prompt: str) -> str:
+        """
+        Generates a response to the given prompt without blocking the event loop.
+
+        Args:
+            prompt (str): The prompt to generate a response to.
+
+        Returns:
+            str: The generated response.
+        """
+        cls.select_model(prompt)
+        rag_chain = cls.get_rag_chain(asynchronous=True)
+        if cls.answer_cache is None:
+            async with cls.get_semaphore():
+                response = await rag_chain.ainvoke({"input": prompt})
+            return response["answer"]
+
+        key = cls.answer_cache_key()
+        vector = await cls.db.embeddings.aembed_query(prompt)
+        answer = cls.answer_cache.get(key, cls.db, vector)
+        if answer is not None:
+            return answer
+        async with cls.get_semaphore():
+            start = time.perf_counter()
+            response = await rag_chain.ainvoke({"input": prompt})
+            latency = time.perf_counter() - start
+        cls.answer_cache.put(key, cls.db, vector, response["answer"], latency)
+        return response["answer"]
+
+    def stream_prompt(cls, prompt: str) -> Iterator[str]:
+        """
+        Generates a response to the given prompt, yielding tokens as they arrive.
+
+        A single completion is requested, whatever best_of is set to.
+
+        Args:
+            prompt (str): The prompt to generate a response to.
+
+        Yields:
+            str: The next piece of the response.
+        """
+        cls.select_model(prompt)
+        rag_chain = cls.get_rag_chain(n=1)
+        if cls.answer_cache is None:
+            for chunk in rag_chain.stream({"input": prompt}):
+                if "answer" in chunk:
+                    yield chunk["answer"]
+            return
+
+        key = cls.answer_cache_key()
+        vector = cls.db.embeddings.embed_query(prompt)
+        answer = cls.answer_cache.get(key, cls.db, vector)
+        if answer is not None:
+            yield answer
+            return
+        start = time.perf_counter()
+        pieces: List[str] = []
+        for chunk in rag_chain.stream({"input": prompt}):
+            if "answer" in chunk:
+                pieces.append(chunk["answer"])
+                yield chunk["answer"]
+        cls.answer_cache.put(
+            key, cls.db, vector, "".join(pieces), time.perf_counter() - start
+        )
+
+    async def astream_prompt(cls, prompt: str) -> AsyncIterator[str]:
+        """
+        Generates a response to the given prompt without blocking the event loop,
+        yielding tokens as they arrive.
+
+        Args:
+            prompt (str): The prompt to generate a response to.
+
+        Yields:
+            str: The next piece of the response.
+        """
+        cls.select_model(prompt)
+        rag_chain = cls.get_rag_chain(asynchronous=True, n=1)
+        key = vector = None
+        if cls.answer_cache is not None:
+            key = cls.answer_cache_key()
+            vector = await cls.db.embeddings.aembed_query(prompt)
+            answer = cls.answer_cache.get(key, cls.db, vector)
+            if answer is not None:
+                yield answer
+                return
+        pieces: List[str] = []
+        async with cls.get_semaphore():
+            start = time.perf_counter()
+            async for chunk in rag_chain.astream({"input": prompt}):
+                if "answer" in chunk:
+                    pieces.append(chunk["answer"])
+                    yield chunk["answer"]
+            latency = time.perf_counter() - start
+        if cls.answer_cache is not None:
+            cls.answer_cache.put(key, cls.db, vector, "".join(pieces), latency)
+
+    def answer_cache_key(cls) -> Hashable:
+        return (cls.model_group, cls.custom_model, cls.version, cls.model_name)
+
+    def select_model(cls, prompt: str):
+        if (
+            MAX_TOKENS + get_token_total(prompt, cls.model_name)
+            > MODEL_MAP[cls.model_name]
+        ):
             cls.model_name = "gpt-4o-mini"
 
-        cls.openai = ChatOpenAI(
+    def get_semaphore(cls) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = cls.semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(cls.max_concurrency)
+            cls.semaphores[loop] = semaphore
+        return semaphore
+
+    def get_llm(
+        cls,
+        model_name: str,
+        max_tokens: int,
+        asynchronous: bool = False,
+        n: int = None,
+    ) -> BaseChatModel:
+        return ChatOpenAI(
             openai_api_key=OPENAI_API_KEY,
-            model_name=cls.model_name,
+            openai_api_base=OPENAI_BASE_URL,
+            http_async_client=get_async_http_client() if asynchronous else None,
+            model_name=model_name,
             temperature=cls.temperature,
-            max_tokens=MAX_TOKENS + get_token_total(prompt),
-            n=cls.best_of,
+            max_tokens=max_tokens,
+            n=cls.best_of if n is None else n,
             # model_kwargs={
             #     "top_p": cls.top_p,
             #     "frequency_penalty": cls.frequency_penalty,
@@ -168,45 +349,141 @@ class AthenahClient(VectorStore):
             # },
         )
 
-        num_indexs = cls.db.index_to_docstore_id
-        logger.info(f"DB INDEXS: {len(num_indexs)}")
-        retriever = cls.db.as_retriever()
-        # similar_docs = cls.db.similarity_search_with_relevance_scores("ripple", k=3)
-        # print(similar_docs)
+    def get_rag_chain(cls, asynchronous: bool = False, n: int = None) -> Runnable:
+        """
+        Returns the retrieval chain for the client's model settings and store.
+
+        Args:
+            asynchronous (bool): Whether the chain will be awaited.
+            n (int): The number of completions to request, defaults to best_of.
+
+        Returns:
+            Runnable: The retrieval chain.
+        """
+        return cls.get_chains(asynchronous, n)[1]
+
+    def get_chains(
+        cls, asynchronous: bool = False, n: int = None
+    ) -> Tuple[Runnable, Runnable]:
+        """
+        Returns the question answering and retrieval chains for the client.
+
+        Chains are built once and shared between clients with the same model,
+        temperature, max tokens and store. Async chains run on the shared
+        connection pool of the running event loop and are cached per loop.
 
-        retrieval_qa_chat_prompt = hub.pull("langchain-ai/retrieval-qa-chat")
+        Args:
+            asynchronous (bool): Whether the chains will be awaited.
+            n (int): The number of completions to request, defaults to best_of.
+
+        Returns:
+            Tuple[Runnable, Runnable]: The question answering chain over given
+            documents and the retrieval chain wrapping it.
+        """
+        n = cls.best_of if n is None else n
+        key = (
+            type(cls),
+            cls.model_name,
+            cls.temperature,
+            MAX_TOKENS,
+            n,
+            id(cls.db),
+            asyncio.get_running_loop() if asynchronous else None,
+        )
+        with chain_cache_lock:
+            cached = chain_cache.get(key)
+        if cached is not None and cached[0] is cls.db:
+            cls.openai = cached[1]
+            return cached[2], cached[3]
+
+        logger.info(f"DB INDEXS: {count_chunks(cls.db)}")
+        cls.openai = cls.get_llm(cls.model_name, MAX_TOKENS, asynchronous, n)
+        retriever = cls.db.as_retriever()
         question_answer_chain = create_stuff_documents_chain(
-            cls.openai, retrieval_qa_chat_prompt
+            cls.openai, prompt_registry.get(RETRIEVAL_QA_CHAT)
         )
         rag_chain = create_retrieval_chain(retriever, question_answer_chain)
-        response = rag_chain.invoke({"input": prompt})
-        return response["answer"]
+        with chain_cache_lock:
+            chain_cache[key] = (cls.db, cls.openai, question_answer_chain, rag_chain)
+        return question_answer_chain, rag_chain
+
+    def retrieve_many(cls, queries: List[str], k: int = 4) -> List[List[Document]]:
+        """
+        Retrieves the top documents for many queries at once.
+
+        Queries missing from the query embedding cache are embedded in one
+        request and all of them are searched with a single matrix search.
+
+        Args:
+            queries (List[str]): The queries.
+            k (int): The number of documents to return per query.
+
+        Returns:
+            List[List[Document]]: The documents for each query, in query order.
+        """
+        if not queries:
+            return []
+        embedder = cls.db.embeddings
+        if isinstance(embedder, CachedEmbeddings):
+            vectors = embedder.embed_queries(queries)
+        else:
+            vectors = embedder.embed_documents(queries)
+        return [
+            [doc for doc, _ in docs]
+            for docs in search_by_vectors(cls.db, vectors, k)
+        ]
+
+    def prompt_many(cls, prompts: List[str], k: int = 4) -> List[str]:
+        """
+        Generates responses to many prompts with batched retrieval.
+
+        Contexts come from retrieve_many and generation fans out over at most
+        max_concurrency concurrent requests.
+
+        Args:
+            prompts (List[str]): The prompts.
+            k (int): The number of documents to retrieve per prompt.
+
+        Returns:
+            List[str]: The responses, in prompt order.
+        """
+        for prompt in prompts:
+            cls.select_model(prompt)
+        contexts = cls.retrieve_many(prompts, k)
+        question_answer_chain, _ = cls.get_chains()
+        return question_answer_chain.batch(
+            [
+                {"input": prompt, "context": context}
+                for prompt, context in zip(prompts, contexts)
+            ],
+            config={"max_concurrency": cls.max_concurrency},
+        )
 
-    def base_prompt(cls, system: str = None, prompt: str = None) -> str:
+    def base_prompt(
+        cls, system: str = None, prompt: str = None, n: int = None
+    ) -> str:
         """
         Generates a response to the given system and prompt.
 
         Args:
             system (str): The system message.
             prompt (str): The user prompt.
+            n (int): The number of completions to request, defaults to best_of.
+            Only the first is returned, so pass 1 to avoid paying for the rest.
 
         Returns:
             str: The generated response.
         """
         try:
-            messages: List[Dict[str, Any]] = []
-            if isinstance(system, str) and system != "":
-                messages.append({"role": "system", "content": system})
-            if isinstance(prompt, str) and prompt != "":
-                messages.append({"role": "user", "content": prompt})
-
-            response = openai.chat.completions.create(
+            messages = cls.base_messages(system, prompt)
+            client = get_openai(OPENAI_API_KEY, OPENAI_BASE_URL)
+            response = client.chat.completions.create(
                 model=cls.model_name,
                 messages=messages,
                 temperature=cls.temperature,
                 max_tokens=cls.max_tokens,
                 top_p=cls.top_p,
-                n=cls.best_of,
+                n=cls.best_of if n is None else n,
                 frequency_penalty=cls.frequency_penalty,
                 presence_penalty=cls.presence_penalty,
             )
@@ -215,13 +492,145 @@ class AthenahClient(VectorStore):
         except Exception as e:
             raise ValueError(f"failed to generate a prompt completion: {str(e)}")
 
+    async def abase_prompt(
+        cls, system: str = None, prompt: str = None, n: int = None
+    ) -> str:
+        """
+        Generates a response to the given system and prompt on the shared async
+        connection pool.
+
+        Args:
+            system (str): The system message.
+            prompt (str): The user prompt.
+            n (int): The number of completions to request, defaults to best_of.
+
+        Returns:
+            str: The generated response.
+        """
+        try:
+            messages = cls.base_messages(system, prompt)
+            client = get_async_openai(OPENAI_API_KEY, OPENAI_BASE_URL)
+            async with cls.get_semaphore():
+                response = await client.chat.completions.create(
+                    model=cls.model_name,
+                    messages=messages,
+                    temperature=cls.temperature,
+                    max_tokens=cls.max_tokens,
+                    top_p=cls.top_p,
+                    n=cls.best_of if n is None else n,
+                    frequency_penalty=cls.frequency_penalty,
+                    presence_penalty=cls.presence_penalty,
+                )
+            return response.choices[0].message.content
+        except Exception as e:
+            raise ValueError(f"failed to generate a prompt completion: {str(e)}")
+
+    def stream_base_prompt(
+        cls, system: str = None, prompt: str = None
+    ) -> Iterator[str]:
+        """
+        Generates a single completion to the given system and prompt, yielding
+        tokens as they arrive.
+
+        Args:
+            system (str): The system message.
+            prompt (str): The user prompt.
+
+        Yields:
+            str: The next piece of the response.
+        """
+        try:
+            messages = cls.base_messages(system, prompt)
+            client = get_openai(OPENAI_API_KEY, OPENAI_BASE_URL)
+            stream = client.chat.completions.create(
+                model=cls.model_name,
+                messages=messages,
+                temperature=cls.temperature,
+                max_tokens=cls.max_tokens,
+                top_p=cls.top_p,
+                n=1,
+                frequency_penalty=cls.frequency_penalty,
+                presence_penalty=cls.presence_penalty,
+                stream=True,
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise ValueError(f"failed to generate a prompt completion: {str(e)}")
+
+    async def astream_base_prompt(
+        cls, system: str = None, prompt: str = None
+    ) -> AsyncIterator[str]:
+        """
+        Generates a single completion to the given system and prompt on the
+        shared async connection pool, yielding tokens as they arrive.
+
+        Args:
+            system (str): The system message.
+            prompt (str): The user prompt.
+
+        Yields:
+            str: The next piece of the response.
+        """
+        try:
+            messages = cls.base_messages(system, prompt)
+            client = get_async_openai(OPENAI_API_KEY, OPENAI_BASE_URL)
+            async with cls.get_semaphore():
+                stream = await client.chat.completions.create(
+                    model=cls.model_name,
+                    messages=messages,
+                    temperature=cls.temperature,
+                    max_tokens=cls.max_tokens,
+                    top_p=cls.top_p,
+                    n=1,
+                    frequency_penalty=cls.frequency_penalty,
+                    presence_penalty=cls.presence_penalty,
+                    stream=True,
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise ValueError(f"failed to generate a prompt completion: {str(e)}")
+
+    async def abatch(cls, prompts: List[str], system: str = None) -> List[str]:
+        """
+        Generates responses to many prompts concurrently.
+
+        Prompts go through the retrieval chain when the client has an index and
+        through abase_prompt otherwise. At most max_concurrency requests are in
+        flight at once.
+
+        Args:
+            prompts (List[str]): The prompts.
+            system (str): The system message for abase_prompt.
+
+        Returns:
+            List[str]: The responses, in prompt order.
+        """
+        if cls.db is not None:
+            return await asyncio.gather(*[cls.aprompt(prompt) for prompt in prompts])
+        return await asyncio.gather(
+            *[cls.abase_prompt(system, prompt) for prompt in prompts]
+        )
+
+    @staticmethod
+    def base_messages(system: str = None, prompt: str = None) -> List[Dict[str, Any]]:
+        messages: List[Dict[str, Any]] = []
+        if isinstance(system, str) and system != "":
+            messages.append({"role": "system", "content": system})
+        if isinstance(prompt, str) and prompt != "":
+            messages.append({"role": "user", "content": prompt})
+        return messages
+
     def agent_prompt(cls, name: str, description: str, prompt: str):
         tools = []
         cls.openai = ChatOpenAI(
             openai_api_key=OPENAI_API_KEY,
             model_name=cls.model_name,
             temperature=cls.temperature,
-            max_tokens=MAX_TOKENS + get_token_total(prompt),
+            max_tokens=MAX_TOKENS + get_token_total(prompt, cls.model_name),
             n=cls.best_of,
         )
         chain = RetrievalQA.from_llm(
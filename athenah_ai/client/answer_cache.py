@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import time
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+from athenah_ai.logger import logger
+
+load_dotenv()
+
+ANSWER_CACHE_THRESHOLD: float = float(
+    os.environ.get("ANSWER_CACHE_THRESHOLD", 0.95)
+)
+ANSWER_CACHE_SIZE: int = int(os.environ.get("ANSWER_CACHE_SIZE", 1000))
+ANSWER_CACHE_TTL: float = float(os.environ.get("ANSWER_CACHE_TTL", 24 * 3600))
+ANSWER_CACHE_PARTITIONS: int = 64
+
+
+class AnswerPartition(object):
+    """
+    The past queries and answers for one (index name, version, model).
+
+    Query embeddings are L2-normalised in an inner product index, so search
+    scores are cosine similarities.
+    """
+
+    def __init__(cls, store: Any, dim: int) -> None:
+        cls.store = weakref.ref(store)
+        cls.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        cls.entries: "OrderedDict[int, Tuple[str, float, float]]" = OrderedDict()
+        cls.next_id = 0
+
+    def remove(cls, ids: List[int]) -> None:
+        for _id in ids:
+            cls.entries.pop(_id, None)
+        cls.index.remove_ids(np.array(ids, dtype=np.int64))
+
+
+class SemanticAnswerCache(object):
+    """
+    Returns stored answers for queries that paraphrase a past query.
+
+    A query hits when the cosine similarity of its embedding to a past query
+    of the same partition is at least ``threshold``. Partitions are dropped
+    when the store they were built against is replaced, entries expire after
+    ``ttl`` seconds and the least recently used entries are evicted past
+    ``max_entries`` per partition.
+
+    Attributes:
+        threshold (float): The minimum cosine similarity for a hit.
+        max_entries (int): The number of answers kept per partition.
+        ttl (float): Seconds after which an answer expires.
+        hits (int): The number of queries answered from the cache.
+        misses (int): The number of queries that went to the LLM.
+        saved_seconds (float): The generation time of the answers served.
+    """
+
+    threshold: float = ANSWER_CACHE_THRESHOLD
+    max_entries: int = ANSWER_CACHE_SIZE
+    ttl: float = ANSWER_CACHE_TTL
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    saved_seconds: float = 0.0
+
+    def __init__(
+        cls,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        max_entries: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_partitions: int = ANSWER_CACHE_PARTITIONS,
+    ) -> None:
+        cls.threshold = threshold
+        cls.max_entries = max_entries
+        cls.ttl = ttl
+        cls.max_partitions = max_partitions
+        cls.partitions: "OrderedDict[Hashable, AnswerPartition]" = OrderedDict()
+        cls.lock = threading.RLock()
+
+    @staticmethod
+    def normalize(vector: List[float]) -> np.ndarray:
+        matrix = np.array([vector], dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    def partition(
+        cls, key: Hashable, store: Any, dim: int = None
+    ) -> Optional[AnswerPartition]:
+        partition = cls.partitions.get(key)
+        if partition is not None and partition.store() is not store:
+            logger.info(f"ANSWER CACHE INVALIDATED: {key}")
+            del cls.partitions[key]
+            cls.invalidations += 1
+            partition = None
+        if partition is None and dim is not None:
+            partition = AnswerPartition(store, dim)
+            cls.partitions[key] = partition
+            while len(cls.partitions) > cls.max_partitions:
+                cls.partitions.popitem(last=False)
+        if partition is not None:
+            cls.partitions.move_to_end(key)
+        return partition
+
+    def get(cls, key: Hashable, store: Any, vector: List[float]) -> Optional[str]:
+        """
+        Returns the answer to the most similar past query, if similar enough.
+
+        Args:
+            key (Hashable): The partition, (index name, version, model).
+            store (Any): The store the answers were generated against.
+            vector (List[float]): The embedding of the query.
+
+        Returns:
+            Optional[str]: The stored answer, or None on a miss.
+        """
+        with cls.lock:
+            partition = cls.partition(key, store)
+            if partition is None or partition.index.ntotal == 0:
+                cls.misses += 1
+                return None
+            scores, ids = partition.index.search(cls.normalize(vector), 1)
+            _id = int(ids[0][0])
+            if _id == -1 or scores[0][0] < cls.threshold:
+                cls.misses += 1
+                return None
+            answer, latency, created = partition.entries[_id]
+            if time.time() - created > cls.ttl:
+                partition.remove([_id])
+                cls.misses += 1
+                return None
+            partition.entries.move_to_end(_id)
+            cls.hits += 1
+            cls.saved_seconds += latency
+            return answer
+
+    def put(
+        cls,
+        key: Hashable,
+        store: Any,
+        vector: List[float],
+        answer: str,
+        latency: float,
+    ) -> None:
+        """
+        Stores the answer to a query.
+
+        Args:
+            key (Hashable): The partition, (index name, version, model).
+            store (Any): The store the answer was generated against.
+            vector (List[float]): The embedding of the query.
+            answer (str): The generated answer.
+            latency (float): How long the answer took to generate, in seconds.
+        """
+        with cls.lock:
+            partition = cls.partition(key, store, len(vector))
+            _id = partition.next_id
+            partition.next_id += 1
+            partition.index.add_with_ids(
+                cls.normalize(vector), np.array([_id], dtype=np.int64)
+            )
+            partition.entries[_id] = (answer, latency, time.time())
+            excess = len(partition.entries) - cls.max_entries
+            if excess > 0:
+                partition.remove(list(partition.entries)[:excess])
+                cls.evictions += excess
+
+    def invalidate(cls, key: Hashable = None) -> None:
+        with cls.lock:
+            if key is None:
+                cls.invalidations += len(cls.partitions)
+                cls.partitions.clear()
+            elif cls.partitions.pop(key, None) is not None:
+                cls.invalidations += 1
+
+    def stats(cls) -> Dict[str, float]:
+        with cls.lock:
+            lookups = cls.hits + cls.misses
+            return {
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "hit_ratio": cls.hits / lookups if lookups else 0.0,
+                "saved_seconds": cls.saved_seconds,
+                "evictions": cls.evictions,
+                "invalidations": cls.invalidations,
+                "entries": sum(
+                    len(partition.entries) for partition in cls.partitions.values()
+                ),
+            }
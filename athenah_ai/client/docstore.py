@@ -0,0 +1,507 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+import mmap
+import fcntl
+import shutil
+import tempfile
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+import faiss
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+from athenah_ai.client.index_spec import (
+    INDEX_SPEC,
+    PARAMS_FILE,
+    apply_search_params,
+    build_index,
+    load_params,
+    search_params,
+    write_params,
+)
+
+DOCSTORE_DIR: str = "docstore"
+VECTORS_FILE: str = "vectors.f32"
+DOCSTORE_FORMAT: int = 1
+META_FILE: str = "meta.json"
+TEXTS_FILE: str = "texts.bin"
+TEXT_OFFSETS_FILE: str = "text_offsets.npy"
+IDS_FILE: str = "ids.npy"
+SOURCE_FILE: str = "source.npy"
+FILE_TYPE_FILE: str = "file_type.npy"
+CHUNK_INDEX_FILE: str = "chunk_index.npy"
+TOTAL_CHUNKS_FILE: str = "total_chunks.npy"
+EXTRA_FILE: str = "extra.bin"
+EXTRA_OFFSETS_FILE: str = "extra_offsets.npy"
+DOCSTORE_FILES: List[str] = [
+    META_FILE,
+    TEXTS_FILE,
+    TEXT_OFFSETS_FILE,
+    IDS_FILE,
+    SOURCE_FILE,
+    FILE_TYPE_FILE,
+    CHUNK_INDEX_FILE,
+    TOTAL_CHUNKS_FILE,
+    EXTRA_FILE,
+    EXTRA_OFFSETS_FILE,
+]
+# Readers of a saved store share it while they open the store files, a swap
+# holds it alone while it replaces them.
+STORE_LOCK_FILE: str = ".store.lock"
+COLUMNS: List[str] = ["source", "file_type", "chunk_index", "total_chunks"]
+MISSING: int = -1
+
+
+def to_int_id(_id: Any) -> int:
+    """
+    Parses a docstore id into the int64 the compact docstore stores.
+
+    Args:
+        _id (Any): The docstore id.
+
+    Returns:
+        int: The id as an int.
+    """
+    value = int(_id)
+    if value < 0 or value >= 2**63:
+        raise ValueError(f"id out of range: {_id}")
+    return value
+
+
+class CompactIdMap(Mapping):
+    """
+    Maps FAISS positions to docstore ids straight from the int id column.
+    """
+
+    def __init__(cls, ids: np.ndarray) -> None:
+        cls.ids = ids
+
+    def __getitem__(cls, index: int) -> str:
+        index = int(index)
+        if index < 0 or index >= len(cls.ids):
+            raise KeyError(index)
+        return str(cls.ids[index])
+
+    def __iter__(cls) -> Iterator[int]:
+        return iter(range(len(cls.ids)))
+
+    def __len__(cls) -> int:
+        return len(cls.ids)
+
+
+class CompactDocstoreWriter(object):
+    """
+    Streams documents into the compact docstore format.
+
+    Texts are appended to one blob addressed by an offset array, the known
+    metadata keys go to typed columns and anything else to a JSON side blob.
+    """
+
+    def __init__(cls, path: str) -> None:
+        cls.path = path
+        os.makedirs(path, exist_ok=True)
+        cls.texts = open(os.path.join(path, TEXTS_FILE), "wb")
+        cls.extra = open(os.path.join(path, EXTRA_FILE), "wb")
+        cls.text_offsets = array("Q", [0])
+        cls.extra_offsets = array("Q", [0])
+        cls.ids = array("q")
+        cls.source = array("i")
+        cls.file_type = array("i")
+        cls.chunk_index = array("i")
+        cls.total_chunks = array("i")
+        cls.sources: Dict[str, int] = {}
+        cls.file_types: Dict[str, int] = {}
+
+    def __enter__(cls) -> "CompactDocstoreWriter":
+        return cls
+
+    def __exit__(cls, *args: Any) -> None:
+        cls.close()
+
+    def __len__(cls) -> int:
+        return len(cls.ids)
+
+    @staticmethod
+    def code(table: Dict[str, int], value: Any) -> int:
+        if value is None:
+            return MISSING
+        return table.setdefault(str(value), len(table))
+
+    def add(cls, _id: Any, text: str, metadata: Dict[str, Any]) -> None:
+        data = text.encode("utf-8")
+        cls.texts.write(data)
+        cls.text_offsets.append(cls.text_offsets[-1] + len(data))
+        cls.ids.append(to_int_id(_id))
+        cls.source.append(cls.code(cls.sources, metadata.get("source")))
+        cls.file_type.append(cls.code(cls.file_types, metadata.get("file_type")))
+        chunk_index = metadata.get("chunk_index")
+        total_chunks = metadata.get("total_chunks")
+        cls.chunk_index.append(MISSING if chunk_index is None else chunk_index)
+        cls.total_chunks.append(MISSING if total_chunks is None else total_chunks)
+        extra = {k: v for k, v in metadata.items() if k not in COLUMNS}
+        data = json.dumps(extra).encode("utf-8") if extra else b""
+        cls.extra.write(data)
+        cls.extra_offsets.append(cls.extra_offsets[-1] + len(data))
+
+    def close(cls) -> None:
+        if cls.texts.closed:
+            return
+        cls.texts.close()
+        cls.extra.close()
+        columns = {
+            TEXT_OFFSETS_FILE: np.frombuffer(cls.text_offsets, dtype=np.uint64),
+            EXTRA_OFFSETS_FILE: np.frombuffer(cls.extra_offsets, dtype=np.uint64),
+            IDS_FILE: np.frombuffer(cls.ids, dtype=np.int64),
+            SOURCE_FILE: np.frombuffer(cls.source, dtype=np.int32),
+            FILE_TYPE_FILE: np.frombuffer(cls.file_type, dtype=np.int32),
+            CHUNK_INDEX_FILE: np.frombuffer(cls.chunk_index, dtype=np.int32),
+            TOTAL_CHUNKS_FILE: np.frombuffer(cls.total_chunks, dtype=np.int32),
+        }
+        for name, column in columns.items():
+            np.save(os.path.join(cls.path, name), column)
+        meta = {
+            "format": DOCSTORE_FORMAT,
+            "count": len(cls.ids),
+            "sources": list(cls.sources),
+            "file_types": list(cls.file_types),
+        }
+        with open(os.path.join(cls.path, META_FILE), "w") as meta_file:
+            json.dump(meta, meta_file)
+
+
+class CompactDocstore(Docstore):
+    """
+    A read-only docstore over the compact on-disk format.
+
+    Lookups decode only the requested ids. With ``mmap=True`` the columns and
+    text blob are memory-mapped, otherwise they are read into memory as flat
+    arrays rather than one Document object per chunk.
+    """
+
+    def __init__(cls, path: str, mmap: bool = True) -> None:
+        cls.path = path
+        with open(os.path.join(path, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        if meta["format"] != DOCSTORE_FORMAT:
+            raise ValueError(f"unsupported docstore format: {meta['format']}")
+        cls.sources: List[str] = meta["sources"]
+        cls.file_types: List[str] = meta["file_types"]
+        mmap_mode = "r" if mmap else None
+
+        def column(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        cls.ids = column(IDS_FILE)
+        cls.text_offsets = column(TEXT_OFFSETS_FILE)
+        cls.extra_offsets = column(EXTRA_OFFSETS_FILE)
+        cls.source = column(SOURCE_FILE)
+        cls.file_type = column(FILE_TYPE_FILE)
+        cls.chunk_index = column(CHUNK_INDEX_FILE)
+        cls.total_chunks = column(TOTAL_CHUNKS_FILE)
+        cls.texts = cls.read_blob(TEXTS_FILE, mmap)
+        cls.extra = cls.read_blob(EXTRA_FILE, mmap)
+        cls.order: np.ndarray = None
+
+    def read_blob(cls, name: str, use_mmap: bool) -> Union[bytes, mmap.mmap]:
+        with open(os.path.join(cls.path, name), "rb") as blob:
+            if not use_mmap:
+                return blob.read()
+            if os.fstat(blob.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(blob.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(cls) -> int:
+        return len(cls.ids)
+
+    def row(cls, _id: Any) -> int:
+        try:
+            value = to_int_id(_id)
+        except (TypeError, ValueError):
+            return MISSING
+        if cls.order is None:
+            cls.order = np.argsort(cls.ids, kind="stable")
+        position = int(np.searchsorted(cls.ids, value, sorter=cls.order))
+        if position < len(cls.order) and cls.ids[cls.order[position]] == value:
+            return int(cls.order[position])
+        return MISSING
+
+    def document(cls, row: int) -> Document:
+        start, end = int(cls.text_offsets[row]), int(cls.text_offsets[row + 1])
+        page_content = cls.texts[start:end].decode("utf-8")
+        metadata: Dict[str, Any] = {}
+        if cls.source[row] != MISSING:
+            metadata["source"] = cls.sources[cls.source[row]]
+        if cls.file_type[row] != MISSING:
+            metadata["file_type"] = cls.file_types[cls.file_type[row]]
+        if cls.chunk_index[row] != MISSING:
+            metadata["chunk_index"] = int(cls.chunk_index[row])
+        if cls.total_chunks[row] != MISSING:
+            metadata["total_chunks"] = int(cls.total_chunks[row])
+        start, end = int(cls.extra_offsets[row]), int(cls.extra_offsets[row + 1])
+        if end > start:
+            metadata.update(json.loads(cls.extra[start:end]))
+        return Document(page_content=page_content, metadata=metadata)
+
+    def search(cls, search: str) -> Union[str, Document]:
+        row = cls.row(search)
+        if row == MISSING:
+            return f"ID {search} not found."
+        return cls.document(row)
+
+    def to_memory(cls) -> Tuple[InMemoryDocstore, Dict[int, str]]:
+        """
+        Materialises every document so the store can be modified.
+
+        Returns:
+            Tuple[InMemoryDocstore, Dict[int, str]]: The docstore and its id map.
+        """
+        docs: Dict[str, Document] = {}
+        index_to_docstore_id: Dict[int, str] = {}
+        for row in range(len(cls)):
+            _id = str(cls.ids[row])
+            docs[_id] = cls.document(row)
+            index_to_docstore_id[row] = _id
+        return InMemoryDocstore(docs), index_to_docstore_id
+
+
+def write_docstore(
+    path: str, docstore: Docstore, index_to_docstore_id: Dict[int, str]
+) -> str:
+    """
+    Writes a docstore in FAISS index order in the compact format.
+
+    Ids that are not ints (such as the uuids FAISS assigns by default) are
+    replaced by their FAISS position.
+
+    Args:
+        path (str): The directory of the saved index.
+        docstore (Docstore): The docstore to write.
+        index_to_docstore_id (Dict[int, str]): The FAISS position to id map.
+
+    Returns:
+        str: The directory the docstore was written to.
+    """
+    docstore_path = os.path.join(path, DOCSTORE_DIR)
+    ids = [index_to_docstore_id[row] for row in range(len(index_to_docstore_id))]
+    try:
+        int_ids = [to_int_id(_id) for _id in ids]
+    except (TypeError, ValueError):
+        int_ids = list(range(len(ids)))
+    with CompactDocstoreWriter(docstore_path) as writer:
+        for _id, int_id in zip(ids, int_ids):
+            doc = docstore.search(_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"could not find document for id {_id}")
+            writer.add(int_id, doc.page_content, doc.metadata)
+    return docstore_path
+
+
+def has_docstore(path: str) -> bool:
+    return os.path.exists(os.path.join(path, DOCSTORE_DIR, META_FILE))
+
+
+def load_docstore(
+    path: str, mmap: bool = True
+) -> Tuple[CompactDocstore, CompactIdMap]:
+    docstore = CompactDocstore(os.path.join(path, DOCSTORE_DIR), mmap=mmap)
+    return docstore, CompactIdMap(docstore.ids)
+
+
+@contextmanager
+def store_lock(path: str, shared: bool = True) -> Iterator[None]:
+    """
+    Holds the lock of a saved store, across processes.
+
+    Args:
+        path (str): The directory of the saved index.
+        shared (bool): Whether to share the lock with other readers, rather
+        than hold it alone to replace the store.
+    """
+    if not shared:
+        os.makedirs(path, exist_ok=True)
+    try:
+        lock_file = open(os.path.join(path, STORE_LOCK_FILE), "a+b")
+    except OSError:
+        # A store that cannot be written to cannot be swapped either.
+        if not shared:
+            raise
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def load_mutable_store(path: str, embedding: Embeddings) -> FAISS:
+    """
+    Loads a saved store with an in-memory docstore so it can be modified.
+
+    Args:
+        path (str): The directory of the saved index.
+        embedding (Embeddings): The embedder for documents added later.
+
+    Returns:
+        FAISS: The store.
+    """
+    with store_lock(path):
+        index = faiss.read_index(os.path.join(path, "index.faiss"))
+        apply_search_params(index, load_params(path))
+        docstore = load_docstore(path, mmap=True)[0]
+    docstore, index_to_docstore_id = docstore.to_memory()
+    return FAISS(embedding, index, docstore, index_to_docstore_id)
+
+
+def swap_store(tmp_path: str, path: str) -> None:
+    """
+    Moves a store written to ``tmp_path`` into ``path``.
+
+    The index, search parameters and docstore are replaced one after another
+    while the store lock is held alone. Readers that take the lock, as
+    store loaders do, open either the old store or the new one, never a mix
+    of both. Readers that already opened the old files keep reading them.
+
+    Args:
+        tmp_path (str): The directory the store was written to.
+        path (str): The directory of the saved index.
+    """
+    docstore_path = os.path.join(path, DOCSTORE_DIR)
+    old_path = f"{tmp_path}.old"
+    with store_lock(path, shared=False):
+        os.replace(
+            os.path.join(tmp_path, "index.faiss"), os.path.join(path, "index.faiss")
+        )
+        if os.path.exists(os.path.join(tmp_path, PARAMS_FILE)):
+            os.replace(
+                os.path.join(tmp_path, PARAMS_FILE), os.path.join(path, PARAMS_FILE)
+            )
+        elif os.path.exists(os.path.join(path, PARAMS_FILE)):
+            os.remove(os.path.join(path, PARAMS_FILE))
+        if os.path.exists(docstore_path):
+            os.rename(docstore_path, old_path)
+        os.rename(os.path.join(tmp_path, DOCSTORE_DIR), docstore_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    legacy_path = os.path.join(path, "index.pkl")
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+
+
+def temp_store_path(path: str) -> str:
+    os.makedirs(path, exist_ok=True)
+    return tempfile.mkdtemp(prefix=".store-", dir=path)
+
+
+def save_store(
+    path: str,
+    index: Any,
+    docstore: Docstore,
+    index_to_docstore_id: Dict[int, str],
+    spec: str = None,
+) -> None:
+    """
+    Saves a FAISS index with its docstore in the compact format.
+
+    Args:
+        path (str): The directory to save to.
+        index (Any): The FAISS index.
+        docstore (Docstore): The docstore.
+        index_to_docstore_id (Dict[int, str]): The FAISS position to id map.
+        spec (str): The index factory spec the index was built from, if any.
+    """
+    tmp_path = temp_store_path(path)
+    try:
+        faiss.write_index(index, os.path.join(tmp_path, "index.faiss"))
+        write_params(tmp_path, spec, search_params(index))
+        write_docstore(tmp_path, docstore, index_to_docstore_id)
+        swap_store(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+class StoreWriter(object):
+    """
+    Streams embedded chunks into a saved store without holding them in memory.
+
+    With the ``Flat`` spec, vectors go straight to a flat L2 index, as
+    FAISS.from_texts builds. Other index factory specs need training, so the
+    vectors are spooled to a file and the index is trained on a sample of
+    them on close. Documents go to a CompactDocstoreWriter. The store, with
+    its search parameters, replaces the one in ``path`` on close, or is
+    discarded if the block raised.
+    """
+
+    def __init__(cls, path: str, spec: str = INDEX_SPEC) -> None:
+        cls.path = path
+        cls.spec = spec
+        cls.tmp_path = temp_store_path(path)
+        cls.writer = CompactDocstoreWriter(os.path.join(cls.tmp_path, DOCSTORE_DIR))
+        cls.index: Any = None
+        cls.vectors: Any = None
+        cls.dim = 0
+
+    def __enter__(cls) -> "StoreWriter":
+        return cls
+
+    def __exit__(cls, exc_type: Any, *args: Any) -> None:
+        if exc_type is None:
+            cls.close()
+        else:
+            cls.writer.close()
+            if cls.vectors is not None:
+                cls.vectors.close()
+            shutil.rmtree(cls.tmp_path, ignore_errors=True)
+
+    def __len__(cls) -> int:
+        return len(cls.writer)
+
+    def add(
+        cls,
+        vectors: List[List[float]],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+    ) -> None:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if cls.spec == "Flat":
+            if cls.index is None:
+                cls.index = faiss.IndexFlatL2(matrix.shape[1])
+            cls.index.add(matrix)
+        else:
+            if cls.vectors is None:
+                cls.vectors = open(os.path.join(cls.tmp_path, VECTORS_FILE), "wb")
+                cls.dim = matrix.shape[1]
+            cls.vectors.write(matrix.tobytes())
+        for _id, text, metadata in zip(ids, texts, metadatas):
+            cls.writer.add(_id, text, metadata)
+
+    def close(cls) -> None:
+        cls.writer.close()
+        try:
+            if cls.vectors is not None:
+                cls.vectors.close()
+                vectors_path = os.path.join(cls.tmp_path, VECTORS_FILE)
+                vectors = np.memmap(vectors_path, dtype=np.float32, mode="r")
+                cls.index = build_index(cls.spec, vectors.reshape(-1, cls.dim))
+                del vectors
+                os.remove(vectors_path)
+            if cls.index is None:
+                raise ValueError("no documents to index")
+            faiss.write_index(cls.index, os.path.join(cls.tmp_path, "index.faiss"))
+            write_params(cls.tmp_path, cls.spec, search_params(cls.index))
+            swap_store(cls.tmp_path, cls.path)
+        finally:
+            shutil.rmtree(cls.tmp_path, ignore_errors=True)
@@ -0,0 +1,573 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import re
+import json
+import time
+import fcntl
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from hashlib import blake2b
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from langchain_core.embeddings import Embeddings
+
+from athenah_ai.logger import logger
+
+load_dotenv()
+
+QUERY_CACHE_SIZE: int = int(os.environ.get("QUERY_CACHE_SIZE", 10000))
+QUERY_CACHE_TTL: float = float(os.environ.get("QUERY_CACHE_TTL", 7 * 24 * 3600))
+QUERY_CACHE_DIR: str = os.environ.get("QUERY_CACHE_DIR")
+QUERY_CACHE_DISK_BYTES: int = int(
+    os.environ.get("QUERY_CACHE_DISK_BYTES", 256 * 1024**2)
+)
+
+# The document embedding cache is off unless a directory is set.
+EMBEDDING_CACHE_DIR: str = os.environ.get("EMBEDDING_CACHE_DIR", "")
+EMBEDDING_CACHE_BYTES: int = int(
+    os.environ.get("EMBEDDING_CACHE_BYTES", 256 * 1024**2)
+)
+
+KEY_BYTES: int = 16
+DISK_CACHE_FORMAT: int = 2
+EVICT_FRACTION: float = 0.05
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalises a query so trivially different spellings share a cache entry.
+
+    Args:
+        text (str): The query.
+
+    Returns:
+        str: The NFC-normalised text with whitespace collapsed.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def embedding_key(model: str, text: str) -> bytes:
+    return blake2b(
+        f"{model}\0{text}".encode("utf-8"), digest_size=KEY_BYTES
+    ).digest()
+
+
+class DiskVectorCache(object):
+    """
+    A fixed-capacity vector cache in memory-mapped files.
+
+    ``vectors.f32`` holds the vectors, ``keys.bin`` the key hash of each slot,
+    ``times.f64`` when each slot was written and last read, and ``gens.u64``
+    the generation that last changed each slot. A process that changes slots
+    bumps ``generation``, and the others update their hash to slot index
+    from the slots changed since the generation they last saw, instead of
+    rebuilding it. Every access holds an exclusive lock on ``lock``, so
+    several processes can share one cache. When the cache is full the least
+    recently used slots are evicted in bulk.
+
+    Attributes:
+        path (str): The directory of the cache files.
+        max_bytes (int): The size cap of the cache files.
+        ttl (float): Seconds after which an entry expires.
+    """
+
+    def __init__(cls, path: str, max_bytes: int, ttl: float = None) -> None:
+        cls.path = path
+        cls.max_bytes = max_bytes
+        cls.ttl = ttl
+        cls.dim: int = None
+        cls.capacity: int = 0
+        cls.generation: int = None
+        cls.index: Dict[bytes, int] = {}
+        cls.slot_keys: Dict[int, bytes] = {}
+        cls.free: Set[int] = set()
+        cls.thread_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        cls.lock_file = open(os.path.join(path, "lock"), "a+b")
+        cls.generation_path = os.path.join(path, "generation")
+
+    @contextmanager
+    def locked(cls) -> Iterator[None]:
+        with cls.thread_lock:
+            fcntl.flock(cls.lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                cls.sync()
+                yield
+            finally:
+                fcntl.flock(cls.lock_file.fileno(), fcntl.LOCK_UN)
+
+    def read_generation(cls) -> int:
+        try:
+            with open(cls.generation_path, "rb") as file:
+                return int.from_bytes(file.read(8), "little")
+        except FileNotFoundError:
+            return 0
+
+    def bump(cls, slots: List[int]) -> None:
+        cls.generation = cls.read_generation() + 1
+        if slots:
+            cls.gens[np.asarray(slots)] = cls.generation
+        with open(cls.generation_path, "wb") as file:
+            file.write(cls.generation.to_bytes(8, "little"))
+
+    def sync(cls) -> None:
+        if cls.dim is None:
+            header_path = os.path.join(cls.path, "header.json")
+            if not os.path.exists(header_path):
+                return
+            with open(header_path) as header:
+                meta = json.load(header)
+            if meta.get("format") != DISK_CACHE_FORMAT:
+                cls.create(meta["dim"])
+                return
+            cls.open(meta["dim"], meta["capacity"], "r+")
+        generation = cls.read_generation()
+        if generation != cls.generation:
+            if cls.generation is None or generation < cls.generation:
+                cls.reindex()
+            else:
+                cls.update(cls.generation)
+            cls.generation = generation
+
+    def open(cls, dim: int, capacity: int, mode: str) -> None:
+        cls.dim = dim
+        cls.capacity = capacity
+        cls.vectors = np.memmap(
+            os.path.join(cls.path, "vectors.f32"),
+            dtype=np.float32,
+            mode=mode,
+            shape=(capacity, dim),
+        )
+        cls.keys = np.memmap(
+            os.path.join(cls.path, "keys.bin"),
+            dtype=np.uint8,
+            mode=mode,
+            shape=(capacity, KEY_BYTES),
+        )
+        cls.times = np.memmap(
+            os.path.join(cls.path, "times.f64"),
+            dtype=np.float64,
+            mode=mode,
+            shape=(capacity, 2),
+        )
+        cls.gens = np.memmap(
+            os.path.join(cls.path, "gens.u64"),
+            dtype=np.uint64,
+            mode=mode,
+            shape=(capacity,),
+        )
+        if mode == "w+":
+            with open(os.path.join(cls.path, "header.json"), "w") as header:
+                json.dump(
+                    {"dim": dim, "capacity": capacity, "format": DISK_CACHE_FORMAT},
+                    header,
+                )
+        cls.generation = None
+
+    def reindex(cls) -> None:
+        occupied = cls.times[:, 0] > 0
+        keys = cls.keys.tobytes()
+        cls.slot_keys = {
+            int(slot): keys[slot * KEY_BYTES : (slot + 1) * KEY_BYTES]
+            for slot in np.flatnonzero(occupied)
+        }
+        cls.index = {key: slot for slot, key in cls.slot_keys.items()}
+        cls.free = set(np.flatnonzero(~occupied).tolist())
+
+    def update(cls, since: int) -> None:
+        """
+        Applies the slots other processes changed after a generation.
+
+        Args:
+            since (int): The generation the index is current with.
+        """
+        for slot in np.flatnonzero(cls.gens > since).tolist():
+            key = cls.slot_keys.pop(slot, None)
+            if key is not None and cls.index.get(key) == slot:
+                del cls.index[key]
+            if cls.times[slot, 0] > 0:
+                key = cls.keys[slot].tobytes()
+                cls.index[key] = slot
+                cls.slot_keys[slot] = key
+                cls.free.discard(slot)
+            else:
+                cls.free.add(slot)
+
+    def create(cls, dim: int) -> None:
+        capacity = max(cls.max_bytes // (dim * 4 + KEY_BYTES + 24), 1)
+        logger.info(f"CREATING VECTOR CACHE: {cls.path} ({capacity} slots)")
+        cls.open(dim, capacity, "w+")
+        cls.reindex()
+        cls.bump([])
+
+    def expired(cls, slot: int, now: float) -> bool:
+        return cls.ttl is not None and now - cls.times[slot, 0] > cls.ttl
+
+    def release(cls, slot: int) -> None:
+        key = cls.slot_keys.pop(slot, None)
+        if key is not None and cls.index.get(key) == slot:
+            del cls.index[key]
+        cls.times[slot] = 0
+        cls.free.add(slot)
+
+    def get(cls, key: bytes) -> Optional[np.ndarray]:
+        return cls.get_many([key])[0]
+
+    def get_many(cls, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        """
+        Looks up many keys under one lock.
+
+        Args:
+            keys (List[bytes]): The key hashes.
+
+        Returns:
+            List[Optional[np.ndarray]]: The vector of each key, or None.
+        """
+        vectors: List[Optional[np.ndarray]] = []
+        with cls.locked():
+            now = time.time()
+            released: List[int] = []
+            for key in keys:
+                slot = cls.index.get(key)
+                if slot is not None and cls.expired(slot, now):
+                    cls.release(slot)
+                    released.append(slot)
+                    slot = None
+                if slot is None:
+                    vectors.append(None)
+                    continue
+                cls.times[slot, 1] = now
+                vectors.append(np.array(cls.vectors[slot]))
+            if released:
+                cls.bump(released)
+        return vectors
+
+    def evict(cls) -> List[int]:
+        count = max(int(cls.capacity * EVICT_FRACTION), 1)
+        victims = np.argpartition(cls.times[:, 1], count - 1)[:count].tolist()
+        for slot in victims:
+            cls.release(slot)
+        return victims
+
+    def put(cls, key: bytes, vector: np.ndarray) -> None:
+        cls.put_many([key], [vector])
+
+    def put_many(cls, keys: List[bytes], vectors: List[np.ndarray]) -> None:
+        """
+        Stores many vectors under one lock.
+
+        Args:
+            keys (List[bytes]): The key hashes.
+            vectors (List[np.ndarray]): The vector of each key.
+        """
+        if not keys:
+            return
+        with cls.locked():
+            now = time.time()
+            changed: List[int] = []
+            for key, vector in zip(keys, vectors):
+                vector = np.asarray(vector, dtype=np.float32)
+                if cls.dim is None:
+                    cls.create(len(vector))
+                if len(vector) != cls.dim:
+                    raise ValueError(
+                        f"expected {cls.dim} dimensions, got {len(vector)}"
+                    )
+                slot = cls.index.get(key)
+                if slot is None:
+                    if not cls.free:
+                        changed.extend(cls.evict())
+                    slot = cls.free.pop()
+                cls.vectors[slot] = vector
+                cls.keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                cls.times[slot] = (now, now)
+                cls.index[key] = slot
+                cls.slot_keys[slot] = key
+                changed.append(slot)
+            cls.bump(changed)
+
+    def __len__(cls) -> int:
+        with cls.locked():
+            return len(cls.index)
+
+    def flush(cls) -> None:
+        with cls.locked():
+            if cls.dim is not None:
+                cls.vectors.flush()
+                cls.keys.flush()
+                cls.times.flush()
+                cls.gens.flush()
+
+
+class EmbeddingCache(object):
+    """
+    A two-level cache of embeddings keyed by (embedding model, text hash).
+
+    The first level is an in-process LRU, the optional second level one
+    DiskVectorCache per model under ``disk_dir``. Both levels expire entries
+    after ``ttl`` seconds.
+
+    Attributes:
+        max_entries (int): The size of the in-process LRU.
+        ttl (float): Seconds after which an entry expires.
+        disk_dir (str): The directory of the disk layer, or None to disable it.
+        disk_bytes (int): The size cap of the disk layer per model.
+    """
+
+    def __init__(
+        cls,
+        max_entries: int = QUERY_CACHE_SIZE,
+        ttl: float = QUERY_CACHE_TTL,
+        disk_dir: str = QUERY_CACHE_DIR,
+        disk_bytes: int = QUERY_CACHE_DISK_BYTES,
+    ) -> None:
+        cls.max_entries = max_entries
+        cls.ttl = ttl
+        cls.disk_dir = disk_dir
+        cls.disk_bytes = disk_bytes
+        cls.memory: "OrderedDict[bytes, Tuple[List[float], float]]" = OrderedDict()
+        cls.disks: Dict[str, DiskVectorCache] = {}
+        cls.lock = threading.RLock()
+        cls.memory_hits = 0
+        cls.disk_hits = 0
+        cls.misses = 0
+
+    def disk(cls, model: str) -> Optional[DiskVectorCache]:
+        if not cls.disk_dir:
+            return None
+        if model not in cls.disks:
+            cls.disks[model] = DiskVectorCache(
+                os.path.join(cls.disk_dir, re.sub(r"[^\w.-]", "_", model)),
+                cls.disk_bytes,
+                cls.ttl,
+            )
+        return cls.disks[model]
+
+    def get(cls, model: str, text: str) -> Optional[List[float]]:
+        key = embedding_key(model, text)
+        with cls.lock:
+            entry = cls.memory.get(key)
+            if entry is not None:
+                if time.time() - entry[1] <= cls.ttl:
+                    cls.memory.move_to_end(key)
+                    cls.memory_hits += 1
+                    return entry[0]
+                del cls.memory[key]
+            disk = cls.disk(model)
+            vector = disk.get(key) if disk is not None else None
+            if vector is not None:
+                cls.disk_hits += 1
+                cls.remember(key, vector.tolist())
+                return cls.memory[key][0]
+            cls.misses += 1
+            return None
+
+    def put(cls, model: str, text: str, vector: List[float]) -> None:
+        key = embedding_key(model, text)
+        with cls.lock:
+            cls.remember(key, list(vector))
+            disk = cls.disk(model)
+            if disk is not None:
+                disk.put(key, vector)
+
+    def remember(cls, key: bytes, vector: List[float]) -> None:
+        cls.memory[key] = (vector, time.time())
+        cls.memory.move_to_end(key)
+        while len(cls.memory) > cls.max_entries:
+            cls.memory.popitem(last=False)
+
+    def clear(cls) -> None:
+        with cls.lock:
+            cls.memory.clear()
+
+    def flush(cls) -> None:
+        with cls.lock:
+            for disk in cls.disks.values():
+                disk.flush()
+
+    def stats(cls) -> Dict[str, float]:
+        with cls.lock:
+            hits = cls.memory_hits + cls.disk_hits
+            lookups = hits + cls.misses
+            return {
+                "memory_hits": cls.memory_hits,
+                "disk_hits": cls.disk_hits,
+                "misses": cls.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(cls.memory),
+                "disk_entries": sum(len(disk) for disk in cls.disks.values()),
+            }
+
+
+query_embedding_cache: EmbeddingCache = EmbeddingCache()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so query embeddings are served from a cache.
+
+    Documents are passed straight through, only queries are cached.
+    """
+
+    def __init__(
+        cls,
+        embeddings: Embeddings,
+        model: str,
+        cache: EmbeddingCache = query_embedding_cache,
+    ) -> None:
+        cls.embeddings = embeddings
+        cls.model = model
+        cls.cache = cache
+
+    def embed_documents(cls, texts: List[str]) -> List[List[float]]:
+        return cls.embeddings.embed_documents(texts)
+
+    async def aembed_documents(cls, texts: List[str]) -> List[List[float]]:
+        return await cls.embeddings.aembed_documents(texts)
+
+    def embed_query(cls, text: str) -> List[float]:
+        return cls.embed_queries([text])[0]
+
+    def embed_queries(cls, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds many queries, sending only the cache misses in one request.
+
+        Args:
+            texts (List[str]): The queries.
+
+        Returns:
+            List[List[float]]: The embeddings, in query order.
+        """
+        texts = [normalize_text(text) for text in texts]
+        vectors = [cls.cache.get(cls.model, text) for text in texts]
+        misses = list(
+            dict.fromkeys(
+                text for text, vector in zip(texts, vectors) if vector is None
+            )
+        )
+        if misses:
+            embedded = dict(zip(misses, cls.embeddings.embed_documents(misses)))
+            for text, vector in embedded.items():
+                cls.cache.put(cls.model, text, vector)
+            vectors = [
+                embedded[text] if vector is None else vector
+                for text, vector in zip(texts, vectors)
+            ]
+        return vectors
+
+    async def aembed_query(cls, text: str) -> List[float]:
+        text = normalize_text(text)
+        vector = cls.cache.get(cls.model, text)
+        if vector is None:
+            vector = await cls.embeddings.aembed_query(text)
+            cls.cache.put(cls.model, text, vector)
+        return vector
+
+
+class DocumentEmbeddingCache(object):
+    """
+    A persistent cache of document embeddings keyed by (embedding model, exact
+    text hash), shared by index builds across versions, repos and processes.
+
+    Attributes:
+        path (str): The directory of the cache, one DiskVectorCache per model.
+        max_bytes (int): The size cap of the cache per model.
+        hits (int): The number of embeddings served from the cache.
+        misses (int): The number of lookups not in the cache.
+        chars_saved (int): The characters of the texts served from the cache.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    chars_saved: int = 0
+
+    def __init__(
+        cls, path: str = EMBEDDING_CACHE_DIR, max_bytes: int = EMBEDDING_CACHE_BYTES
+    ) -> None:
+        cls.path = path
+        cls.max_bytes = max_bytes
+        cls.disks: Dict[str, DiskVectorCache] = {}
+        cls.lock = threading.Lock()
+
+    def disk(cls, model: str) -> DiskVectorCache:
+        with cls.lock:
+            if model not in cls.disks:
+                cls.disks[model] = DiskVectorCache(
+                    os.path.join(cls.path, re.sub(r"[^\w.-]", "_", model)),
+                    cls.max_bytes,
+                )
+            return cls.disks[model]
+
+    def get_many(cls, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        keys = [embedding_key(model, text) for text in texts]
+        vectors = cls.disk(model).get_many(keys)
+        hit_texts = [text for text, vector in zip(texts, vectors) if vector is not None]
+        with cls.lock:
+            cls.hits += len(hit_texts)
+            cls.misses += len(texts) - len(hit_texts)
+            cls.chars_saved += sum(len(text) for text in hit_texts)
+        return [None if vector is None else vector.tolist() for vector in vectors]
+
+    def put_many(
+        cls, model: str, texts: List[str], vectors: List[List[float]]
+    ) -> None:
+        keys = [embedding_key(model, text) for text in texts]
+        cls.disk(model).put_many(keys, vectors)
+
+    def stats(cls) -> Dict[str, int]:
+        with cls.lock:
+            return {
+                "embeddings_saved": cls.hits,
+                "misses": cls.misses,
+                "chars_saved": cls.chars_saved,
+            }
+
+
+document_embedding_cache: DocumentEmbeddingCache = DocumentEmbeddingCache()
+
+
+class CachedDocumentEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so document embeddings are served from a
+    DocumentEmbeddingCache and only the misses reach the backend.
+    """
+
+    def __init__(
+        cls,
+        embeddings: Embeddings,
+        model: str,
+        cache: DocumentEmbeddingCache = document_embedding_cache,
+    ) -> None:
+        cls.embeddings = embeddings
+        cls.model = model
+        cls.cache = cache
+
+    def embed_documents(cls, texts: List[str]) -> List[List[float]]:
+        vectors = cls.cache.get_many(cls.model, texts)
+        misses = list(
+            dict.fromkeys(
+                text for text, vector in zip(texts, vectors) if vector is None
+            )
+        )
+        logger.info(
+            f"EMBEDDINGS: {len(texts)} texts, {len(misses)} to embed, "
+            f"cache {cls.cache.stats()}"
+        )
+        if not misses:
+            return vectors
+        embedded = dict(zip(misses, cls.embeddings.embed_documents(misses)))
+        cls.cache.put_many(cls.model, list(embedded), list(embedded.values()))
+        return [
+            embedded[text] if vector is None else vector
+            for text, vector in zip(texts, vectors)
+        ]
+
+    def embed_query(cls, text: str) -> List[float]:
+        return cls.embeddings.embed_query(text)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+from athenah_ai.logger import logger
+
+load_dotenv()
+
+INDEX_SPEC: str = os.environ.get("INDEX_SPEC", "Flat")
+INDEX_NPROBE: int = int(os.environ.get("INDEX_NPROBE", 16))
+INDEX_EF_SEARCH: int = int(os.environ.get("INDEX_EF_SEARCH", 64))
+INDEX_TRAIN_SIZE: int = int(os.environ.get("INDEX_TRAIN_SIZE", 50000))
+PARAMS_FILE: str = "index.params.json"
+ADD_BLOCK_SIZE: int = 65536
+
+
+def find_hnsw(index: Any) -> Optional[Any]:
+    """
+    Returns the HNSW index inside an index, looking through pre-transforms
+    such as OPQ.
+
+    Args:
+        index (Any): The FAISS index.
+
+    Returns:
+        Optional[Any]: The HNSW index, or None.
+    """
+    index = faiss.downcast_index(index)
+    while isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    return index if isinstance(index, faiss.IndexHNSW) else None
+
+
+def supports_removal(index: Any) -> bool:
+    """
+    Returns whether chunks can be removed from an index, as incremental builds
+    do. Flat, PQ, scalar quantizer and IVF indexes can remove ids, graph
+    indexes such as HNSW cannot.
+
+    Args:
+        index (Any): The FAISS index.
+
+    Returns:
+        bool: Whether the index implements remove_ids.
+    """
+    # The downcast views do not own the index, so it is kept referenced.
+    inner = faiss.downcast_index(index)
+    while isinstance(
+        inner, (faiss.IndexPreTransform, faiss.IndexIDMap, faiss.IndexIDMap2)
+    ):
+        inner = faiss.downcast_index(inner.index)
+    return (
+        isinstance(inner, faiss.IndexFlatCodes)
+        or faiss.try_extract_index_ivf(inner) is not None
+    )
+
+
+def search_params(
+    index: Any, nprobe: int = INDEX_NPROBE, ef_search: int = INDEX_EF_SEARCH
+) -> Dict[str, int]:
+    """
+    Returns the search parameters that apply to an index.
+
+    Args:
+        index (Any): The FAISS index.
+        nprobe (int): The number of IVF lists to visit.
+        ef_search (int): The HNSW search queue length.
+
+    Returns:
+        Dict[str, int]: The parameters, empty for exact indexes.
+    """
+    params: Dict[str, int] = {}
+    if faiss.try_extract_index_ivf(index) is not None:
+        params["nprobe"] = nprobe
+    if find_hnsw(index) is not None:
+        params["efSearch"] = ef_search
+    return params
+
+
+def apply_search_params(index: Any, params: Dict[str, int]) -> None:
+    if params:
+        faiss.ParameterSpace().set_index_parameters(
+            index, ",".join(f"{name}={value}" for name, value in params.items())
+        )
+
+
+def build_index(
+    spec: str, vectors: np.ndarray, train_size: int = INDEX_TRAIN_SIZE
+) -> Any:
+    """
+    Builds an index from a FAISS factory spec such as ``Flat``, ``IVF1024,Flat``,
+    ``IVF1024,PQ32``, ``HNSW32`` or ``OPQ32,IVF1024,PQ32`` and adds the vectors.
+
+    Specs that need training are trained on a random sample of at most
+    ``train_size`` vectors. When there are too few vectors to train the spec,
+    a flat index is built instead.
+
+    Args:
+        spec (str): The index factory spec.
+        vectors (np.ndarray): The float32 vectors, possibly memory mapped.
+        train_size (int): The maximum number of training vectors.
+
+    Returns:
+        Any: The index, with the vectors added in order.
+    """
+    dim = vectors.shape[1]
+    index = faiss.index_factory(dim, spec)
+    if not index.is_trained:
+        size = min(train_size, len(vectors))
+        rng = np.random.default_rng(0)
+        rows = np.sort(rng.choice(len(vectors), size, replace=False))
+        try:
+            index.train(np.ascontiguousarray(vectors[rows]))
+        except RuntimeError as e:
+            logger.info(f"INDEX SPEC {spec} NOT TRAINED, USING Flat: {e}")
+            index = faiss.IndexFlatL2(dim)
+    for start in range(0, len(vectors), ADD_BLOCK_SIZE):
+        index.add(np.ascontiguousarray(vectors[start : start + ADD_BLOCK_SIZE]))
+    return index
+
+
+def write_params(path: str, spec: str, params: Dict[str, int]) -> None:
+    with open(os.path.join(path, PARAMS_FILE), "w") as file:
+        json.dump({"spec": spec, "params": params}, file)
+
+
+def load_params(path: str) -> Dict[str, int]:
+    """
+    Reads the search parameters saved with an index.
+
+    Args:
+        path (str): The directory of the saved index.
+
+    Returns:
+        Dict[str, int]: The parameters, empty if none were saved.
+    """
+    params_path = os.path.join(path, PARAMS_FILE)
+    if not os.path.exists(params_path):
+        return {}
+    with open(params_path) as file:
+        return json.load(file)["params"]
+
+
+def load_spec(path: str) -> str:
+    """
+    Reads the index factory spec an index was built from.
+
+    Args:
+        path (str): The directory of the saved index.
+
+    Returns:
+        str: The spec, or None if the index was not built from one.
+    """
+    params_path = os.path.join(path, PARAMS_FILE)
+    if not os.path.exists(params_path):
+        return None
+    with open(params_path) as file:
+        return json.load(file)["spec"]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import asyncio
+import threading
+from typing import Dict, Tuple
+from weakref import WeakKeyDictionary
+
+import httpx
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_MAX_CONNECTIONS: int = int(os.environ.get("OPENAI_MAX_CONNECTIONS", 100))
+OPENAI_MAX_KEEPALIVE: int = int(os.environ.get("OPENAI_MAX_KEEPALIVE", 20))
+OPENAI_TIMEOUT: float = float(os.environ.get("OPENAI_TIMEOUT", 600))
+
+# httpx async pools are bound to the event loop they first run on, so the
+# shared pool and the OpenAI clients on top of it are kept per loop.
+http_clients: "WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    WeakKeyDictionary()
+)
+openai_clients: (
+    "WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, openai.AsyncOpenAI]]"
+) = WeakKeyDictionary()
+openai_sync_clients: Dict[Tuple, openai.OpenAI] = {}
+lock = threading.Lock()
+
+
+def get_openai(api_key: str = None, base_url: str = None) -> openai.OpenAI:
+    """
+    Returns a pooled OpenAI client shared by all threads of the process.
+
+    Args:
+        api_key (str): The OpenAI API key.
+        base_url (str): The API base URL, defaults to the OpenAI API.
+
+    Returns:
+        openai.OpenAI: The client.
+    """
+    key = (api_key, base_url)
+    with lock:
+        client = openai_sync_clients.get(key)
+        if client is None:
+            client = openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                    ),
+                    timeout=OPENAI_TIMEOUT,
+                ),
+            )
+            openai_sync_clients[key] = client
+        return client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Returns the HTTP connection pool shared by all clients on the running loop.
+
+    Returns:
+        httpx.AsyncClient: The pooled HTTP client.
+    """
+    loop = asyncio.get_running_loop()
+    with lock:
+        http_client = http_clients.get(loop)
+        if http_client is None or http_client.is_closed:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                ),
+                timeout=OPENAI_TIMEOUT,
+            )
+            http_clients[loop] = http_client
+        return http_client
+
+
+def get_async_openai(api_key: str = None, base_url: str = None) -> openai.AsyncOpenAI:
+    """
+    Returns an async OpenAI client on the shared pool of the running loop.
+
+    Args:
+        api_key (str): The OpenAI API key.
+        base_url (str): The API base URL, defaults to the OpenAI API.
+
+    Returns:
+        openai.AsyncOpenAI: The async client.
+    """
+    loop = asyncio.get_running_loop()
+    http_client = get_async_http_client()
+    key = (api_key, base_url)
+    with lock:
+        clients = openai_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = openai.AsyncOpenAI(
+                api_key=api_key, base_url=base_url, http_client=http_client
+            )
+            clients[key] = client
+        return client
+
+
+async def close_async_pool() -> None:
+    """
+    Closes the shared pool of the running loop.
+    """
+    loop = asyncio.get_running_loop()
+    with lock:
+        http_client = http_clients.pop(loop, None)
+        openai_clients.pop(loop, None)
+    if http_client is not None:
+        await http_client.aclose()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import threading
+from typing import Dict, Set
+
+from dotenv import load_dotenv
+
+from langchain_core.prompts import (
+    BasePromptTemplate,
+    ChatPromptTemplate,
+    MessagesPlaceholder,
+)
+
+from athenah_ai.logger import logger
+
+load_dotenv()
+
+PROMPT_HUB_REFRESH: bool = os.environ.get("PROMPT_HUB_REFRESH", "").lower() in (
+    "1",
+    "true",
+)
+
+RETRIEVAL_QA_CHAT: str = "langchain-ai/retrieval-qa-chat"
+
+# Vendored copy of the hub prompt so the hot path never hits the network.
+VENDORED_PROMPTS: Dict[str, BasePromptTemplate] = {
+    RETRIEVAL_QA_CHAT: ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                "Answer any use questions based solely on the context below:"
+                "\n\n<context>\n{context}\n</context>",
+            ),
+            MessagesPlaceholder("chat_history", optional=True),
+            ("human", "{input}"),
+        ]
+    ),
+}
+
+
+class PromptRegistry(object):
+    """
+    A registry of prompt templates shipped with the package.
+
+    When ``refresh`` is set, each template is pulled from the LangChain hub
+    once per process and the vendored copy is kept if the pull fails.
+
+    Attributes:
+        refresh (bool): Whether to refresh templates from the hub on first use.
+        templates (Dict[str, BasePromptTemplate]): The registered templates.
+    """
+
+    refresh: bool = PROMPT_HUB_REFRESH
+
+    def __init__(cls, refresh: bool = PROMPT_HUB_REFRESH) -> None:
+        cls.refresh = refresh
+        cls.templates: Dict[str, BasePromptTemplate] = dict(VENDORED_PROMPTS)
+        cls.refreshed: Set[str] = set()
+        cls.lock = threading.Lock()
+
+    def register(cls, name: str, template: BasePromptTemplate) -> None:
+        with cls.lock:
+            cls.templates[name] = template
+            cls.refreshed.add(name)
+
+    def get(cls, name: str) -> BasePromptTemplate:
+        """
+        Returns a registered template, refreshing it from the hub at most once.
+
+        Args:
+            name (str): The hub handle of the template.
+
+        Returns:
+            BasePromptTemplate: The prompt template.
+        """
+        if cls.refresh and name not in cls.refreshed:
+            cls.pull(name)
+        if name not in cls.templates:
+            raise ValueError(f"unknown prompt template: {name}")
+        return cls.templates[name]
+
+    def pull(cls, name: str) -> None:
+        with cls.lock:
+            if name in cls.refreshed:
+                return
+            cls.refreshed.add(name)
+            try:
+                from langchain import hub
+
+                cls.templates[name] = hub.pull(name)
+                logger.info(f"PROMPT REFRESHED: {name}")
+            except Exception as e:
+                logger.info(f"PROMPT REFRESH FAILED: {name} - {e}")
+
+
+prompt_registry: PromptRegistry = PromptRegistry()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+import time
+import base64
+import fcntl
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+import google_crc32c
+from dotenv import load_dotenv
+
+from google.api_core.exceptions import NotFound
+from google.cloud.storage.blob import Blob
+from google.cloud.storage.bucket import Bucket
+
+from athenah_ai.libs.google.transfer import GCS_TRANSFER_WORKERS, download_files
+from athenah_ai.logger import logger
+
+load_dotenv()
+
+REMOTE_CACHE_BYTES: int = int(os.environ.get("REMOTE_CACHE_BYTES", 20 * 1024**3))
+# Seconds a revalidated copy is used without asking the bucket again.
+REMOTE_CACHE_TTL: float = float(os.environ.get("REMOTE_CACHE_TTL", 60))
+REMOTE_CACHE_DIR: str = ".remote"
+
+
+def describe(blob: Blob) -> Dict[str, Any]:
+    return {"generation": blob.generation, "etag": blob.etag, "size": blob.size}
+
+
+def file_crc32c(path: str) -> str:
+    """
+    Checksums a file as GCS reports it, base64 of the big-endian CRC32C.
+
+    Args:
+        path (str): The file.
+
+    Returns:
+        str: The checksum.
+    """
+    checksum = google_crc32c.Checksum()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            checksum.update(block)
+    return base64.b64encode(checksum.digest()).decode("ascii")
+
+
+class RemoteIndex(object):
+    """
+    The objects of one index version in the bucket, listed once, and the
+    local copy they are fetched into.
+
+    Attributes:
+        path (str): The local directory of the index version.
+        listing (Dict[str, Blob]): The objects under the prefix, by name
+        relative to it.
+        objects (Dict[str, Dict[str, Any]]): The generation, etag and size
+        of each local file when it was fetched.
+        used (Set[str]): The files this sync fetched or kept.
+        downloaded (List[str]): The files this sync downloaded.
+    """
+
+    def __init__(
+        cls,
+        bucket: Bucket,
+        prefix: str,
+        path: str,
+        listing: Dict[str, Blob],
+        objects: Dict[str, Dict[str, Any]],
+        workers: int = GCS_TRANSFER_WORKERS,
+    ) -> None:
+        cls.bucket = bucket
+        cls.prefix = prefix
+        cls.path = path
+        cls.listing = listing
+        cls.objects = dict(objects)
+        cls.workers = workers
+        cls.used: Set[str] = set()
+        cls.downloaded: List[str] = []
+
+    def __contains__(cls, name: str) -> bool:
+        return name in cls.listing
+
+    def local(cls, name: str) -> str:
+        return os.path.join(cls.path, *name.split("/"))
+
+    def fresh(cls, name: str) -> bool:
+        blob = cls.listing[name]
+        path = cls.local(name)
+        if not os.path.exists(path):
+            return False
+        recorded = cls.objects.get(name)
+        if recorded and recorded["generation"] == blob.generation:
+            return True
+        # A copy saved or downloaded before it was recorded is kept if it has
+        # the same content.
+        crc32c = getattr(blob, "crc32c", None)
+        if crc32c and os.path.getsize(path) == blob.size:
+            if file_crc32c(path) == crc32c:
+                cls.objects[name] = describe(blob)
+                return True
+        return False
+
+    def fetch(cls, names: List[str]) -> List[str]:
+        """
+        Downloads the objects whose generation changed since they were
+        fetched, in parallel.
+
+        Args:
+            names (List[str]): The object names, relative to the prefix.
+
+        Returns:
+            List[str]: The names that were downloaded.
+
+        Raises:
+            NotFound: If an object is not in the listing.
+        """
+        for name in names:
+            if name not in cls.listing:
+                raise NotFound(f"gs://{cls.bucket.name}/{cls.prefix}/{name}")
+        cls.used.update(names)
+        stale = [name for name in names if not cls.fresh(name)]
+        blobs = download_files(
+            cls.bucket,
+            [(f"{cls.prefix}/{name}", cls.local(name)) for name in stale],
+            cls.workers,
+        )
+        for name, blob in zip(stale, blobs):
+            cls.objects[name] = describe(blob)
+        cls.downloaded.extend(stale)
+        return stale
+
+    def keep(cls, names: List[str]) -> None:
+        """
+        Keeps local files that were derived from fetched objects.
+
+        Args:
+            names (List[str]): The file names, relative to the index version.
+        """
+        cls.used.update(names)
+
+
+class RemoteIndexCache(object):
+    """
+    A disk cache of index versions downloaded from a bucket.
+
+    The generation, etag and size of every fetched object is recorded in a
+    manifest under ``.remote``, outside the index directory so that writing
+    it does not change the store fingerprint. A sync lists the objects of
+    the version in one request and downloads only the ones whose generation
+    changed; for ``ttl`` seconds after that the local copy is used without
+    asking. Index versions the cache downloaded are evicted whole, least
+    recently used first, once they exceed ``max_bytes``. Directories that
+    existed before their first sync, such as an indexer's output, are
+    revalidated but never evicted.
+
+    Attributes:
+        root (str): The directory the index versions are saved in.
+        max_bytes (int): The disk quota of the downloaded index versions.
+        ttl (float): Seconds a revalidated copy is trusted.
+        hits (int): The syncs served without a request.
+        revalidations (int): The syncs that found the copy unchanged.
+        downloads (int): The syncs that downloaded objects.
+        evictions (int): The index versions evicted.
+    """
+
+    def __init__(
+        cls,
+        root: str,
+        max_bytes: int = REMOTE_CACHE_BYTES,
+        ttl: float = REMOTE_CACHE_TTL,
+    ) -> None:
+        cls.root = root
+        cls.max_bytes = max_bytes
+        cls.ttl = ttl
+        cls.hits = 0
+        cls.revalidations = 0
+        cls.downloads = 0
+        cls.evictions = 0
+        cls.meta_path = os.path.join(root, REMOTE_CACHE_DIR)
+        cls.lock = threading.Lock()
+
+    def manifest_path(cls, key: str) -> str:
+        return os.path.join(cls.meta_path, f"{key}.json")
+
+    def read_manifest(cls, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(cls.manifest_path(key)) as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_manifest(cls, key: str, manifest: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(prefix=".manifest-", dir=cls.meta_path)
+        with os.fdopen(fd, "w") as file:
+            json.dump(manifest, file)
+        os.replace(tmp_path, cls.manifest_path(key))
+
+    @contextmanager
+    def locked(cls, key: str, blocking: bool = True) -> Iterator[bool]:
+        os.makedirs(cls.meta_path, exist_ok=True)
+        with open(os.path.join(cls.meta_path, f"{key}.lock"), "a+b") as lock_file:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file.fileno(), flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def sync(
+        cls,
+        bucket: Bucket,
+        name: str,
+        version: str,
+        download: Callable[[RemoteIndex], None],
+    ) -> str:
+        """
+        Brings the local copy of an index version up to date with the bucket.
+
+        Args:
+            bucket (Bucket): The index bucket.
+            name (str): The index name.
+            version (str): The index version.
+            download (Callable[[RemoteIndex], None]): Fetches the objects the
+            index needs.
+
+        Returns:
+            str: The local directory of the index version.
+
+        Raises:
+            NotFound: If the bucket has no objects for the version.
+        """
+        key = f"{name}-{version}"
+        path = os.path.join(cls.root, key)
+        prefix = f"{name}/{version}"
+        with cls.locked(key):
+            manifest = cls.read_manifest(key)
+            now = time.time()
+            if (
+                manifest is not None
+                and os.path.isdir(path)
+                and now - manifest["validated"] < cls.ttl
+            ):
+                manifest["used"] = now
+                cls.write_manifest(key, manifest)
+                with cls.lock:
+                    cls.hits += 1
+                logger.info(
+                    f"REMOTE CACHE HIT: {prefix} "
+                    f"validated {now - manifest['validated']:.1f}s ago"
+                )
+                return path
+
+            start = time.perf_counter()
+            listing = {
+                blob.name[len(prefix) + 1 :]: blob
+                for blob in bucket.list_blobs(prefix=f"{prefix}/")
+                if ".parts/" not in blob.name and not blob.name.endswith("/")
+            }
+            if not listing:
+                raise NotFound(f"gs://{bucket.name}/{prefix}")
+
+            owned = manifest["owned"] if manifest else not os.path.isdir(path)
+            remote = RemoteIndex(
+                bucket, prefix, path, listing, manifest["objects"] if manifest else {}
+            )
+            download(remote)
+            for stale in set(remote.objects) - remote.used:
+                del remote.objects[stale]
+                if os.path.exists(remote.local(stale)):
+                    os.remove(remote.local(stale))
+            cls.write_manifest(
+                key,
+                {
+                    "objects": remote.objects,
+                    "validated": now,
+                    "used": now,
+                    "owned": owned,
+                },
+            )
+            elapsed = time.perf_counter() - start
+            if remote.downloaded:
+                size = sum(remote.objects[name]["size"] for name in remote.downloaded)
+                with cls.lock:
+                    cls.downloads += 1
+                logger.info(
+                    f"REMOTE CACHE DOWNLOAD: {prefix} {len(remote.downloaded)} of "
+                    f"{len(remote.used)} files, {size / 1e6:.1f} MB in {elapsed:.2f}s"
+                )
+            else:
+                with cls.lock:
+                    cls.revalidations += 1
+                logger.info(
+                    f"REMOTE CACHE REVALIDATED: {prefix} unchanged "
+                    f"in {elapsed * 1000:.0f}ms"
+                )
+        cls.evict(keep=key)
+        return path
+
+    def evict(cls, keep: str = None) -> None:
+        """
+        Removes the least recently used downloaded index versions until the
+        rest fit in the quota. Versions being synced are skipped.
+
+        Args:
+            keep (str): A version never to evict.
+        """
+        if not os.path.isdir(cls.meta_path):
+            return
+        entries = []
+        for file_name in os.listdir(cls.meta_path):
+            if not file_name.endswith(".json"):
+                continue
+            key = file_name[: -len(".json")]
+            manifest = cls.read_manifest(key)
+            if manifest is None or not manifest["owned"]:
+                continue
+            size = sum(meta["size"] or 0 for meta in manifest["objects"].values())
+            entries.append((manifest["used"], key, size))
+        total = sum(size for _, _, size in entries)
+        for used, key, size in sorted(entries):
+            if total <= cls.max_bytes:
+                break
+            if key == keep:
+                continue
+            with cls.locked(key, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                shutil.rmtree(os.path.join(cls.root, key), ignore_errors=True)
+                os.remove(cls.manifest_path(key))
+            total -= size
+            with cls.lock:
+                cls.evictions += 1
+            logger.info(
+                f"REMOTE CACHE EVICT: {key} {size / 1e6:.1f} MB, "
+                f"unused for {time.time() - used:.0f}s"
+            )
+
+    def stats(cls) -> Dict[str, int]:
+        with cls.lock:
+            return {
+                "hits": cls.hits,
+                "revalidations": cls.revalidations,
+                "downloads": cls.downloads,
+                "evictions": cls.evictions,
+                "max_bytes": cls.max_bytes,
+            }
+
+
+remote_caches: Dict[str, RemoteIndexCache] = {}
+remote_caches_lock = threading.Lock()
+
+
+def get_remote_cache(root: str) -> RemoteIndexCache:
+    """
+    Returns the process-wide remote index cache of a directory.
+
+    Args:
+        root (str): The directory the index versions are saved in.
+
+    Returns:
+        RemoteIndexCache: The cache.
+    """
+    with remote_caches_lock:
+        if root not in remote_caches:
+            remote_caches[root] = RemoteIndexCache(root)
+        return remote_caches[root]
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from athenah_ai.client.docstore import STORE_LOCK_FILE
+from athenah_ai.logger import logger
+
+load_dotenv()
+
+STORE_CACHE_BYTES: int = int(os.environ.get("STORE_CACHE_BYTES", 2 * 1024**3))
+
+Fingerprint = Tuple[Tuple[str, int, int], ...]
+
+
+def store_fingerprint(path: str) -> Optional[Fingerprint]:
+    """
+    Fingerprints the files of a saved store by (relative path, mtime, size).
+
+    Args:
+        path (str): The directory the store was saved to.
+
+    Returns:
+        Optional[Fingerprint]: The fingerprint, or None if the path does not exist.
+    """
+    if not os.path.isdir(path):
+        return None
+    entries = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            # The lock file is created by the first reader, not by a save.
+            if name == STORE_LOCK_FILE:
+                continue
+            file_path = os.path.join(root, name)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            entries.append(
+                (os.path.relpath(file_path, path), stat.st_mtime_ns, stat.st_size)
+            )
+    return tuple(sorted(entries))
+
+
+def fingerprint_bytes(fingerprint: Optional[Fingerprint]) -> int:
+    """
+    Estimates the resident size of a store from the size of its files.
+
+    Args:
+        fingerprint (Optional[Fingerprint]): The store fingerprint.
+
+    Returns:
+        int: The total size in bytes of the fingerprinted files.
+    """
+    if not fingerprint:
+        return 0
+    return sum(size for _, _, size in fingerprint)
+
+
+class StoreCache(object):
+    """
+    A process-wide LRU cache of loaded stores bounded by a byte budget.
+
+    Entries are invalidated when the fingerprint of the files on disk changes.
+
+    Attributes:
+        max_bytes (int): The byte budget for all cached stores.
+        hits (int): The number of lookups served from the cache.
+        misses (int): The number of lookups that had to load from storage.
+        evictions (int): The number of entries evicted to stay under budget.
+        invalidations (int): The number of entries dropped as stale.
+    """
+
+    max_bytes: int = STORE_CACHE_BYTES
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+    def __init__(cls, max_bytes: int = STORE_CACHE_BYTES) -> None:
+        cls.max_bytes = max_bytes
+        cls.hits = 0
+        cls.misses = 0
+        cls.evictions = 0
+        cls.invalidations = 0
+        cls.entries: "OrderedDict[Hashable, Tuple[Any, str, Any, int]]" = (
+            OrderedDict()
+        )
+        cls.lock = threading.RLock()
+
+    @property
+    def size(cls) -> int:
+        with cls.lock:
+            return sum(entry[3] for entry in cls.entries.values())
+
+    def get(cls, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached store for the key if its files are unchanged on disk.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Optional[Any]: The cached store, or None on a miss.
+        """
+        with cls.lock:
+            entry = cls.entries.get(key)
+            if entry is None:
+                cls.misses += 1
+                return None
+            store, path, fingerprint, _ = entry
+            if store_fingerprint(path) != fingerprint:
+                logger.info(f"STORE CACHE STALE: {key}")
+                del cls.entries[key]
+                cls.invalidations += 1
+                cls.misses += 1
+                return None
+            cls.entries.move_to_end(key)
+            cls.hits += 1
+            return store
+
+    def put(cls, key: Hashable, store: Any, path: str, nbytes: int = None) -> None:
+        """
+        Caches a store and evicts least recently used entries over budget.
+
+        Args:
+            key (Hashable): The cache key.
+            store (Any): The loaded store.
+            path (str): The directory the store was loaded from.
+            nbytes (int): The estimated size of the store in bytes, defaults to
+            the size of its files.
+        """
+        fingerprint = store_fingerprint(path)
+        if nbytes is None:
+            nbytes = fingerprint_bytes(fingerprint)
+        if nbytes > cls.max_bytes:
+            logger.info(f"STORE CACHE SKIP: {key} ({nbytes} bytes over budget)")
+            return
+        with cls.lock:
+            cls.entries.pop(key, None)
+            cls.entries[key] = (store, path, fingerprint, nbytes)
+            used = cls.size
+            while used > cls.max_bytes and len(cls.entries) > 1:
+                evicted_key, entry = cls.entries.popitem(last=False)
+                used -= entry[3]
+                cls.evictions += 1
+                logger.info(f"STORE CACHE EVICT: {evicted_key}")
+
+    def invalidate(cls, key: Hashable) -> None:
+        with cls.lock:
+            if cls.entries.pop(key, None) is not None:
+                cls.invalidations += 1
+
+    def clear(cls) -> None:
+        with cls.lock:
+            cls.entries.clear()
+
+    def stats(cls) -> Dict[str, int]:
+        with cls.lock:
+            return {
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "evictions": cls.evictions,
+                "invalidations": cls.invalidations,
+                "entries": len(cls.entries),
+                "bytes": cls.size,
+                "max_bytes": cls.max_bytes,
+            }
+
+
+store_cache: StoreCache = StoreCache()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+from functools import lru_cache
+from typing import List
+
+import tiktoken
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKENIZER_THREADS: int = int(os.environ.get("TOKENIZER_THREADS", 8))
+PARALLEL_BATCH_SIZE: int = 64
+FALLBACK_ENCODING: str = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """
+    Returns the encoding for a model, loaded once per process.
+
+    Args:
+        model (str): The OpenAI model name.
+
+    Returns:
+        tiktoken.Encoding: The encoding, cl100k_base for unknown models.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Returns a cheap upper bound on the token count of a text.
+
+    Every byte-level BPE token covers at least one UTF-8 byte, so the byte
+    length never undercounts.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The upper bound.
+    """
+    return len(text.encode("utf-8"))
+
+
+def count_tokens(text: str, model: str, estimate: bool = False) -> int:
+    """
+    Counts the tokens of a text for a model.
+
+    Args:
+        text (str): The text.
+        model (str): The OpenAI model name.
+        estimate (bool): Return the upper bound from estimate_tokens instead.
+
+    Returns:
+        int: The token count.
+    """
+    if estimate:
+        return estimate_tokens(text)
+    return len(get_encoding(model).encode_ordinary(text))
+
+
+def count_tokens_batch(
+    texts: List[str],
+    model: str,
+    estimate: bool = False,
+    num_threads: int = TOKENIZER_THREADS,
+) -> List[int]:
+    """
+    Counts the tokens of many texts for a model in one call.
+
+    Batches of at least PARALLEL_BATCH_SIZE texts are encoded on a pool of
+    threads; tiktoken releases the GIL while encoding.
+
+    Args:
+        texts (List[str]): The texts.
+        model (str): The OpenAI model name.
+        estimate (bool): Return upper bounds from estimate_tokens instead.
+        num_threads (int): The number of encoder threads for large batches.
+
+    Returns:
+        List[int]: The token count of each text, in order.
+    """
+    if estimate:
+        return [estimate_tokens(text) for text in texts]
+    encoding = get_encoding(model)
+    if len(texts) >= PARALLEL_BATCH_SIZE and num_threads > 1:
+        return [
+            len(tokens)
+            for tokens in encoding.encode_ordinary_batch(texts, num_threads=num_threads)
+        ]
+    return [len(encoding.encode_ordinary(text)) for text in texts]
@@ -2,20 +2,38 @@
 # coding: utf-8
 
 import os
-from io import BytesIO
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
 import faiss
 import pickle
 
+import numpy as np
+
 from basedir import basedir
 from dotenv import load_dotenv
 
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as BaseVectorStore
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 
-from cachetools import cached, TTLCache
-
 from google.cloud.storage.bucket import Bucket
 from athenah_ai.libs.google.storage import GCPStorageClient
+from athenah_ai.client.docstore import (
+    DOCSTORE_DIR,
+    DOCSTORE_FILES,
+    has_docstore,
+    load_docstore,
+    store_lock,
+    write_docstore,
+)
+from athenah_ai.client.embedding_cache import CachedEmbeddings
+from athenah_ai.client.index_spec import PARAMS_FILE, apply_search_params, load_params
+from athenah_ai.client.remote_cache import RemoteIndex, get_remote_cache
+from athenah_ai.client.store_cache import StoreCache, store_cache
 from athenah_ai.logger import logger
 
 load_dotenv()
@@ -24,18 +42,310 @@ OPENAI_API_KEY: str = os.environ.get("OPENAI_API_KEY")
 EMBEDDING_MODEL: str = os.environ.get("EMBEDDING_MODEL")
 CHUNK_SIZE: int = int(os.environ.get("CHUNK_SIZE", 2000))
 GCP_INDEX_BUCKET: str = os.environ.get("GCP_INDEX_BUCKET", "athenah-ai-indexes")
+INDEX_LOAD_MODE: str = os.environ.get("INDEX_LOAD_MODE", "memory")  # memory or mmap
+# IO_FLAG_MMAP_IFC maps flat codes in place. Combined with IO_FLAG_MMAP it
+# fails on IVF indexes, so the older flag is only used when it is missing.
+MMAP_IO_FLAGS: int = (
+    getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+)
+SHARDS_DIR: str = "shards"
+SHARDS_FILE: str = "shards.json"
+SHARDS_FORMAT: int = 1
+SHARD_SEARCH_WORKERS: int = int(
+    os.environ.get("SHARD_SEARCH_WORKERS", os.cpu_count() or 1)
+)
+
+search_pool: ThreadPoolExecutor = None
+search_pool_lock = threading.Lock()
+
+
+def search_by_vectors(
+    store: FAISS, vectors: List[List[float]], k: int = 4
+) -> List[List[Tuple[Document, float]]]:
+    """
+    Searches a store for many query vectors with one matrix search.
+
+    Args:
+        store (FAISS): The store to search.
+        vectors (List[List[float]]): The query embeddings.
+        k (int): The number of documents to return per query.
+
+    Returns:
+        List[List[Tuple[Document, float]]]: The documents and scores per query.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if len(matrix) == 0:
+        return []
+    if isinstance(store, ShardedStore):
+        return store.search_by_vectors(matrix, k)
+    if store._normalize_L2:
+        matrix = matrix.copy()
+        faiss.normalize_L2(matrix)
+    scores, indices = store.index.search(matrix, k)
+    results: List[List[Tuple[Document, float]]] = []
+    for row_scores, row_indices in zip(scores, indices):
+        docs: List[Tuple[Document, float]] = []
+        for score, i in zip(row_scores, row_indices):
+            if i == -1:
+                continue
+            docs.append((get_document(store, i), float(score)))
+        results.append(docs)
+    return results
+
+
+def count_chunks(store: FAISS) -> int:
+    """
+    Counts the chunks of a store, without loading the shards of a sharded one.
+
+    Args:
+        store (FAISS): The store.
+
+    Returns:
+        int: The number of chunks.
+    """
+    if isinstance(store, ShardedStore):
+        return len(store)
+    return store.index.ntotal
+
+
+def remote_name(prefix: str, name: str) -> str:
+    return f"{prefix}/{name}" if prefix else name
+
+
+def get_document(store: FAISS, i: int) -> Document:
+    _id = store.index_to_docstore_id[i]
+    doc = store.docstore.search(_id)
+    if not isinstance(doc, Document):
+        raise ValueError(f"could not find document for id {_id}, got {doc}")
+    return doc
+
+
+def has_shards(path: str) -> bool:
+    return os.path.exists(os.path.join(path, SHARDS_FILE))
+
+
+def read_shards(path: str) -> List[Dict[str, Any]]:
+    """
+    Reads the shard list of a sharded index.
+
+    Args:
+        path (str): The directory of the saved index.
+
+    Returns:
+        List[Dict[str, Any]]: The ``name`` and ``chunks`` of each shard, whose
+        store is saved in SHARDS_DIR/name.
+    """
+    with open(os.path.join(path, SHARDS_FILE)) as file:
+        data = json.load(file)
+    if data.get("format") != SHARDS_FORMAT:
+        raise ValueError(f"unimplemented shards format: {data.get('format')}")
+    return data["shards"]
+
+
+def write_shards(path: str, shards: List[Dict[str, Any]]) -> None:
+    tmp_path = os.path.join(path, f"{SHARDS_FILE}.tmp")
+    with open(tmp_path, "w") as file:
+        json.dump({"format": SHARDS_FORMAT, "shards": shards}, file)
+    os.replace(tmp_path, os.path.join(path, SHARDS_FILE))
+
+
+def get_search_pool() -> ThreadPoolExecutor:
+    """
+    Returns the thread pool shared by all sharded stores of the process.
+
+    Returns:
+        ThreadPoolExecutor: The pool.
+    """
+    global search_pool
+    with search_pool_lock:
+        if search_pool is None:
+            search_pool = ThreadPoolExecutor(
+                max_workers=SHARD_SEARCH_WORKERS, thread_name_prefix="shard-search"
+            )
+        return search_pool
+
+
+class ShardedStore(BaseVectorStore):
+    """
+    Searches the shards of a sharded index as one store.
+
+    Shards are loaded on first use and can be evicted independently. A
+    search fans out to every shard on a shared thread pool, as FAISS releases
+    the GIL while it searches, and the top k of each shard are merged by score.
+
+    Attributes:
+        path (str): The directory of the saved index.
+        names (List[str]): The names of the shards.
+        chunks (int): The chunks of every shard, as recorded when they were
+        built.
+        shards (Dict[str, FAISS]): The loaded shards.
+    """
+
+    def __init__(
+        cls, path: str, embedder: Embeddings, load_shard: Callable[[str], FAISS]
+    ) -> None:
+        cls.path = path
+        cls.embedder = embedder
+        cls.load_shard = load_shard
+        shards = read_shards(path)
+        cls.names: List[str] = [shard["name"] for shard in shards]
+        cls.chunks: int = sum(shard["chunks"] for shard in shards)
+        cls.shards: Dict[str, FAISS] = {}
+        cls.locks: Dict[str, threading.Lock] = {
+            name: threading.Lock() for name in cls.names
+        }
+
+    def __len__(cls) -> int:
+        return cls.chunks
+
+    @property
+    def embeddings(cls) -> Embeddings:
+        return cls.embedder
+
+    def shard(cls, name: str) -> FAISS:
+        """
+        Returns a shard, loading it from SHARDS_DIR/name if it is not loaded.
+
+        Args:
+            name (str): The shard name.
+
+        Returns:
+            FAISS: The shard store.
+        """
+        store = cls.shards.get(name)
+        if store is not None:
+            return store
+        with cls.locks[name]:
+            store = cls.shards.get(name)
+            if store is None:
+                store = cls.load_shard(os.path.join(cls.path, SHARDS_DIR, name))
+                cls.shards[name] = store
+            return store
+
+    def evict(cls, name: str) -> None:
+        with cls.locks[name]:
+            cls.shards.pop(name, None)
+
+    def search_by_vectors(
+        cls, vectors: List[List[float]], k: int = 4
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Searches every shard for many query vectors and merges the results.
+
+        Args:
+            vectors (List[List[float]]): The query embeddings.
+            k (int): The number of documents to return per query.
+
+        Returns:
+            List[List[Tuple[Document, float]]]: The documents and scores per
+            query, best first.
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if len(matrix) == 0 or not cls.names:
+            return [[] for _ in matrix]
+
+        def search(name: str) -> Tuple[np.ndarray, np.ndarray]:
+            store = cls.shard(name)
+            queries = matrix
+            if store._normalize_L2:
+                queries = matrix.copy()
+                faiss.normalize_L2(queries)
+            return store.index.search(queries, k)
+
+        results = list(get_search_pool().map(search, cls.names))
+        # Only the merged top k are looked up in the docstores. L2 scores are
+        # distances and inner products similarities, and missing results are
+        # padded with the worst score, so they sort last.
+        scores = np.hstack([shard_scores for shard_scores, _ in results])
+        indices = np.hstack([shard_indices for _, shard_indices in results])
+        if cls.shard(cls.names[0]).index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        else:
+            order = np.argsort(scores, axis=1, kind="stable")[:, :k]
+        merged: List[List[Tuple[Document, float]]] = []
+        for row, columns in enumerate(order):
+            docs: List[Tuple[Document, float]] = []
+            for column in columns:
+                i = indices[row, column]
+                if i == -1:
+                    continue
+                store = cls.shard(cls.names[column // k])
+                docs.append((get_document(store, i), float(scores[row, column])))
+            merged.append(docs)
+        return merged
+
+    def similarity_search_with_score_by_vector(
+        cls, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return cls.search_by_vectors([embedding], k)[0]
 
-cache = TTLCache(maxsize=100, ttl=3600)
+    def similarity_search_with_score(
+        cls, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return cls.similarity_search_with_score_by_vector(
+            cls.embedder.embed_query(query), k
+        )
+
+    def similarity_search_by_vector(
+        cls, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in cls.similarity_search_with_score_by_vector(embedding, k)
+        ]
+
+    def similarity_search(cls, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in cls.similarity_search_with_score(query, k)]
+
+    def add_texts(cls, *args: Any, **kwargs: Any) -> List[str]:
+        raise ValueError("unimplemented: sharded stores are built by the indexer")
+
+    @classmethod
+    def from_texts(cls, *args: Any, **kwargs: Any) -> "ShardedStore":
+        raise ValueError("unimplemented: sharded stores are built by the indexer")
 
 
 class VectorStore(object):
     storage_type: str = "local"  # local or gcs
+    load_mode: str = INDEX_LOAD_MODE  # memory or mmap
+    store_cache: StoreCache = store_cache
+    bucket: Bucket = None
 
-    def __init__(cls, storage_type: str) -> None:
+    def __init__(cls, storage_type: str, load_mode: str = INDEX_LOAD_MODE) -> None:
         cls.storage_type = storage_type
+        cls.load_mode = load_mode
         pass
 
+    def get_embedder(cls) -> CachedEmbeddings:
+        embedder = OpenAIEmbeddings(
+            openai_api_key=OPENAI_API_KEY,
+            model=EMBEDDING_MODEL,
+            chunk_size=CHUNK_SIZE,
+        )
+        return CachedEmbeddings(embedder, embedder.model)
+
     def load(cls, name: str, dir: str = "dist", version: str = "v1") -> FAISS:
+        key = (cls.storage_type, dir, name, version, cls.load_mode)
+        if cls.storage_type == "gcs":
+            # Revalidating first lets the fingerprint check below see changes.
+            cls.sync_gcs(name, dir, version)
+        store: FAISS = cls.store_cache.get(key)
+        if store is not None:
+            logger.info(f"STORE CACHE HIT: {key}")
+            cls.base_path: str = os.path.join(basedir, dir)
+            cls.name_path: str = os.path.join(cls.base_path, name)
+            cls.name_version_path: str = os.path.join(
+                cls.base_path, f"{name}-{version}"
+            )
+            return store
+
+        if cls.storage_type == "gcs":
+            store = cls.load_local(dir, name, version)
+        else:
+            store = cls.load_uncached(name, dir, version)
+        cls.store_cache.put(key, store, cls.name_version_path)
+        return store
+
+    def load_uncached(cls, name: str, dir: str = "dist", version: str = "v1") -> FAISS:
         if cls.storage_type == "local":
             logger.info("LOADING LOCAL FAISS")
             return cls.load_local(
@@ -46,49 +356,126 @@ class VectorStore(object):
 
         if cls.storage_type == "gcs":
             logger.info("LOADING GCS FAISS")
-            try:
-                return cls.load_local(
-                    dir,
-                    name,
-                    version,
-                )
-            except Exception:
-                cls.storage_client: GCPStorageClient = GCPStorageClient().add_client()
-                cls.bucket: Bucket = cls.storage_client.init_bucket(GCP_INDEX_BUCKET)
-                return cls.load_gcs(
-                    name,
-                    version,
-                )
+            return cls.load_gcs(name, version, dir)
+
+        raise ValueError(f"unimplemented storage type: {cls.storage_type}")
 
     def load_local(cls, dir: str, name: str, version: str) -> FAISS:
-        embedder = OpenAIEmbeddings(
-            openai_api_key=OPENAI_API_KEY,
-            model=EMBEDDING_MODEL,
-            chunk_size=CHUNK_SIZE,
-        )
+        embedder = cls.get_embedder()
         cls.base_path: str = os.path.join(basedir, dir)
         cls.name_path: str = os.path.join(cls.base_path, name)
         cls.name_version_path: str = os.path.join(cls.base_path, f"{name}-{version}")
+        if has_shards(cls.name_version_path):
+            return cls.load_sharded(cls.name_version_path, embedder)
+        if not has_docstore(cls.name_version_path) and cls.load_mode == "mmap":
+            logger.info("CONVERTING PICKLED DOCSTORE")
+            with open(os.path.join(cls.name_version_path, "index.pkl"), "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+            write_docstore(cls.name_version_path, docstore, index_to_docstore_id)
+        if has_docstore(cls.name_version_path):
+            return cls.load_compact(cls.name_version_path, embedder)
         return FAISS.load_local(
             f"{cls.name_version_path}", embedder, allow_dangerous_deserialization=True
         )
 
-    @cached(cache)
-    def load_gcs(cls, name: str, version: str) -> FAISS:
-        blob = cls.bucket.blob(f"{name}/{version}/index.pkl")
-        data_byte_array = BytesIO()
-        blob.download_to_file(data_byte_array)
-        docstore, index_to_docstore_id = pickle.loads(data_byte_array.getvalue())
-        embedder = OpenAIEmbeddings(
-            openai_api_key=OPENAI_API_KEY,
-            model=EMBEDDING_MODEL,
-            chunk_size=CHUNK_SIZE,
+    def load_compact(cls, path: str, embedder: Embeddings) -> FAISS:
+        mmap: bool = cls.load_mode == "mmap"
+        with store_lock(path):
+            index = faiss.read_index(
+                os.path.join(path, "index.faiss"), MMAP_IO_FLAGS if mmap else 0
+            )
+            apply_search_params(index, load_params(path))
+            docstore, index_to_docstore_id = load_docstore(path, mmap=mmap)
+        return FAISS(embedder, index, docstore, index_to_docstore_id)
+
+    def load_sharded(cls, path: str, embedder: Embeddings) -> ShardedStore:
+        """
+        Opens a sharded index. Shards are loaded like a compact store, on
+        first search.
+
+        Args:
+            path (str): The directory of the saved index.
+            embedder (Embeddings): The query embedder.
+
+        Returns:
+            ShardedStore: The store.
+        """
+        return ShardedStore(
+            path, embedder, lambda shard_path: cls.load_compact(shard_path, embedder)
         )
-        blob = cls.bucket.blob(f"{name}/{version}/index.faiss")
-        blob.download_to_filename("/tmp/index.faiss")
-        index = faiss.read_index("/tmp/index.faiss")
-        store = FAISS(embedder, index, docstore, index_to_docstore_id)
-        cls.base_path: str = os.path.join(basedir, "dist")
-        cls.name_version_path: str = os.path.join(cls.base_path, f"{name}-{version}")
-        store.save_local(cls.name_version_path)
-        return store
+
+    def load_gcs(cls, name: str, version: str, dir: str = "dist") -> FAISS:
+        cls.sync_gcs(name, dir, version)
+        return cls.load_local(dir, name, version)
+
+    def sync_gcs(cls, name: str, dir: str, version: str) -> str:
+        """
+        Brings the local copy of an index up to date with the index bucket,
+        downloading only the files that changed. When the bucket is missing
+        the index or cannot be reached, a local copy is used as it is.
+
+        Args:
+            name (str): The index name.
+            dir (str): The directory under basedir the index is saved in.
+            version (str): The index version.
+
+        Returns:
+            str: The local directory of the index.
+
+        Raises:
+            Exception: The sync error, if there is no local copy.
+        """
+        path = os.path.join(basedir, dir, f"{name}-{version}")
+        try:
+            if cls.bucket is None:
+                cls.storage_client: GCPStorageClient = (
+                    GCPStorageClient().add_client()
+                )
+                cls.bucket = cls.storage_client.init_bucket(GCP_INDEX_BUCKET)
+            remote_cache = get_remote_cache(os.path.join(basedir, dir))
+            return remote_cache.sync(cls.bucket, name, version, cls.download_gcs)
+        except Exception as e:
+            if not has_shards(path) and not os.path.exists(
+                os.path.join(path, "index.faiss")
+            ):
+                raise
+            logger.warning(f"GCS SYNC FAILED, USING LOCAL COPY: {path} {e!r}")
+            return path
+
+    def download_gcs(cls, remote: RemoteIndex) -> None:
+        if SHARDS_FILE not in remote:
+            cls.download_store(remote, "")
+            return
+        remote.fetch([SHARDS_FILE])
+        for shard in read_shards(remote.path):
+            cls.download_store(remote, f"{SHARDS_DIR}/{shard['name']}")
+
+    def download_store(cls, remote: RemoteIndex, prefix: str) -> None:
+        """
+        Fetches a saved store from the index bucket.
+
+        Args:
+            remote (RemoteIndex): The index version in the bucket.
+            prefix (str): The path of the store within the index version.
+        """
+        path = remote.local(prefix)
+        names = [remote_name(prefix, "index.faiss")]
+        if remote_name(prefix, PARAMS_FILE) in remote:
+            names.append(remote_name(prefix, PARAMS_FILE))
+        docstore = [
+            remote_name(prefix, f"{DOCSTORE_DIR}/{file_name}")
+            for file_name in DOCSTORE_FILES
+        ]
+        if all(name in remote for name in docstore):
+            with store_lock(path, shared=False):
+                remote.fetch(names + docstore)
+            return
+        pickled = remote_name(prefix, "index.pkl")
+        with store_lock(path, shared=False):
+            downloaded = remote.fetch(names + [pickled])
+        if pickled in downloaded or not has_docstore(path):
+            logger.info("CONVERTING PICKLED GCS DOCSTORE")
+            with open(remote.local(pickled), "rb") as f:
+                docstore_data, index_to_docstore_id = pickle.load(f)
+            write_docstore(path, docstore_data, index_to_docstore_id)
+        remote.keep(docstore)
@@ -7,7 +7,10 @@ from typing import List
 from basedir import basedir
 from dotenv import load_dotenv
 
+from athenah_ai.client.index_spec import INDEX_SPEC
+from athenah_ai.indexer.base_index_client import PREPARE_WORKERS
 from athenah_ai.indexer.index_client import IndexClient
+from athenah_ai.indexer.snapshot import SOURCE_MODES, link_file, reflink_file, snapshot
 from athenah_ai.logger import logger
 
 load_dotenv()
@@ -27,34 +30,100 @@ class AthenahIndexer(IndexClient):
         dir: str,
         name: str,
         version: str,
+        workers: int = PREPARE_WORKERS,
+        index_spec: str = INDEX_SPEC,
     ):
         cls.storage_type = storage_type
         cls.id = id
         cls.dir = dir
         cls.name = name
         cls.version = version
-        super().__init__(cls.storage_type, cls.id, cls.dir, cls.name, cls.version)
+        super().__init__(
+            cls.storage_type,
+            cls.id,
+            cls.dir,
+            cls.name,
+            cls.version,
+            workers,
+            index_spec,
+        )
         pass
 
-    def index_dir(cls, source: str, files: List[str], name: str, full: bool = False):
+    def index_dir(
+        cls,
+        source: str,
+        files: List[str],
+        name: str,
+        full: bool = False,
+        incremental: bool = False,
+        source_mode: str = "copy",
+        sharded: bool = False,
+    ):
+        """
+        Indexes a source directory.
+
+        Args:
+            source (str): The source directory.
+            files (List[str]): The folders of the source to index.
+            name (str): The index name.
+            full (bool): Whether to do a full preparation.
+            incremental (bool): Whether to only index the changed files.
+            source_mode (str): "copy" to copy the source to dist first,
+            "inplace" to index it where it is, or "hardlink" or "reflink" to
+            snapshot it to dist with links.
+            sharded (bool): Whether to build the index as shards in parallel.
+        """
+        if source_mode not in SOURCE_MODES:
+            raise ValueError(f"unimplemented source mode: {source_mode}")
         source_name: str = f"{name}-source"
         dest_filepath: str = os.path.join(basedir, f"dist/{name}/{source_name}")
         logger.info(f"STORAGE: {cls.storage_type}")
         logger.info(f"NAME: {name}")
         logger.info(f"SOURCE: {source}")
         logger.info(f"FILES: {files}")
+        logger.info(f"SOURCE MODE: {source_mode}")
+        if source_mode == "inplace":
+            return cls.build(
+                source_name, files, full, incremental, root=source, sharded=sharded
+            )
         logger.info(f"DEST PATH: {dest_filepath}")
         cls.remove(dest_filepath, True)
-        cls.copy(source, dest_filepath, True)
-        cls.build(source_name, files, full)
+        if source_mode == "copy":
+            cls.copy(source, dest_filepath, True)
+        else:
+            snapshot(source, dest_filepath, source_mode)
+        return cls.build(source_name, files, full, incremental, sharded=sharded)
 
-    def index_file(cls, file_path: str, name: str, full: bool = False):
+    def index_file(
+        cls,
+        file_path: str,
+        name: str,
+        full: bool = False,
+        incremental: bool = False,
+        source_mode: str = "copy",
+    ):
+        if source_mode not in SOURCE_MODES:
+            raise ValueError(f"unimplemented source mode: {source_mode}")
         source_name: str = f"{name}-source"
         dest_filepath: str = os.path.join(basedir, f"dist/{name}/{source_name}")
         logger.info(f"STORAGE: {cls.storage_type}")
         logger.info(f"NAME: {name}")
         logger.info(f"FILE PATH: {file_path}")
+        logger.info(f"SOURCE MODE: {source_mode}")
+        if source_mode == "inplace":
+            return cls.build(
+                source_name,
+                [os.path.basename(file_path)],
+                full,
+                incremental,
+                root=os.path.dirname(os.path.abspath(file_path)),
+            )
         logger.info(f"DEST PATH: {dest_filepath}")
         cls.remove(dest_filepath, True)
-        cls.copy(file_path, dest_filepath, False)
-        cls.build(source_name, dest_filepath, full)
+        if source_mode == "copy":
+            cls.copy(file_path, dest_filepath, False)
+        else:
+            os.makedirs(dest_filepath, exist_ok=True)
+            link = link_file if source_mode == "hardlink" else reflink_file
+            link(file_path, os.path.join(dest_filepath, os.path.basename(file_path)))
+        return cls.build(source_name, dest_filepath, full, incremental)
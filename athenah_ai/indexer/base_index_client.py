@@ -2,36 +2,115 @@
 # coding: utf-8
 
 import os
-from typing import Dict, Any, List
+import copy
+import tempfile
+import threading
+from collections import deque
+from hashlib import blake2b
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from queue import Full, Queue
+from typing import Callable, Deque, Dict, Any, Iterable, Iterator, List, Tuple
 import shutil
+
 import faiss
-import pickle
 
 from basedir import basedir
 from dotenv import load_dotenv
 
-from unstructured.file_utils.filetype import FileType, detect_filetype
-from langchain_community.document_loaders import DirectoryLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_text_splitters import Language
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 
-from google.cloud.storage.bucket import Bucket, Blob
+from google.api_core.exceptions import NotFound
+from google.cloud.storage.bucket import Bucket
 from athenah_ai.libs.google.storage import GCPStorageClient
+from athenah_ai.libs.google.transfer import upload_file, upload_files
 
 from athenah_ai.client import AthenahClient
+from athenah_ai.client.vector_store import (
+    SHARDS_DIR,
+    SHARDS_FILE,
+    ShardedStore,
+    VectorStore,
+    write_shards,
+)
+from athenah_ai.client.docstore import (
+    DOCSTORE_DIR,
+    DOCSTORE_FILES,
+    StoreWriter,
+    has_docstore,
+    load_mutable_store,
+    save_store,
+)
+from athenah_ai.client.index_spec import (
+    INDEX_SPEC,
+    PARAMS_FILE,
+    build_index,
+    load_spec,
+    supports_removal,
+)
+from athenah_ai.client.embedding_cache import (
+    EMBEDDING_CACHE_DIR,
+    CachedDocumentEmbeddings,
+)
+from athenah_ai.indexer.chunk_log import Chunk, ChunkLogWriter
+from athenah_ai.indexer.embedding_scheduler import ScheduledEmbeddings
+from athenah_ai.indexer.loaders import load_document
+from athenah_ai.indexer.manifest import Manifest, file_hash
+from athenah_ai.indexer.scanner import FileScanner
+from athenah_ai.indexer.shards import SHARD_CHUNKS, build_shard, plan_shards
+from athenah_ai.indexer.snapshot import is_ignored
 from athenah_ai.indexer.splitters import code_splitter, text_splitter
 from athenah_ai.logger import logger
 
 load_dotenv()
 
 OPENAI_API_KEY: str = os.environ.get("OPENAI_API_KEY")
+OPENAI_BASE_URL: str = os.environ.get("OPENAI_BASE_URL")
 EMBEDDING_MODEL: str = os.environ.get("EMBEDDING_MODEL")
 CHUNK_SIZE: int = int(os.environ.get("CHUNK_SIZE", 2000))
 GCP_INDEX_BUCKET: str = os.environ.get("GCP_INDEX_BUCKET", "athenah-ai-indexes")
+PREPARE_WORKERS: int = int(os.environ.get("PREPARE_WORKERS", os.cpu_count() or 1))
+EMBED_BATCH_SIZE: int = int(os.environ.get("EMBED_BATCH_SIZE", 256))
+PIPELINE_DEPTH: int = int(os.environ.get("PIPELINE_DEPTH", 4))
 chunk_overlap: int = 0
 
+LANGUAGES: Dict[str, Tuple[str, Language]] = {
+    ".c": ("cpp", Language.CPP),
+    ".cc": ("cpp", Language.CPP),
+    ".cpp": ("cpp", Language.CPP),
+    ".cxx": ("cpp", Language.CPP),
+    ".h": ("cpp", Language.CPP),
+    ".hh": ("cpp", Language.CPP),
+    ".hpp": ("cpp", Language.CPP),
+    ".js": ("js", Language.JS),
+    ".jsx": ("js", Language.JS),
+    ".mjs": ("js", Language.JS),
+    ".ts": ("ts", Language.TS),
+    ".tsx": ("ts", Language.TS),
+    ".py": ("py", Language.PYTHON),
+}
+
+
+def chunk_id(source: str, index: int, content: str) -> str:
+    """
+    Derives a stable int64 chunk id from the chunk source, position and content.
+
+    Args:
+        source (str): The path of the file the chunk came from.
+        index (int): The index of the chunk within the file.
+        content (str): The chunk text.
+
+    Returns:
+        str: The id as a decimal string, as FAISS docstore ids are strings.
+    """
+    digest = blake2b(f"{source}:{index}:{content}".encode("utf-8"), digest_size=8)
+    return str(int.from_bytes(digest.digest(), "big") & (2**63 - 1))
+
 
 def summarize_file(content: str):
     client = AthenahClient(id="id", model_name="gpt-3.5-turbo-16k")
@@ -62,30 +141,100 @@ def summarize_file(content: str):
 #         return response
 
 
+def split_document(doc: Document, source: str = None) -> List[Chunk]:
+    """
+    Splits a loaded document with the splitter for its language.
+
+    Args:
+        doc (Document): The loaded document.
+        source (str): The path of the file relative to the indexed root,
+        recorded as the chunk source. Defaults to the file name.
+
+    Returns:
+        List[Chunk]: The (text, metadata, id) of each non-blank chunk.
+    """
+    file_summary = None
+    functions = None
+    file_name: str = source or os.path.basename(doc.metadata["source"])
+    logger.info(file_name)
+
+    extension = os.path.splitext(file_name)[1].lower()
+    file_type, language = LANGUAGES.get(extension, ("text", None))
+
+    if language:
+        splitter: RecursiveCharacterTextSplitter = code_splitter(
+            language,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=chunk_overlap,
+        )
+    else:
+        splitter: RecursiveCharacterTextSplitter = text_splitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=chunk_overlap,
+        )
+
+    chunks: List[Chunk] = []
+    splits = splitter.split_text(doc.page_content)
+    for index, split in enumerate(splits):
+        if split.strip():
+            chunk_metadata = {
+                "source": file_name,
+                "file_type": file_type,
+                "chunk_index": index,
+                "total_chunks": len(splits),
+            }
+            if file_summary:
+                chunk_metadata["file_summary"] = file_summary
+            if functions:
+                chunk_metadata["functions"] = functions
+            chunks.append((split, chunk_metadata, chunk_id(file_name, index, split)))
+    return chunks
+
+
+def load_and_split(
+    load_file: Callable[[str, str], List[Document]],
+    path: str,
+    kind: str = None,
+    source: str = None,
+) -> List[Chunk]:
+    return [
+        chunk for doc in load_file(path, kind) for chunk in split_document(doc, source)
+    ]
+
+
 class BaseIndexClient(object):
     storage_type: str = "local"  # local or gcs
     id: str = ""
     name: str = ""
     version: str = ""
-
-    splited_docs: List[str] = []
-    splited_metadatas: List[str] = []
+    workers: int = PREPARE_WORKERS
+    index_spec: str = INDEX_SPEC
+    # The staged copy of the source, which is never matched as ignored.
+    source_path: str = None
 
     def __init__(
-        cls, storage_type: str, id: str, dir: str, name: str, version: str = "v1"
+        cls,
+        storage_type: str,
+        id: str,
+        dir: str,
+        name: str,
+        version: str = "v1",
+        workers: int = PREPARE_WORKERS,
+        index_spec: str = INDEX_SPEC,
     ) -> None:
         cls.storage_type = storage_type
         cls.id = id
         cls.name = name
         cls.version = version
+        cls.workers = workers
+        cls.index_spec = index_spec
+        cls.file_kinds: Dict[str, str] = {}
         cls.base_path: str = os.path.join(basedir, dir)
         cls.name_path: str = os.path.join(cls.base_path, cls.name)
         cls.name_version_path: str = os.path.join(
             cls.base_path, f"{cls.name}-{cls.version}"
         )
         os.makedirs(cls.name_version_path, exist_ok=True)
-        cls.splited_docs: List[str] = []
-        cls.splited_metadatas: List[str] = []
         if cls.storage_type == "gcs":
             cls.storage_client: GCPStorageClient = GCPStorageClient().add_client()
             cls.bucket: Bucket = cls.storage_client.init_bucket(GCP_INDEX_BUCKET)
@@ -97,155 +246,572 @@ class BaseIndexClient(object):
         else:
             shutil.copyfile(source, destination)
 
-    def clean(cls, root: str) -> Dict[str, Any]:
+    def clean(cls, root: str) -> Dict[str, str]:
+        """
+        Classifies the files under a root in one pass, without renaming them.
+
+        Files are classified by extension and sniffed only when the extension
+        is unknown. Results are cached in name_version_path by (path, mtime,
+        size), and kept in file_kinds for the loader.
+
+        Args:
+            root (str): The directory to classify.
+
+        Returns:
+            Dict[str, str]: The kind of each file.
+        """
         logger.info(f"CLEAN: {root}")
-        all_files = []
-        ignore_folders = [".git"]
-        logger.info("Finding all files in the root folder...")
+        scanner = FileScanner.load(cls.name_version_path)
+        kinds = scanner.scan(cls.walk_files(root), root)
+        scanner.save()
+        cls.file_kinds.update(kinds)
+        logger.info(
+            f"CLEAN: {len(kinds)} files, {scanner.hits} cached, "
+            f"{scanner.sniffed} sniffed"
+        )
+        return kinds
+
+    def walk_files(cls, root: str) -> Iterator[str]:
+        """
+        Yields the files under a root that are indexed, skipping hidden paths
+        and IGNORE_PATTERNS, so a source tree can be indexed where it is.
+
+        The patterns only apply within the source, so the staged copy of a
+        source whose name matches one, such as ``build_info-source``, is
+        still indexed. Directories are walked in sorted order, so the order
+        is deterministic.
+
+        Args:
+            root (str): The directory to walk, or a single file.
+
+        Yields:
+            str: The next file path.
+        """
+        if os.path.isfile(root):
+            yield root
+            return
+
+        def ignored(path: str, name: str) -> bool:
+            if cls.source_path and path == cls.source_path:
+                return False
+            return name.startswith(".") or is_ignored(name)
+
         for path, subdirs, files in os.walk(root):
-            for name in files:
-                folder_path = os.path.join(path, name)
-                flag = 0
-                for folder in ignore_folders:
-                    if folder in folder_path:
-                        flag = 1
-                        break
-                if flag != 1:
-                    all_files.append(os.path.join(path, name))
-
-        logger.info("Finding unknown file types...")
-        unknown_files = []
-        for file in all_files:
-            if detect_filetype(file).value == 0:
-                unknown_files.append(file)
-
-        logger.info("Renaming unknown file types to .txt...")
-        for file in unknown_files:
-            new_name = file + ".txt"
-            os.rename(file, new_name)
-
-        logger.info("Finding all json files...")
-        json_files = []
-        for file in all_files:
-            if detect_filetype(file).value == FileType.JSON.value:
-                json_files.append(file)
-
-        logger.info("Renaming json files to .txt...")
-        for file in json_files:
-            new_name = file + ".txt"
-            os.rename(file, new_name)
-
-        logger.info("Creating dictionary mapping file names to file paths...")
-
-    def prepare(cls, root: str, full: bool = False):
+            subdirs[:] = sorted(
+                d for d in subdirs if not ignored(os.path.join(path, d), d)
+            )
+            for name in sorted(files):
+                if not ignored(os.path.join(path, name), name):
+                    yield os.path.join(path, name)
+
+    @staticmethod
+    def load_file(path: str, kind: str = None) -> List[Document]:
+        return load_document(path, kind)
+
+    def prepare(cls, root: str, full: bool = False) -> List[Chunk]:
         logger.info(f"PREPARE: {root}")
-        loader = DirectoryLoader(root, silent_errors=False, recursive=True)
-        docs = loader.load()
-        for doc in docs:
-            doc.metadata["source"] = doc.metadata["source"].strip(".txt")
-
-        logger.info(f"DOCS: {len(docs)}")
-        for doc in docs:
-            language = None
-            file_summary = None
-            functions = None
-            file_name: str = doc.metadata["source"]
-            logger.info(file_name)
-
-            if ".cpp" in file_name or ".h" in file_name:
-                file_type = "cpp"
-                language = Language.CPP
-            elif ".js" in file_name:
-                file_type = "js"
-                language = Language.JS
-            elif ".ts" in file_name:
-                file_type = "ts"
-                language = Language.TS
-            elif ".py" in file_name:
-                file_type = "py"
-                language = Language.PYTHON
-            else:
-                file_type = "text"
+        return [
+            chunk
+            for _, chunks in cls.iter_chunks(cls.walk_files(root), root)
+            for chunk in chunks
+        ]
+
+    def iter_chunks(
+        cls, paths: Iterable[str], root: str = None
+    ) -> Iterator[Tuple[str, List[Chunk]]]:
+        """
+        Loads and splits files, in order.
 
-            if language:
-                splitter: RecursiveCharacterTextSplitter = code_splitter(
-                    language,
-                    chunk_size=CHUNK_SIZE,
-                    chunk_overlap=chunk_overlap,
-                )
-            else:
-                splitter: RecursiveCharacterTextSplitter = text_splitter(
-                    chunk_size=CHUNK_SIZE,
-                    chunk_overlap=chunk_overlap,
-                )
+        With more than one worker the files are loaded and split on a process
+        pool with at most PIPELINE_DEPTH files per worker in flight, so the
+        result is the same as a serial run and memory does not grow with the
+        number of files.
 
-            splits = splitter.split_text(doc.page_content)
-            for index, split in enumerate(splits):
-                if split.strip():
-                    chunk_metadata = {
-                        "source": file_name.split("/")[-1],
-                        "file_type": file_type,
-                        "chunk_index": index,
-                        "total_chunks": len(splits),
-                    }
-                    if file_summary:
-                        chunk_metadata["file_summary"] = file_summary
-                    if functions:
-                        chunk_metadata["functions"] = functions
-
-                    cls.splited_docs.append(split)
-                    cls.splited_metadatas.append(chunk_metadata)
-                    # Save split to file
-                    split_file_path = os.path.join(
-                        cls.name_version_path, f"split_{index}.txt"
-                    )
-                    with open(split_file_path, "w") as split_file:
-                        split_file.write(split)
-
-    def build_one(cls):
-        embedder = OpenAIEmbeddings(
-            openai_api_key=OPENAI_API_KEY,
-            model=EMBEDDING_MODEL,
-            chunk_size=CHUNK_SIZE,
-        )
+        Args:
+            paths (Iterable[str]): The files to load.
+            root (str): The indexed root chunk sources are relative to,
+            name_path by default.
+
+        Yields:
+            Tuple[str, List[Chunk]]: Each file and its chunks.
+        """
+        root = root or cls.name_path
+        work = partial(load_and_split, cls.load_file)
+
+        def args(path: str) -> Tuple[str, str, str]:
+            if os.path.isfile(root):
+                return path, cls.file_kinds.get(path), os.path.basename(path)
+            return path, cls.file_kinds.get(path), os.path.relpath(path, root)
+
+        if cls.workers <= 1:
+            for path in paths:
+                yield path, work(*args(path))
+            return
+
+        with ProcessPoolExecutor(max_workers=cls.workers) as executor:
+            pending: Deque[Tuple[str, Future]] = deque()
+            for path in paths:
+                pending.append((path, executor.submit(work, *args(path))))
+                if len(pending) >= cls.workers * PIPELINE_DEPTH:
+                    path, future = pending.popleft()
+                    yield path, future.result()
+            while pending:
+                path, future = pending.popleft()
+                yield path, future.result()
+
+    def iter_batches(
+        cls,
+        paths: Iterable[str],
+        on_file: Callable[[str, List[Chunk]], None] = None,
+        root: str = None,
+    ) -> Iterator[List[Chunk]]:
+        batch: List[Chunk] = []
+        for path, chunks in cls.iter_chunks(paths, root):
+            if on_file is not None:
+                on_file(path, chunks)
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= EMBED_BATCH_SIZE:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def run_pipeline(
+        cls,
+        paths: Iterable[str],
+        add: Callable[[List[Chunk], List[List[float]]], None],
+        on_file: Callable[[str, List[Chunk]], None] = None,
+        root: str = None,
+        log: ChunkLogWriter = None,
+    ) -> int:
+        """
+        Streams files through the split, embed and add stages.
+
+        Files are split on a background thread into batches of
+        EMBED_BATCH_SIZE chunks while the previous batches are embedded. The
+        queue between the stages holds at most PIPELINE_DEPTH batches, so the
+        splitter waits when embedding falls behind.
+
+        Args:
+            paths (Iterable[str]): The files to index.
+            add (Callable): Receives each batch of chunks with their vectors.
+            on_file (Callable): Receives each file with its chunks once split.
+            root (str): The indexed root chunk sources are relative to.
+            log (ChunkLogWriter): Receives each batch once added.
+
+        Returns:
+            int: The number of chunks indexed.
+        """
+        batches: Queue = Queue(maxsize=PIPELINE_DEPTH)
+        stop = threading.Event()
+
+        def put(item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for batch in cls.iter_batches(paths, on_file, root):
+                    if not put(batch):
+                        return
+                put(None)
+            except BaseException as e:
+                put(e)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        embedder = cls.get_embedder()
+        total = 0
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+                add(batch, embedder.embed_documents([text for text, _, _ in batch]))
+                if log is not None:
+                    log.append(batch, root or cls.name_path)
+                total += len(batch)
+                logger.info(f"CHUNKS INDEXED: {total}")
+        finally:
+            stop.set()
+            producer.join()
+        return total
+
+    def get_embedder(cls) -> Embeddings:
+        embedder = ScheduledEmbeddings(EMBEDDING_MODEL, OPENAI_API_KEY, OPENAI_BASE_URL)
+        if not EMBEDDING_CACHE_DIR:
+            return embedder
+        return CachedDocumentEmbeddings(embedder, embedder.model)
+
+    def build_batch(
+        cls, paths: List[str], full: bool = False, root: str = None
+    ) -> FAISS:
+        """
+        Builds the index of the given directories and saves it.
+
+        Chunks are streamed into the saved store batch by batch, so memory
+        stays flat whatever the size of the directories. The index is built
+        from index_spec, a FAISS index factory spec.
+
+        Args:
+            paths (List[str]): The directories to index.
+            full (bool): Whether to do a full preparation.
+            root (str): The source root, name_path by default.
 
-        return FAISS.from_texts(
-            cls.splited_docs, embedding=embedder, metadatas=cls.splited_metadatas
+        Returns:
+            FAISS: The saved store.
+        """
+        for path in paths:
+            cls.clean(path)
+        cls.write_store((file for path in paths for file in cls.walk_files(path)), root)
+        cls.save()
+        return VectorStore("local", load_mode="mmap").load_compact(
+            cls.name_version_path, cls.get_embedder()
         )
 
-    def build_batch(cls, paths: List[str], full: bool = False):
+    def write_store(cls, files: Iterable[str], root: str = None) -> int:
+        """
+        Indexes files into a new store in name_version_path.
+
+        Args:
+            files (Iterable[str]): The files to index.
+            root (str): The source root, name_path by default.
+
+        Returns:
+            int: The number of chunks indexed.
+        """
+        with StoreWriter(cls.name_version_path, cls.index_spec) as writer:
+            with ChunkLogWriter(cls.name_version_path) as log:
+
+                def add(chunks: List[Chunk], vectors: List[List[float]]):
+                    texts, metadatas, ids = zip(*chunks)
+                    writer.add(vectors, texts, metadatas, ids)
+
+                return cls.run_pipeline(files, add, root=root, log=log)
+
+    def build_incremental(
+        cls, paths: List[str], full: bool = False, root: str = None
+    ) -> FAISS:
+        """
+        Updates the saved index with only the files that changed since the
+        last build.
+
+        Files are matched against the manifest in name_version_path by content
+        hash. Added and changed files are split and embedded, the chunks of
+        changed and removed files are deleted from the index, and the index
+        and manifest are saved. Without a manifest every file is added and
+        the index is built from index_spec, or Flat if that index cannot
+        remove chunks, as HNSW cannot. An update keeps the spec of the saved
+        index.
+
+        Args:
+            paths (List[str]): The directories to index.
+            full (bool): Whether to do a full preparation.
+            root (str): The source root, name_path by default. Manifest paths
+            are relative to it.
+
+        Returns:
+            FAISS: The store, or None if no file was ever indexed.
+        """
+        root = root or cls.name_path
         for path in paths:
             cls.clean(path)
-            cls.prepare(path, full)
+        return cls.update_store(
+            [file for path in paths for file in cls.walk_files(path)], root
+        )
 
-        embedder = OpenAIEmbeddings(
-            openai_api_key=OPENAI_API_KEY,
-            model=EMBEDDING_MODEL,
-            chunk_size=CHUNK_SIZE,
+    def update_store(cls, files: List[str], root: str = None) -> FAISS:
+        """
+        Updates the store in name_version_path with the files that changed
+        since the last build, as build_incremental does.
+
+        Args:
+            files (List[str]): The files to index.
+            root (str): The source root, name_path by default.
+
+        Returns:
+            FAISS: The store, or None if no file was ever indexed.
+        """
+        root = root or cls.name_path
+        manifest = Manifest.load(cls.name_version_path)
+        store: FAISS = None
+        spec = cls.index_spec
+        if manifest.files and has_docstore(cls.name_version_path):
+            store = load_mutable_store(cls.name_version_path, cls.get_embedder())
+            spec = load_spec(cls.name_version_path)
+            if (spec or "Flat") != cls.index_spec:
+                logger.info(
+                    f"INCREMENTAL: KEEPING INDEX SPEC {spec or 'Flat'}, "
+                    f"COMPACT TO USE {cls.index_spec}"
+                )
+        else:
+            manifest.files = {}
+        rebuild = store is None
+
+        hashes: Dict[str, str] = {
+            os.path.relpath(path, root): file_hash(path) for path in files
+        }
+        added, changed, removed = manifest.diff(hashes)
+        logger.info(
+            f"INCREMENTAL: {len(added)} added, {len(changed)} changed, "
+            f"{len(removed)} removed, {len(hashes)} files"
+        )
+        if not (added or changed or removed):
+            return store
+
+        stale_ids = manifest.ids(changed + removed)
+        if store is not None and stale_ids:
+            store.delete(stale_ids)
+        for name in removed:
+            del manifest.files[name]
+
+        def add(chunks: List[Chunk], vectors: List[List[float]]):
+            nonlocal store
+            texts, metadatas, ids = zip(*chunks)
+            if store is None:
+                store = FAISS(
+                    cls.get_embedder(),
+                    faiss.IndexFlatL2(len(vectors[0])),
+                    InMemoryDocstore(),
+                    {},
+                )
+            store.add_embeddings(zip(texts, vectors), list(metadatas), list(ids))
+
+        def on_file(path: str, chunks: List[Chunk]):
+            name = os.path.relpath(path, root)
+            manifest.files[name] = {
+                "hash": hashes[name],
+                "ids": [_id for _, _, _id in chunks],
+            }
+
+        # A rebuild without a store starts a new log, an update appends to it.
+        with ChunkLogWriter(cls.name_version_path, append=store is not None) as log:
+            cls.run_pipeline(
+                (os.path.join(root, name) for name in added + changed),
+                add,
+                on_file,
+                root,
+                log,
+            )
+        if store is None:
+            return None
+        if rebuild and spec != "Flat":
+            # Chunks are added to a flat index as they are embedded, then the
+            # index is built from the spec once they can all be trained on.
+            if supports_removal(faiss.index_factory(store.index.d, spec)):
+                store.index = build_index(
+                    spec, store.index.reconstruct_n(0, store.index.ntotal)
+                )
+            else:
+                logger.warning(
+                    f"INCREMENTAL: INDEX SPEC {spec} CANNOT REMOVE CHUNKS, USING Flat"
+                )
+                spec = "Flat"
+        # Dropped before saving, so an interrupted save forces a full rebuild.
+        manifest.remove()
+        cls.save(store, spec)
+        manifest.save()
+        return store
+
+    def build_sharded(
+        cls,
+        paths: List[str],
+        full: bool = False,
+        root: str = None,
+        incremental: bool = False,
+        shard_chunks: int = SHARD_CHUNKS,
+    ) -> ShardedStore:
+        """
+        Builds the index of the given directories as shards, one per
+        top-level folder of root or per shard_chunks estimated chunks.
+
+        Each shard is a store of its own in SHARDS_DIR, built in a worker
+        process, and SHARDS_FILE lists them. Workers embed independently, so
+        each of them is held to the embedding rate limits on its own. An
+        incremental build only re-indexes the changed files of each shard.
+
+        Args:
+            paths (List[str]): The directories to index.
+            full (bool): Whether to do a full preparation.
+            root (str): The source root, name_path by default.
+            incremental (bool): Whether to only index the changed files.
+            shard_chunks (int): The estimated chunks per shard, or 0 for one
+            shard per top-level folder.
+
+        Returns:
+            ShardedStore: The saved store.
+        """
+        root = root or cls.name_path
+        for path in paths:
+            cls.clean(path)
+        plan = plan_shards(
+            (file for path in paths for file in cls.walk_files(path)),
+            root,
+            shard_chunks,
+            CHUNK_SIZE,
+        )
+        shards_path = os.path.join(cls.name_version_path, SHARDS_DIR)
+        # Incremental builds update the shards in place, others are built
+        # next to the saved shards and replace them once all are built.
+        build_path = (
+            shards_path
+            if incremental
+            else tempfile.mkdtemp(prefix=".shards-", dir=cls.name_version_path)
         )
-        logger.info(len(cls.splited_docs))
-        logger.info(len(cls.splited_metadatas))
-        logger.debug(cls.splited_docs)
-        return FAISS.from_texts(
-            cls.splited_docs, embedding=embedder, metadatas=cls.splited_metadatas
+        files = sum(map(len, plan.values()))
+        logger.info(f"SHARDS: {len(plan)} shards of {files} files")
+        os.makedirs(build_path, exist_ok=True)
+        try:
+            work = [
+                (name, cls.shard_client(os.path.join(build_path, name), files), files)
+                for name, files in plan.items()
+            ]
+            if cls.workers <= 1 or len(work) <= 1:
+                chunks = {
+                    name: build_shard(client, files, root, incremental)
+                    for name, client, files in work
+                }
+            else:
+                workers = min(cls.workers, len(work))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        (
+                            name,
+                            executor.submit(
+                                build_shard, client, files, root, incremental
+                            ),
+                        )
+                        for name, client, files in work
+                    ]
+                    chunks = {name: future.result() for name, future in futures}
+            shards = [
+                {"name": name, "chunks": count}
+                for name, count in chunks.items()
+                if count
+            ]
+            names = {shard["name"] for shard in shards}
+            for name in os.listdir(build_path):
+                if name not in names:
+                    shutil.rmtree(os.path.join(build_path, name), ignore_errors=True)
+            if not incremental:
+                old_path = f"{build_path}.old"
+                if os.path.exists(shards_path):
+                    os.rename(shards_path, old_path)
+                os.rename(build_path, shards_path)
+                shutil.rmtree(old_path, ignore_errors=True)
+        finally:
+            if not incremental:
+                shutil.rmtree(build_path, ignore_errors=True)
+        logger.info(f"SHARDS: {len(shards)} built, {sum(chunks.values())} chunks")
+        cls.save_shards(shards)
+        return VectorStore("local", load_mode="mmap").load_sharded(
+            cls.name_version_path, cls.get_embedder()
         )
 
+    def shard_client(cls, path: str, files: List[str]) -> "BaseIndexClient":
+        """
+        Copies the client to build one shard in a worker process.
+
+        Args:
+            path (str): The shard directory.
+            files (List[str]): The files of the shard.
+
+        Returns:
+            BaseIndexClient: A local client saving to the shard directory.
+        """
+        client = copy.copy(cls)
+        client.__dict__.pop("storage_client", None)
+        client.__dict__.pop("bucket", None)
+        client.storage_type = "local"
+        client.workers = 1
+        client.name_version_path = path
+        client.file_kinds = {
+            file: cls.file_kinds[file] for file in files if file in cls.file_kinds
+        }
+        os.makedirs(path, exist_ok=True)
+        return client
+
+    def save_shards(cls, shards: List[Dict[str, Any]]):
+        """
+        Writes the shard list and uploads the shards for gcs storage.
+
+        Args:
+            shards (List[Dict[str, Any]]): The name and chunks of each shard.
+        """
+        write_shards(cls.name_version_path, shards)
+        if cls.storage_type == "gcs":
+            logger.info("SAVING GCS SHARDS")
+            prefix = f"{cls.name}/{cls.version}"
+            for shard in shards:
+                cls.upload_store(
+                    os.path.join(cls.name_version_path, SHARDS_DIR, shard["name"]),
+                    f"{prefix}/{SHARDS_DIR}/{shard['name']}",
+                )
+            # Uploaded last, so readers never see a shard before it is complete.
+            upload_file(
+                cls.bucket,
+                f"{prefix}/{SHARDS_FILE}",
+                os.path.join(cls.name_version_path, SHARDS_FILE),
+            )
+
     def save(
         cls,
         store: FAISS = None,
+        spec: str = None,
     ):
-        if cls.storage_type == "local":
+        """
+        Saves a store to name_version_path and uploads it for gcs storage.
+
+        Args:
+            store (FAISS): The store to save, or None if it was already written
+            to name_version_path.
+            spec (str): The index factory spec the store's index was built
+            from, if any.
+        """
+        if store is not None:
             logger.info("SAVING LOCAL FAISS")
-            store.save_local(cls.name_version_path)
-            return
+            save_store(
+                cls.name_version_path,
+                store.index,
+                store.docstore,
+                store.index_to_docstore_id,
+                spec,
+            )
 
         if cls.storage_type == "gcs":
             logger.info("SAVING GCS FAISS")
-            data_byte_array = pickle.dumps((store.docstore, store.index_to_docstore_id))
-            blob: Blob = cls.bucket.blob(f"{cls.name}/{cls.version}/index.pkl")
-            blob.upload_from_string(data_byte_array)
-            temp_file_name = "/tmp/index.faiss"
-            faiss.write_index(store.index, temp_file_name)
-            blob: Blob = cls.bucket.blob(f"{cls.name}/{cls.version}/index.faiss")
-            blob.upload_from_filename(temp_file_name)
-            return
+            prefix = f"{cls.name}/{cls.version}"
+            cls.upload_store(cls.name_version_path, prefix)
+            # A shard list left by a sharded build would shadow this store.
+            try:
+                cls.bucket.blob(f"{prefix}/{SHARDS_FILE}").delete()
+            except NotFound:
+                pass
+
+    def upload_store(cls, path: str, prefix: str):
+        """
+        Uploads a saved store to the index bucket.
+
+        Args:
+            path (str): The directory of the store.
+            prefix (str): The bucket prefix to upload to.
+        """
+        files = [
+            (
+                f"{prefix}/{DOCSTORE_DIR}/{file_name}",
+                os.path.join(path, DOCSTORE_DIR, file_name),
+            )
+            for file_name in DOCSTORE_FILES
+        ] + [
+            (f"{prefix}/{file_name}", os.path.join(path, file_name))
+            for file_name in ["index.faiss", PARAMS_FILE]
+        ]
+        upload_files(cls.bucket, files)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+import mmap
+import struct
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+CHUNK_LOG_FILE: str = "chunks.log"
+CHUNK_OFFSETS_FILE: str = "chunks.idx"
+LOG_BUFFER_BYTES: int = 1024 * 1024
+# Each record is the byte lengths of its JSON header and text, then both.
+RECORD_HEADER = struct.Struct("<II")
+
+Chunk = Tuple[str, Dict[str, Any], str]
+
+
+class ChunkLogWriter(object):
+    """
+    Appends chunks to a length-prefixed log with an offset index.
+
+    Each batch is encoded into one buffer and written with a single call,
+    followed by the int64 offset of each record. A new log is written
+    next to the old one and replaces it on close, or is discarded if the
+    block raised. With ``append`` records are added to the existing log,
+    and later records for a chunk id supersede earlier ones.
+
+    Attributes:
+        path (str): The directory of the log.
+        records (int): The number of records written.
+    """
+
+    def __init__(cls, path: str, append: bool = False) -> None:
+        cls.path = path
+        cls.append_only = append
+        cls.records = 0
+        suffix = "" if append else ".tmp"
+        os.makedirs(path, exist_ok=True)
+        cls.log_path = os.path.join(path, CHUNK_LOG_FILE + suffix)
+        cls.offsets_path = os.path.join(path, CHUNK_OFFSETS_FILE + suffix)
+        mode = "ab" if append else "wb"
+        cls.log = open(cls.log_path, mode, buffering=LOG_BUFFER_BYTES)
+        cls.offsets = open(cls.offsets_path, mode)
+        cls.offset = cls.log.seek(0, os.SEEK_END)
+
+    def __enter__(cls) -> "ChunkLogWriter":
+        return cls
+
+    def __exit__(cls, exc_type: Any, *args: Any) -> None:
+        if exc_type is None:
+            cls.close()
+        else:
+            cls.log.close()
+            cls.offsets.close()
+            if not cls.append_only:
+                os.remove(cls.log_path)
+                os.remove(cls.offsets_path)
+
+    def append(cls, chunks: List[Chunk], root: str) -> None:
+        """
+        Writes a batch of chunks.
+
+        Args:
+            chunks (List[Chunk]): The (text, metadata, id) of each chunk.
+            root (str): The indexed root the chunk sources are relative to.
+        """
+        cls.write(
+            (
+                {
+                    "id": _id,
+                    "path": os.path.join(root, metadata["source"]),
+                    "source": metadata["source"],
+                    "chunk_index": metadata["chunk_index"],
+                },
+                text,
+            )
+            for text, metadata, _id in chunks
+        )
+
+    def write(cls, records: Iterable[Tuple[Dict[str, Any], str]]) -> None:
+        """
+        Writes a batch of records, such as those read from another log.
+
+        Args:
+            records (Iterable[Tuple[Dict[str, Any], str]]): The header and
+            text of each record.
+        """
+        buffer = bytearray()
+        offsets = array("q")
+        for record, text in records:
+            header = json.dumps(record).encode("utf-8")
+            data = text.encode("utf-8")
+            offsets.append(cls.offset + len(buffer))
+            buffer += RECORD_HEADER.pack(len(header), len(data))
+            buffer += header
+            buffer += data
+        cls.log.write(buffer)
+        cls.offset += len(buffer)
+        # The log is flushed first, so every indexed offset points at a
+        # complete record.
+        cls.log.flush()
+        offsets.tofile(cls.offsets)
+        cls.offsets.flush()
+        cls.records += len(offsets)
+
+    def close(cls) -> None:
+        cls.log.close()
+        cls.offsets.close()
+        if not cls.append_only:
+            os.replace(cls.offsets_path, os.path.join(cls.path, CHUNK_OFFSETS_FILE))
+            os.replace(cls.log_path, os.path.join(cls.path, CHUNK_LOG_FILE))
+
+
+class ChunkLog(object):
+    """
+    Reads a chunk log, by record number or by chunk id, through mmap.
+    """
+
+    def __init__(cls, path: str) -> None:
+        cls.offsets = np.fromfile(
+            os.path.join(path, CHUNK_OFFSETS_FILE), dtype=np.int64
+        )
+        with open(os.path.join(path, CHUNK_LOG_FILE), "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            cls.data = (
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            )
+        cls.rows: Dict[str, int] = None
+
+    def __len__(cls) -> int:
+        return len(cls.offsets)
+
+    def header(cls, row: int) -> Tuple[Dict[str, Any], int, int]:
+        offset = int(cls.offsets[row])
+        header_size, text_size = RECORD_HEADER.unpack_from(cls.data, offset)
+        start = offset + RECORD_HEADER.size
+        header = json.loads(bytes(cls.data[start : start + header_size]))
+        return header, start + header_size, text_size
+
+    def __getitem__(cls, row: int) -> Dict[str, Any]:
+        """
+        Reads one record.
+
+        Args:
+            row (int): The record number.
+
+        Returns:
+            Dict[str, Any]: The ``id``, ``path``, ``source``, ``chunk_index``
+            and ``text`` of the chunk.
+        """
+        record, start, text_size = cls.header(row)
+        record["text"] = bytes(cls.data[start : start + text_size]).decode("utf-8")
+        return record
+
+    def __iter__(cls) -> Iterator[Dict[str, Any]]:
+        for row in range(len(cls)):
+            yield cls[row]
+
+    def get(cls, _id: str) -> Dict[str, Any]:
+        """
+        Reads the latest record of a chunk id.
+
+        Args:
+            _id (str): The chunk id.
+
+        Returns:
+            Dict[str, Any]: The record, or None if the id was never logged.
+        """
+        if cls.rows is None:
+            cls.rows = {cls.header(row)[0]["id"]: row for row in range(len(cls))}
+        row = cls.rows.get(_id)
+        return None if row is None else cls[row]
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import openai
+from dotenv import load_dotenv
+
+from langchain_core.embeddings import Embeddings
+
+from athenah_ai.client.pool import get_openai
+from athenah_ai.client.tokenizer import count_tokens_batch
+from athenah_ai.logger import logger
+
+load_dotenv()
+
+DEFAULT_EMBEDDING_MODEL: str = "text-embedding-ada-002"
+EMBED_CONCURRENCY: int = int(os.environ.get("EMBED_CONCURRENCY", 8))
+EMBED_RPM: float = float(os.environ.get("EMBED_RPM", 3000))
+EMBED_TPM: float = float(os.environ.get("EMBED_TPM", 1000000))
+EMBED_REQUEST_TOKENS: int = int(os.environ.get("EMBED_REQUEST_TOKENS", 16384))
+EMBED_REQUEST_INPUTS: int = 2048
+EMBED_MAX_RETRIES: int = int(os.environ.get("EMBED_MAX_RETRIES", 6))
+EMBED_RETRY_BASE: float = float(os.environ.get("EMBED_RETRY_BASE", 0.5))
+EMBED_RETRY_MAX: float = float(os.environ.get("EMBED_RETRY_MAX", 30))
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket(object):
+    """
+    A thread-safe token bucket refilled continuously at ``per_minute``.
+
+    Attributes:
+        rate (float): The refill rate, in tokens per second.
+        capacity (float): The bucket size, one minute of tokens by default.
+    """
+
+    def __init__(cls, per_minute: float, capacity: float = None) -> None:
+        cls.rate = per_minute / 60.0
+        cls.capacity = capacity or per_minute
+        cls.tokens = cls.capacity
+        cls.updated = time.monotonic()
+        cls.lock = threading.Lock()
+
+    def acquire(cls, amount: float = 1.0) -> float:
+        """
+        Takes tokens from the bucket, waiting until enough have accrued.
+
+        Amounts over the capacity wait for a full bucket.
+
+        Args:
+            amount (float): The number of tokens.
+
+        Returns:
+            float: The seconds spent waiting.
+        """
+        if cls.rate <= 0:
+            return 0.0
+        amount = min(amount, cls.capacity)
+        waited = 0.0
+        while True:
+            with cls.lock:
+                now = time.monotonic()
+                cls.tokens = min(
+                    cls.capacity, cls.tokens + (now - cls.updated) * cls.rate
+                )
+                cls.updated = now
+                if cls.tokens >= amount:
+                    cls.tokens -= amount
+                    return waited
+                wait = (amount - cls.tokens) / cls.rate
+            time.sleep(wait)
+            waited += wait
+
+
+# Rate limits are per account, so schedulers for the same endpoint share them.
+buckets: Dict[Tuple, Tuple[TokenBucket, TokenBucket]] = {}
+buckets_lock = threading.Lock()
+
+
+def shared_buckets(
+    key: Tuple, rpm: float, tpm: float
+) -> Tuple[TokenBucket, TokenBucket]:
+    with buckets_lock:
+        key = key + (rpm, tpm)
+        if key not in buckets:
+            buckets[key] = (TokenBucket(rpm), TokenBucket(tpm))
+        return buckets[key]
+
+
+def pack_batches(
+    token_counts: List[int],
+    max_tokens: int = EMBED_REQUEST_TOKENS,
+    max_inputs: int = EMBED_REQUEST_INPUTS,
+) -> List[Tuple[int, int]]:
+    """
+    Packs consecutive texts into requests by token count.
+
+    Args:
+        token_counts (List[int]): The token count of each text.
+        max_tokens (int): The token budget of a request.
+        max_inputs (int): The maximum number of texts in a request.
+
+    Returns:
+        List[Tuple[int, int]]: The (start, end) of each request, in order. A
+        text over the budget gets a request of its own.
+    """
+    batches: List[Tuple[int, int]] = []
+    start = 0
+    tokens = 0
+    for i, count in enumerate(token_counts):
+        if i > start and (tokens + count > max_tokens or i - start >= max_inputs):
+            batches.append((start, i))
+            start = i
+            tokens = 0
+        tokens += count
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
+
+
+def retry_delay(error: Exception, attempt: int, base: float, cap: float) -> float:
+    """
+    Returns how long to wait before retrying a failed request.
+
+    The server's Retry-After is honoured when given, otherwise the delay is
+    drawn uniformly up to an exponentially growing bound (full jitter).
+
+    Args:
+        error (Exception): The error of the failed request.
+        attempt (int): The number of attempts made so far.
+        base (float): The bound of the first retry, in seconds.
+        cap (float): The largest bound, in seconds.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(float(response.headers.get("retry-after")), cap)
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class ScheduledEmbeddings(Embeddings):
+    """
+    Embeds documents with concurrent, rate-limited requests.
+
+    Texts are packed into requests of at most ``max_request_tokens`` tokens,
+    which run on up to ``concurrency`` threads. Each request waits on shared
+    requests-per-minute and tokens-per-minute buckets, and rate limits,
+    connection errors and server errors are retried with jittered backoff.
+    Vectors are returned in the order of the texts.
+
+    Attributes:
+        model (str): The embedding model.
+        requests (int): The number of requests sent, including retries.
+        retries (int): The number of failed requests that were retried.
+        throttled (float): The seconds spent waiting on the rate limits.
+    """
+
+    def __init__(
+        cls,
+        model: str = None,
+        api_key: str = None,
+        base_url: str = None,
+        concurrency: int = EMBED_CONCURRENCY,
+        rpm: float = EMBED_RPM,
+        tpm: float = EMBED_TPM,
+        max_request_tokens: int = EMBED_REQUEST_TOKENS,
+        max_retries: int = EMBED_MAX_RETRIES,
+        retry_base: float = EMBED_RETRY_BASE,
+        retry_max: float = EMBED_RETRY_MAX,
+    ) -> None:
+        cls.model = model or DEFAULT_EMBEDDING_MODEL
+        cls.client = get_openai(api_key, base_url).with_options(max_retries=0)
+        cls.concurrency = concurrency
+        cls.max_request_tokens = max_request_tokens
+        cls.max_retries = max_retries
+        cls.retry_base = retry_base
+        cls.retry_max = retry_max
+        cls.request_bucket, cls.token_bucket = shared_buckets(
+            (api_key, base_url, cls.model), rpm, tpm
+        )
+        cls.requests = 0
+        cls.retries = 0
+        cls.throttled = 0.0
+        cls.lock = threading.Lock()
+
+    def embed_batch(cls, texts: List[str], tokens: int) -> List[List[float]]:
+        attempt = 0
+        while True:
+            throttled = cls.request_bucket.acquire(1)
+            throttled += cls.token_bucket.acquire(tokens)
+            with cls.lock:
+                cls.requests += 1
+                cls.throttled += throttled
+            try:
+                response = cls.client.embeddings.create(model=cls.model, input=texts)
+                return [item.embedding for item in response.data]
+            except RETRYABLE_ERRORS as e:
+                if attempt >= cls.max_retries:
+                    raise
+                delay = retry_delay(e, attempt, cls.retry_base, cls.retry_max)
+                logger.info(f"EMBEDDINGS RETRY {attempt + 1} IN {delay:.2f}s: {e}")
+                with cls.lock:
+                    cls.retries += 1
+                attempt += 1
+                time.sleep(delay)
+
+    def embed_documents(cls, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start = time.perf_counter()
+        counts = count_tokens_batch(texts, cls.model)
+        batches = pack_batches(counts, cls.max_request_tokens)
+        results: List[List[List[float]]]
+        if len(batches) == 1 or cls.concurrency <= 1:
+            results = [
+                cls.embed_batch(texts[i:j], sum(counts[i:j])) for i, j in batches
+            ]
+        else:
+            workers = min(cls.concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(cls.embed_batch, texts[i:j], sum(counts[i:j]))
+                    for i, j in batches
+                ]
+                results = [future.result() for future in futures]
+        logger.info(
+            f"EMBEDDINGS: {len(texts)} texts, {sum(counts)} tokens, "
+            f"{len(batches)} requests in {time.perf_counter() - start:.2f}s"
+        )
+        return [vector for result in results for vector in result]
+
+    def embed_query(cls, text: str) -> List[float]:
+        return cls.embed_documents([text])[0]
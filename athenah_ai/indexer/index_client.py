@@ -2,7 +2,7 @@
 # coding: utf-8
 
 import os
-from typing import List, Union
+from typing import Dict, List, Tuple, Union
 import shutil
 from shutil import ignore_patterns
 
@@ -10,7 +10,14 @@ from basedir import basedir
 
 from langchain_community.vectorstores import FAISS
 
-from athenah_ai.indexer.base_index_client import BaseIndexClient
+from athenah_ai.client.index_spec import INDEX_SPEC
+from athenah_ai.client.vector_store import VectorStore, has_shards, read_shards
+from athenah_ai.indexer.base_index_client import BaseIndexClient, PREPARE_WORKERS
+from athenah_ai.indexer.manifest import Manifest
+from athenah_ai.indexer.merge import compact_index, merge_indexes
+from athenah_ai.indexer.shards import remove_shards
+from athenah_ai.indexer.snapshot import IGNORE_PATTERNS
+from athenah_ai.logger import logger
 
 
 class IndexClient(BaseIndexClient):
@@ -21,7 +28,14 @@ class IndexClient(BaseIndexClient):
     version: str = ""
 
     def __init__(
-        cls, storage_type: str, id: str, dir: str, name: str, version: str = "v1"
+        cls,
+        storage_type: str,
+        id: str,
+        dir: str,
+        name: str,
+        version: str = "v1",
+        workers: int = PREPARE_WORKERS,
+        index_spec: str = INDEX_SPEC,
     ) -> None:
         cls.storage_type = storage_type
         cls.id = id
@@ -36,7 +50,15 @@ class IndexClient(BaseIndexClient):
         )
         os.makedirs(cls.base_path, exist_ok=True)
         os.makedirs(cls.name_path, exist_ok=True)
-        super().__init__(cls.storage_type, cls.id, cls.dir, cls.name, cls.version)
+        super().__init__(
+            cls.storage_type,
+            cls.id,
+            cls.dir,
+            cls.name,
+            cls.version,
+            workers,
+            index_spec,
+        )
 
     def remove(cls, dest: str, is_dir: bool = False):
         if is_dir:
@@ -50,16 +72,7 @@ class IndexClient(BaseIndexClient):
                 source,
                 dest,
                 dirs_exist_ok=True,
-                ignore=ignore_patterns(
-                    "node_modules*",
-                    "dist*",
-                    "build*",
-                    ".git*",
-                    ".venv*",
-                    ".vscode*",
-                    "__pycache__*",
-                    "poetry.lock",
-                ),
+                ignore=ignore_patterns(*IGNORE_PATTERNS),
             )
         else:
             os.makedirs(dest, exist_ok=True)
@@ -67,18 +80,108 @@ class IndexClient(BaseIndexClient):
             shutil.copyfile(source, f"{dest}/{file_name}")
 
     def build(
-        cls, name: str, folders: Union[List[str], str] = None, full: bool = False
+        cls,
+        name: str,
+        folders: Union[List[str], str] = None,
+        full: bool = False,
+        incremental: bool = False,
+        root: str = None,
+        sharded: bool = False,
     ):
+        """
+        Builds the index of a source tree.
+
+        Args:
+            name (str): The directory of the source under name_path.
+            folders (Union[List[str], str]): The folders of the source to
+            index, or None for all of it. Without a source directory, all of
+            name_path is indexed.
+            full (bool): Whether to do a full preparation.
+            incremental (bool): Whether to only index the changed files.
+            root (str): The source directory to index in place instead of
+            the copy under name_path.
+            sharded (bool): Whether to build one shard per top-level folder,
+            or per SHARD_CHUNKS chunks, in parallel.
+
+        Returns:
+            FAISS: The store.
+        """
+        cls.source_path = os.path.join(cls.name_path, name)
+        # Chunk sources, ids and manifest keys are relative to the source, so
+        # a copy, a snapshot and the source itself give the same index.
         if type(folders) is list:
-            build_paths: List[str] = [f"{cls.name_path}/{name}/{f}" for f in folders]
-            store: FAISS = cls.build_batch(build_paths, full)
-            cls.save(store)
-            return store
+            root = root or cls.source_path
+            build_paths: List[str] = [os.path.join(root, f) for f in folders]
         elif type(folders) is str or not folders:
-            cls.clean(cls.name_path)
-            cls.prepare(cls.name_path, full)
-            store: FAISS = cls.build_one()
-            cls.save(store)
-            return store
+            if not root:
+                root = (
+                    cls.source_path
+                    if os.path.isdir(cls.source_path)
+                    else cls.name_path
+                )
+            build_paths = [root]
+        else:
+            raise ValueError(f"unimplemented: {len(folders)}")
+
+        if sharded:
+            return cls.build_sharded(build_paths, full, root, incremental)
+        if incremental:
+            store = cls.build_incremental(build_paths, full, root)
+        else:
+            Manifest(cls.name_version_path).remove()
+            store = cls.build_batch(build_paths, full, root)
+        remove_shards(cls.name_version_path)
+        return store
+
+    def merge(cls, sources: List[Tuple[str, str]], dedup: bool = True) -> FAISS:
+        """
+        Replaces this index with the merge of other saved indexes in the same
+        dir, copying their vectors and documents without embedding them.
 
-        raise ValueError(f"unimplemented: {len(folders)}")
+        Args:
+            sources (List[Tuple[str, str]]): The (name, version) of each index.
+            dedup (bool): Whether to drop chunks by content hash.
+
+        Returns:
+            FAISS: The merged store.
+        """
+        paths: List[str] = [
+            os.path.join(cls.base_path, f"{name}-{version}")
+            for name, version in sources
+        ]
+        stats: Dict[str, int] = merge_indexes(
+            paths, cls.name_version_path, cls.index_spec, dedup
+        )
+        logger.info(f"MERGE: {stats['chunks']} chunks, {stats['duplicates']} dropped")
+        Manifest(cls.name_version_path).remove()
+        remove_shards(cls.name_version_path)
+        cls.save()
+        return VectorStore("local", load_mode="mmap").load_compact(
+            cls.name_version_path, cls.get_embedder()
+        )
+
+    def compact(cls, spec: str = None, dedup: bool = False) -> FAISS:
+        """
+        Compacts this index in place, dropping deleted and superseded chunks,
+        so search and memory costs come back down after incremental builds.
+
+        Args:
+            spec (str): The FAISS index factory spec to rebuild the index
+            from, by default the one it was built from.
+            dedup (bool): Whether to drop chunks by content hash, which makes
+            the next incremental build a full one, as a spec whose index
+            cannot remove chunks, such as HNSW, does.
+
+        Returns:
+            FAISS: The compacted store.
+        """
+        stats: Dict[str, int] = compact_index(cls.name_version_path, spec, dedup)
+        logger.info(
+            f"COMPACT: {stats['chunks']} chunks, {stats['duplicates']} dropped"
+        )
+        store = VectorStore("local", load_mode="mmap")
+        if has_shards(cls.name_version_path):
+            cls.save_shards(read_shards(cls.name_version_path))
+            return store.load_sharded(cls.name_version_path, cls.get_embedder())
+        cls.save()
+        return store.load_compact(cls.name_version_path, cls.get_embedder())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import codecs
+from typing import List
+
+from charset_normalizer import from_bytes
+from langchain_community.document_loaders import UnstructuredFileLoader
+from langchain_core.documents import Document
+
+from athenah_ai.indexer.scanner import FILE_TEXT, classify_file
+
+BINARY_SNIFF_BYTES: int = 8192
+UTF16_BOMS = (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+
+def decode_text(data: bytes) -> str:
+    """
+    Decodes file contents, trying UTF-8 before detecting the encoding.
+
+    Args:
+        data (bytes): The file contents.
+
+    Returns:
+        str: The decoded text, or None if the contents look binary.
+    """
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        pass
+    if b"\x00" in data[:BINARY_SNIFF_BYTES] and not data.startswith(UTF16_BOMS):
+        return None
+    match = from_bytes(data).best()
+    if match is None:
+        return None
+    return str(match)
+
+
+def load_text(path: str) -> List[Document]:
+    """
+    Loads a code or text file with a single read.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        List[Document]: The file as one document, or none if it is binary.
+    """
+    with open(path, "rb") as file:
+        text = decode_text(file.read())
+    if text is None:
+        return []
+    return [Document(page_content=text, metadata={"source": path})]
+
+
+def load_document(path: str, kind: str = None) -> List[Document]:
+    """
+    Loads a file, decoding code and text natively and partitioning rich
+    formats with unstructured.
+
+    Args:
+        path (str): The path of the file.
+        kind (str): The kind of the file, classified when not given.
+
+    Returns:
+        List[Document]: The loaded documents, with the path as ``source``.
+    """
+    if (kind or classify_file(path)) == FILE_TEXT:
+        return load_text(path)
+    return UnstructuredFileLoader(path).load()
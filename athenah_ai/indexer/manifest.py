@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+from hashlib import blake2b
+from typing import Dict, List, Tuple
+
+MANIFEST_FILE: str = "manifest.json"
+MANIFEST_FORMAT: int = 1
+HASH_BLOCK_SIZE: int = 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    """
+    Hashes the contents of a file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: The hex digest of the file contents.
+    """
+    digest = blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Manifest(object):
+    """
+    Records the content hash and chunk ids of every file in a saved index.
+
+    Attributes:
+        path (str): The directory of the saved index.
+        files (Dict[str, Dict]): Maps each file path, relative to the indexed
+        root, to its ``hash`` and the ``ids`` of its chunks.
+    """
+
+    def __init__(cls, path: str) -> None:
+        cls.path = path
+        cls.files: Dict[str, Dict] = {}
+
+    @property
+    def file_path(cls) -> str:
+        return os.path.join(cls.path, MANIFEST_FILE)
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        manifest = cls(path)
+        if os.path.exists(manifest.file_path):
+            with open(manifest.file_path) as file:
+                data = json.load(file)
+            if data.get("format") == MANIFEST_FORMAT:
+                manifest.files = data["files"]
+        return manifest
+
+    def save(cls) -> None:
+        os.makedirs(cls.path, exist_ok=True)
+        tmp_path = f"{cls.file_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"format": MANIFEST_FORMAT, "files": cls.files}, file)
+        os.replace(tmp_path, cls.file_path)
+
+    def remove(cls) -> None:
+        if os.path.exists(cls.file_path):
+            os.remove(cls.file_path)
+
+    def diff(
+        cls, hashes: Dict[str, str]
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Compares the current file hashes against the manifest.
+
+        Args:
+            hashes (Dict[str, str]): The content hash of each current file.
+
+        Returns:
+            Tuple[List[str], List[str], List[str]]: The added, changed and
+            removed files, each sorted.
+        """
+        added = sorted(f for f in hashes if f not in cls.files)
+        changed = sorted(
+            f for f in hashes if f in cls.files and cls.files[f]["hash"] != hashes[f]
+        )
+        removed = sorted(f for f in cls.files if f not in hashes)
+        return added, changed, removed
+
+    def ids(cls, files: List[str]) -> List[str]:
+        return [_id for f in files for _id in cls.files[f]["ids"]]
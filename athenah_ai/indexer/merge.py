@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+from hashlib import blake2b
+from typing import Any, Dict, List, Set, Tuple
+
+import faiss
+import numpy as np
+
+from athenah_ai.client.docstore import (
+    StoreWriter,
+    has_docstore,
+    load_docstore,
+    store_lock,
+)
+from athenah_ai.client.index_spec import ADD_BLOCK_SIZE, load_spec, supports_removal
+from athenah_ai.client.vector_store import (
+    MMAP_IO_FLAGS,
+    SHARDS_DIR,
+    has_shards,
+    read_shards,
+    write_shards,
+)
+from athenah_ai.indexer.chunk_log import CHUNK_LOG_FILE, ChunkLog, ChunkLogWriter
+from athenah_ai.indexer.manifest import Manifest
+from athenah_ai.logger import logger
+
+
+def store_paths(path: str) -> List[str]:
+    """
+    Lists the stores of a saved index, one per shard for a sharded index.
+
+    Args:
+        path (str): The directory of the saved index.
+
+    Returns:
+        List[str]: The store directories.
+    """
+    if has_shards(path):
+        return [
+            os.path.join(path, SHARDS_DIR, shard["name"]) for shard in read_shards(path)
+        ]
+    if not has_docstore(path):
+        raise ValueError(f"unimplemented: no compact store in {path}")
+    return [path]
+
+
+def read_vectors(path: str) -> Any:
+    """
+    Reads an index so its vectors can be reconstructed by position.
+
+    Args:
+        path (str): The directory of the store.
+
+    Returns:
+        Any: The FAISS index.
+    """
+    index = faiss.read_index(os.path.join(path, "index.faiss"))
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index
+
+
+def merge_indexes(
+    sources: List[str], dest: str, spec: str = "Flat", dedup: bool = True
+) -> Dict[str, int]:
+    """
+    Merges saved indexes into a new one without embedding anything.
+
+    Vectors are reconstructed from the source indexes and copied with their
+    docstore entries and chunk log records into a store written from
+    ``spec``, with positions renumbered densely. Vectors of PQ and other
+    lossy indexes are their decoded approximations. With ``dedup``, chunks
+    whose text was already copied are dropped. Chunks keep their ids, except
+    that a chunk whose id was already copied, such as the positional ids of
+    converted stores, is given a new one.
+
+    The destination may be one of the sources, which compacts it: the new
+    store replaces the old one once it is complete.
+
+    Args:
+        sources (List[str]): The directories of the saved indexes.
+        dest (str): The directory to save the merged index to.
+        spec (str): The FAISS index factory spec of the merged index.
+        dedup (bool): Whether to drop chunks by content hash.
+
+    Returns:
+        Dict[str, int]: The number of ``chunks`` kept and of ``duplicates``
+        dropped.
+    """
+    paths = [path for source in sources for path in store_paths(source)]
+    hashes: Set[bytes] = set()
+    ids: Set[str] = set()
+    kept = duplicates = 0
+    dim = None
+    with StoreWriter(dest, spec) as writer:
+        with ChunkLogWriter(dest) as log:
+            for path in paths:
+                with store_lock(path):
+                    index = read_vectors(path)
+                    docstore, _ = load_docstore(path, mmap=True)
+                if dim is not None and index.d != dim:
+                    raise ValueError(f"dimension {index.d} of {path} is not {dim}")
+                dim = index.d
+                chunk_log = (
+                    ChunkLog(path)
+                    if os.path.exists(os.path.join(path, CHUNK_LOG_FILE))
+                    else None
+                )
+                for start in range(0, index.ntotal, ADD_BLOCK_SIZE):
+                    count = min(ADD_BLOCK_SIZE, index.ntotal - start)
+                    vectors = index.reconstruct_n(start, count)
+                    rows: List[int] = []
+                    texts: List[str] = []
+                    metadatas: List[Dict[str, Any]] = []
+                    records: List[Tuple[Dict[str, Any], str]] = []
+                    for row in range(start, start + count):
+                        _id = str(docstore.ids[row])
+                        doc = docstore.document(row)
+                        digest = blake2b(
+                            doc.page_content.encode("utf-8"), digest_size=16
+                        ).digest()
+                        if dedup and digest in hashes:
+                            duplicates += 1
+                            continue
+                        hashes.add(digest)
+                        record, text = chunk_record(chunk_log, _id, doc)
+                        if _id in ids:
+                            record["id"] = unique_id(_id, path, ids)
+                        ids.add(record["id"])
+                        rows.append(row - start)
+                        texts.append(doc.page_content)
+                        metadatas.append(doc.metadata)
+                        records.append((record, text))
+                    if rows:
+                        writer.add(
+                            vectors[np.asarray(rows)],
+                            texts,
+                            metadatas,
+                            [record["id"] for record, _ in records],
+                        )
+                        log.write(records)
+                        kept += len(rows)
+                logger.info(f"MERGED: {path}, {kept} chunks, {duplicates} duplicates")
+    return {"chunks": kept, "duplicates": duplicates}
+
+
+def unique_id(_id: str, path: str, ids: Set[str]) -> str:
+    """
+    Derives a new int64 id for a chunk whose id was already used by another
+    store.
+
+    Args:
+        _id (str): The chunk id in its store.
+        path (str): The directory of the store.
+        ids (Set[str]): The ids already used.
+
+    Returns:
+        str: An unused id as a decimal string.
+    """
+    salt = 0
+    while True:
+        digest = blake2b(f"{path}:{_id}:{salt}".encode("utf-8"), digest_size=8)
+        new_id = str(int.from_bytes(digest.digest(), "big") & (2**63 - 1))
+        if new_id not in ids:
+            return new_id
+        salt += 1
+
+
+def chunk_record(
+    chunk_log: ChunkLog, _id: str, doc: Any
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Reads the chunk log record of a chunk, or rebuilds it from the document
+    when the source has no log or the log does not have the chunk.
+
+    Args:
+        chunk_log (ChunkLog): The log of the source, or None.
+        _id (str): The chunk id.
+        doc (Document): The chunk document.
+
+    Returns:
+        Tuple[Dict[str, Any], str]: The record header and text.
+    """
+    record = chunk_log.get(_id) if chunk_log is not None else None
+    if record is None:
+        source = doc.metadata.get("source")
+        record = {
+            "id": _id,
+            "path": source,
+            "source": source,
+            "chunk_index": doc.metadata.get("chunk_index"),
+            "text": doc.page_content,
+        }
+    text = record.pop("text")
+    return record, text
+
+
+def compact_index(path: str, spec: str = None, dedup: bool = False) -> Dict[str, int]:
+    """
+    Rewrites a saved index in place, after incremental deletions or to
+    rebuild it from another spec.
+
+    The index, docstore and id maps are rewritten densely, and chunk log
+    records that were superseded or deleted are dropped. Each shard of a
+    sharded index is compacted on its own. Without ``dedup`` chunk ids are
+    unchanged, so incremental builds carry on from the manifest. With it, or
+    when the new index cannot remove chunks, as HNSW indexes cannot, the
+    manifest is removed and the next incremental build is a full one.
+
+    Args:
+        path (str): The directory of the saved index.
+        spec (str): The FAISS index factory spec, by default the one the
+        index was built from, or Flat.
+        dedup (bool): Whether to drop chunks by content hash.
+
+    Returns:
+        Dict[str, int]: The number of ``chunks`` kept and of ``duplicates``
+        dropped.
+    """
+    if has_shards(path):
+        shards = read_shards(path)
+        stats = {"chunks": 0, "duplicates": 0}
+        for shard in shards:
+            shard_stats = compact_index(
+                os.path.join(path, SHARDS_DIR, shard["name"]), spec, dedup
+            )
+            shard["chunks"] = shard_stats["chunks"]
+            for key, value in shard_stats.items():
+                stats[key] += value
+        write_shards(path, shards)
+        return stats
+    stats = merge_indexes([path], path, spec or load_spec(path) or "Flat", dedup)
+    with store_lock(path):
+        index = faiss.read_index(os.path.join(path, "index.faiss"), MMAP_IO_FLAGS)
+    if dedup or not supports_removal(index):
+        Manifest(path).remove()
+    return stats
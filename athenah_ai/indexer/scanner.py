@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import json
+from typing import Dict, Iterable, List, Union
+
+from unstructured.file_utils.filetype import FileType, detect_filetype
+
+SCAN_CACHE_FILE: str = "scan.json"
+SCAN_CACHE_FORMAT: int = 2
+
+# How a file is loaded: decoded as plain text, or partitioned by unstructured.
+FILE_TEXT: str = "text"
+FILE_DOCUMENT: str = "document"
+
+TEXT_EXTENSIONS = frozenset(
+    {
+        ".c",
+        ".cc",
+        ".cfg",
+        ".cmake",
+        ".conf",
+        ".cpp",
+        ".cs",
+        ".css",
+        ".csv",
+        ".cxx",
+        ".go",
+        ".h",
+        ".hh",
+        ".hpp",
+        ".ini",
+        ".java",
+        ".js",
+        ".json",
+        ".jsx",
+        ".kt",
+        ".lock",
+        ".log",
+        ".md",
+        ".mjs",
+        ".php",
+        ".proto",
+        ".py",
+        ".rb",
+        ".rs",
+        ".rst",
+        ".scss",
+        ".sh",
+        ".sol",
+        ".sql",
+        ".swift",
+        ".toml",
+        ".ts",
+        ".tsv",
+        ".tsx",
+        ".txt",
+        ".xml",
+        ".yaml",
+        ".yml",
+    }
+)
+DOCUMENT_EXTENSIONS = frozenset(
+    {
+        ".doc",
+        ".docx",
+        ".eml",
+        ".epub",
+        ".htm",
+        ".html",
+        ".jpeg",
+        ".jpg",
+        ".msg",
+        ".odt",
+        ".pdf",
+        ".png",
+        ".ppt",
+        ".pptx",
+        ".rtf",
+        ".xls",
+        ".xlsx",
+    }
+)
+# Sniffed types that decode as text.
+TEXT_FILE_TYPES = frozenset(
+    {
+        FileType.UNK,
+        FileType.CSV,
+        FileType.JSON,
+        FileType.MD,
+        FileType.TXT,
+        FileType.XML,
+    }
+)
+
+
+def classify_file(path: str) -> str:
+    """
+    Classifies a file by its extension, sniffing its content only when the
+    extension is unknown.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: FILE_TEXT or FILE_DOCUMENT.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        return FILE_TEXT
+    if extension in DOCUMENT_EXTENSIONS:
+        return FILE_DOCUMENT
+    file_type = detect_filetype(path)
+    if file_type is None or file_type in TEXT_FILE_TYPES:
+        return FILE_TEXT
+    return FILE_DOCUMENT
+
+
+class FileScanner(object):
+    """
+    Classifies files, caching each result by (path, mtime, size) across runs.
+
+    Attributes:
+        path (str): The directory the cache is saved in.
+        files (Dict[str, List]): Maps each file path to its mtime in
+        nanoseconds, size and kind.
+        hits (int): The number of files classified from the cache.
+        sniffed (int): The number of files whose content was sniffed.
+    """
+
+    def __init__(cls, path: str) -> None:
+        cls.path = path
+        cls.files: Dict[str, List[Union[int, str]]] = {}
+        cls.hits = 0
+        cls.sniffed = 0
+
+    @property
+    def file_path(cls) -> str:
+        return os.path.join(cls.path, SCAN_CACHE_FILE)
+
+    @classmethod
+    def load(cls, path: str) -> "FileScanner":
+        scanner = cls(path)
+        if os.path.exists(scanner.file_path):
+            with open(scanner.file_path) as file:
+                data = json.load(file)
+            if data.get("format") == SCAN_CACHE_FORMAT:
+                scanner.files = data["files"]
+        return scanner
+
+    def save(cls) -> None:
+        os.makedirs(cls.path, exist_ok=True)
+        tmp_path = f"{cls.file_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"format": SCAN_CACHE_FORMAT, "files": cls.files}, file)
+        os.replace(tmp_path, cls.file_path)
+
+    def classify(cls, path: str) -> str:
+        stat = os.stat(path)
+        cached = cls.files.get(path)
+        if cached is not None and cached[:2] == [stat.st_mtime_ns, stat.st_size]:
+            cls.hits += 1
+            return cached[2]
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in TEXT_EXTENSIONS and extension not in DOCUMENT_EXTENSIONS:
+            cls.sniffed += 1
+        kind = classify_file(path)
+        cls.files[path] = [stat.st_mtime_ns, stat.st_size, kind]
+        return kind
+
+    def scan(cls, paths: Iterable[str], root: str) -> Dict[str, str]:
+        """
+        Classifies the files found under a root in one pass.
+
+        Cached files under the root that were not seen are dropped.
+
+        Args:
+            paths (Iterable[str]): The files under the root.
+            root (str): The directory the files were found in.
+
+        Returns:
+            Dict[str, str]: The kind of each file.
+        """
+        kinds = {path: cls.classify(path) for path in paths}
+        prefix = os.path.join(root, "")
+        for path in [p for p in cls.files if p.startswith(prefix)]:
+            if path not in kinds:
+                del cls.files[path]
+        return kinds
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+from typing import Any, Dict, Iterable, List
+
+from dotenv import load_dotenv
+
+from athenah_ai.client.vector_store import SHARDS_DIR, SHARDS_FILE
+from athenah_ai.indexer.chunk_log import CHUNK_LOG_FILE, ChunkLog
+
+load_dotenv()
+
+# 0 builds one shard per top-level folder, otherwise shards of about this
+# many chunks.
+SHARD_CHUNKS: int = int(os.environ.get("SHARD_CHUNKS", 0))
+# The shard of the files directly in the indexed root.
+ROOT_SHARD: str = "_root"
+
+
+def plan_shards(
+    files: Iterable[str], root: str, shard_chunks: int, chunk_size: int
+) -> Dict[str, List[str]]:
+    """
+    Groups files into shards, by top-level folder or by estimated chunks.
+
+    The number of chunks of a file is estimated from its size, as a chunk
+    holds at most ``chunk_size`` characters, so files are grouped before any
+    of them is split. Files keep their order, so shards hold neighbouring
+    files.
+
+    Args:
+        files (Iterable[str]): The files to index.
+        root (str): The indexed root.
+        shard_chunks (int): The estimated chunks per shard, or 0 for one shard
+        per top-level folder of root.
+        chunk_size (int): The chunk size in characters.
+
+    Returns:
+        Dict[str, List[str]]: The files of each shard, by shard name.
+    """
+    shards: Dict[str, List[str]] = {}
+    if not shard_chunks:
+        for path in files:
+            parts = os.path.relpath(path, root).split(os.sep)
+            name = parts[0] if len(parts) > 1 else ROOT_SHARD
+            shards.setdefault(name, []).append(path)
+        return shards
+
+    chunks = 0
+    for path in files:
+        if not shards or chunks >= shard_chunks:
+            name = f"shard-{len(shards):05d}"
+            shards[name] = []
+            chunks = 0
+        shards[name].append(path)
+        chunks += os.path.getsize(path) // chunk_size + 1
+    return shards
+
+
+def build_shard(client: Any, files: List[str], root: str, incremental: bool) -> int:
+    """
+    Builds one shard in a worker process.
+
+    Args:
+        client (BaseIndexClient): The index client of the shard, whose
+        name_version_path is the shard directory.
+        files (List[str]): The files of the shard.
+        root (str): The indexed root chunk sources are relative to.
+        incremental (bool): Whether to only index the files that changed since
+        the last build of the shard.
+
+    Returns:
+        int: The number of chunks in the shard.
+    """
+    if incremental:
+        store = client.update_store(files, root)
+        return 0 if store is None else store.index.ntotal
+    try:
+        return client.write_store(files, root)
+    except ValueError:
+        # A shard of files without text has nothing to index and is left out.
+        path = client.name_version_path
+        if not os.path.exists(os.path.join(path, CHUNK_LOG_FILE)) or len(
+            ChunkLog(path)
+        ):
+            raise
+        return 0
+
+
+def remove_shards(path: str) -> None:
+    """
+    Removes the shards of an index, so the store saved in path is loaded.
+
+    Args:
+        path (str): The directory of the saved index.
+    """
+    if os.path.exists(os.path.join(path, SHARDS_FILE)):
+        os.remove(os.path.join(path, SHARDS_FILE))
+    shutil.rmtree(os.path.join(path, SHARDS_DIR), ignore_errors=True)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import errno
+import fcntl
+import shutil
+from fnmatch import fnmatch
+from shutil import ignore_patterns
+from typing import List
+
+# Directories and files that are never indexed.
+IGNORE_PATTERNS: List[str] = [
+    "node_modules*",
+    "dist*",
+    "build*",
+    ".git*",
+    ".venv*",
+    ".vscode*",
+    "__pycache__*",
+    "poetry.lock",
+]
+# How a source tree is prepared for indexing: copied, indexed where it is, or
+# snapshot with hardlinks or reflinks.
+SOURCE_MODES: List[str] = ["copy", "inplace", "hardlink", "reflink"]
+FICLONE: int = 0x40049409
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY}
+
+
+def is_ignored(name: str) -> bool:
+    return any(fnmatch(name, pattern) for pattern in IGNORE_PATTERNS)
+
+
+def link_file(source: str, dest: str) -> str:
+    """
+    Hardlinks a file, copying it when the destination is on another device.
+
+    Args:
+        source (str): The file to link.
+        dest (str): The path of the link.
+
+    Returns:
+        str: The destination.
+    """
+    try:
+        os.link(source, dest)
+    except OSError as e:
+        if e.errno not in UNSUPPORTED_ERRNOS:
+            raise
+        shutil.copy2(source, dest)
+    return dest
+
+
+def reflink_file(source: str, dest: str) -> str:
+    """
+    Clones a file copy-on-write, copying it when the filesystem cannot.
+
+    Args:
+        source (str): The file to clone.
+        dest (str): The path of the clone.
+
+    Returns:
+        str: The destination.
+    """
+    try:
+        with open(source, "rb") as src, open(dest, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError as e:
+        if e.errno not in UNSUPPORTED_ERRNOS | {errno.EINVAL, errno.EBADF}:
+            raise
+        shutil.copyfile(source, dest)
+    shutil.copystat(source, dest)
+    return dest
+
+
+def snapshot(source: str, dest: str, mode: str = "copy") -> None:
+    """
+    Copies a source tree without the ignored paths, with hardlinks or
+    reflinks when asked, so indexing reads a stable view of the source.
+
+    Hardlinked files share their inode with the source, so they only stay
+    stable against editors that replace files rather than rewrite them.
+
+    Args:
+        source (str): The directory to snapshot.
+        dest (str): The directory to create.
+        mode (str): "copy", "hardlink" or "reflink".
+    """
+    copy_function = {"hardlink": link_file, "reflink": reflink_file}.get(
+        mode, shutil.copy2
+    )
+    shutil.copytree(
+        source,
+        dest,
+        dirs_exist_ok=True,
+        ignore=ignore_patterns(*IGNORE_PATTERNS),
+        copy_function=copy_function,
+    )
@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+from functools import lru_cache
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_text_splitters import Language
 
 
+# Splitters are stateless once built, so one per (language, size, overlap) is
+# shared by every document instead of compiling its separators each time.
+@lru_cache(maxsize=None)
 def code_splitter(
     language: Language = Language.CPP, chunk_size: int = 1000, chunk_overlap: int = 20
 ) -> RecursiveCharacterTextSplitter:
@@ -16,6 +21,7 @@ def code_splitter(
     )
 
 
+@lru_cache(maxsize=None)
 def text_splitter(
     chunk_size: int = 1000, chunk_overlap: int = 20
 ) -> RecursiveCharacterTextSplitter:
@@ -5,9 +5,34 @@ import os
 from typing import List
 
 from athenah_ai.utils.fs import write_file, read_file
-from athenah_ai.client import AthenahClient, get_token_total
+from athenah_ai.client import AthenahClient
+from athenah_ai.client.tokenizer import count_tokens_batch
 from athenah_ai.logger import logger
 
+MAX_FILE_TOKENS: int = 10000
+
+
+def count_file_tokens(contents: List[str], model: str) -> List[int]:
+    """
+    Counts tokens for a batch of files, only exactly where it matters.
+
+    Files whose byte length upper bound is within MAX_FILE_TOKENS report the
+    bound, the rest are counted exactly in one batch.
+
+    Args:
+        contents (List[str]): The file contents.
+        model (str): The OpenAI model name.
+
+    Returns:
+        List[int]: The token count or upper bound of each file, in order.
+    """
+    totals = count_tokens_batch(contents, model, estimate=True)
+    over = [i for i, total in enumerate(totals) if total > MAX_FILE_TOKENS]
+    exact = count_tokens_batch([contents[i] for i in over], model)
+    for i, total in zip(over, exact):
+        totals[i] = total
+    return totals
+
 
 class AthenahLabeler(object):
     storage_type: str = "local"
@@ -41,11 +66,26 @@ class AthenahLabeler(object):
         skip_files: List[str],
     ):
         content: str = read_file(file_path)
-        token_total = get_token_total(content)
-        logger.info(f"FILE: {file_path} - TOKENS: {token_total}")
-        if int(token_total) > 10000:
+        token_total = count_file_tokens([content], ai_client.model_name)[0]
+        cls.process_content(
+            ai_client, file_path, content, token_total, prompt, skip_files
+        )
+
+    def process_content(
+        cls,
+        ai_client: AthenahClient,
+        file_path: str,
+        content: str,
+        token_total: int,
+        prompt: str,
+        skip_files: List[str],
+    ):
+        if int(token_total) > MAX_FILE_TOKENS:
+            logger.info(f"FILE: {file_path} - TOKENS: {token_total}")
             skip_files.append(file_path)
             return
+        # Files within the limit are not counted exactly.
+        logger.info(f"FILE: {file_path} - TOKENS (AT MOST): {token_total}")
 
         try:
             response = ai_client.base_prompt(prompt, content)
@@ -59,8 +99,9 @@ class AthenahLabeler(object):
     ):
         for root, dirs, files in os.walk(dir):
             for file in files:
-                file_path = os.path.join(root, file)
-                cls.process_file(ai_client, file_path, prompt, skip_files)
+                cls.process_file(
+                    ai_client, os.path.join(root, file), prompt, skip_files
+                )
 
     def docstring_code(cls, filename: str, content: str):
         prompt = """
@@ -1,10 +1,135 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-from typing import Any
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
 
+import google.auth
+from dotenv import load_dotenv
+from google.auth.credentials import Credentials
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud.storage.client import Client
 from google.cloud.storage.bucket import Bucket
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+load_dotenv()
+
+# Connections kept open per host. Parallel transfers run several files at
+# once, each in several parts, so this is well above the urllib3 default.
+GCS_POOL_SIZE: int = int(os.environ.get("GCS_POOL_SIZE", 64))
+
+
+def pooled_session(
+    credentials: Credentials, pool_size: int, adapter: BaseAdapter = None
+) -> AuthorizedSession:
+    """
+    Creates an authorized HTTP session with a connection pool of the given
+    size.
+
+    Args:
+        credentials (Credentials): The credentials requests are signed with.
+        pool_size (int): The connections kept open per host.
+        adapter (BaseAdapter): The transport, defaults to a pooled
+        HTTPAdapter.
+
+    Returns:
+        AuthorizedSession: The session.
+    """
+    session = AuthorizedSession(credentials)
+    adapter = adapter or HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class StorageClients(object):
+    """
+    A process-wide registry of storage clients, one per project, created on
+    first use and sharing one pooled HTTP session. Bucket handles are built
+    locally and make no request until they are used.
+
+    A child process drops the clients it inherited, since it cannot share
+    its parent's connections.
+
+    Attributes:
+        pool_size (int): The connections kept open per host.
+        credentials (Credentials): The credentials, defaults to the
+        application default credentials.
+        adapter (BaseAdapter): The transport, defaults to a pooled HTTPAdapter.
+    """
+
+    def __init__(
+        cls,
+        pool_size: int = GCS_POOL_SIZE,
+        credentials: Credentials = None,
+        adapter: BaseAdapter = None,
+    ) -> None:
+        cls.pool_size = pool_size
+        cls.credentials = credentials
+        cls.adapter = adapter
+        cls.session: AuthorizedSession = None
+        cls.default_project: Optional[str] = None
+        cls.clients: Dict[Optional[str], Client] = {}
+        cls.buckets: Dict[Tuple[Optional[str], str], Bucket] = {}
+        cls.lock = threading.Lock()
+
+    def client(cls, project_id: str = None) -> Client:
+        """
+        Returns the client of a project, creating it on first use.
+
+        Args:
+            project_id (str): The project, defaults to the project of the
+            credentials.
+
+        Returns:
+            Client: The client.
+        """
+        with cls.lock:
+            if project_id not in cls.clients:
+                if cls.session is None:
+                    if cls.credentials is None:
+                        cls.credentials, cls.default_project = google.auth.default(
+                            scopes=Client.SCOPE
+                        )
+                    cls.session = pooled_session(
+                        cls.credentials, cls.pool_size, cls.adapter
+                    )
+                cls.clients[project_id] = Client(
+                    project=project_id or cls.default_project,
+                    credentials=cls.credentials,
+                    _http=cls.session,
+                )
+            return cls.clients[project_id]
+
+    def bucket(cls, name: str, project_id: str = None) -> Bucket:
+        """
+        Returns a handle to a bucket without fetching its metadata.
+
+        Args:
+            name (str): The bucket name.
+            project_id (str): The project of the client.
+
+        Returns:
+            Bucket: The bucket.
+        """
+        client = cls.client(project_id)
+        with cls.lock:
+            if (project_id, name) not in cls.buckets:
+                cls.buckets[(project_id, name)] = client.bucket(name)
+            return cls.buckets[(project_id, name)]
+
+    def reset(cls) -> None:
+        cls.lock = threading.Lock()
+        cls.session = None
+        cls.clients = {}
+        cls.buckets = {}
+
+
+storage_clients: StorageClients = StorageClients()
+os.register_at_fork(after_in_child=storage_clients.reset)
 
 
 class GCPStorageClient(object):
@@ -13,6 +138,7 @@ class GCPStorageClient(object):
     public_base: str = None
     project_id: str = None
     parent: str = None
+    clients: StorageClients = storage_clients
 
     def __init__(cls, project_id: str = None):
         """
@@ -26,7 +152,7 @@ class GCPStorageClient(object):
         """
         :return:
         """
-        cls.client = Client()
+        cls.client = cls.clients.client(cls.project_id)
         return cls
 
     def init_bucket(cls, name: str = None) -> Any:
@@ -34,7 +160,9 @@ class GCPStorageClient(object):
         :param name:
         :return:
         """
-        cls.bucket = cls.client.get_bucket(name if name else cls.project_id)
+        cls.bucket = cls.clients.bucket(
+            name if name else cls.project_id, cls.project_id
+        )
         return cls.bucket
 
     def get(cls, path):
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import time
+import uuid
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, IO, List, Tuple
+
+from dotenv import load_dotenv
+
+from google.api_core.exceptions import NotFound
+from google.cloud.storage.blob import Blob
+from google.cloud.storage.bucket import Bucket
+
+from athenah_ai.logger import logger
+
+load_dotenv()
+
+GCS_PART_SIZE: int = int(os.environ.get("GCS_PART_SIZE", 32 * 1024 * 1024))
+GCS_TRANSFER_WORKERS: int = int(os.environ.get("GCS_TRANSFER_WORKERS", 8))
+# The most objects one compose request accepts.
+COMPOSE_LIMIT: int = 32
+
+
+def part_ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    return [
+        (start, min(start + part_size, size)) for start in range(0, size, part_size)
+    ] or [(0, 0)]
+
+
+def log_transfer(kind: str, name: str, size: int, parts: int, start: float) -> None:
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    logger.info(
+        f"GCS {kind}: {name} {size / 1e6:.1f} MB in {elapsed:.2f}s, "
+        f"{size / 1e6 / elapsed:.1f} MB/s, {parts} parts"
+    )
+
+
+def delete_parts(parts: List[Blob]) -> None:
+    """
+    Deletes temporary part objects, best effort.
+
+    Args:
+        parts (List[Blob]): The parts, some of which may not exist.
+    """
+    for part in parts:
+        try:
+            part.delete()
+        except NotFound:
+            pass
+        except Exception as e:
+            logger.warning(f"GCS PART NOT DELETED: {part.name} {e!r}")
+
+
+def compose(bucket: Bucket, name: str, parts: List[Blob]) -> Blob:
+    """
+    Composes parts into one object, in rounds of COMPOSE_LIMIT parts, and
+    deletes the parts, whether or not the compose succeeded.
+
+    Args:
+        bucket (Bucket): The bucket.
+        name (str): The name of the composed object.
+        parts (List[Blob]): The uploaded parts, in order.
+
+    Returns:
+        Blob: The composed object.
+    """
+    temporary = list(parts)
+    try:
+        while len(parts) > COMPOSE_LIMIT:
+            groups = [
+                parts[start : start + COMPOSE_LIMIT]
+                for start in range(0, len(parts), COMPOSE_LIMIT)
+            ]
+            parts = []
+            for group in groups:
+                blob = bucket.blob(f"{name}.parts/{uuid.uuid4().hex}")
+                temporary.append(blob)
+                blob.compose(group)
+                parts.append(blob)
+        blob = bucket.blob(name)
+        blob.compose(parts)
+        return blob
+    finally:
+        delete_parts(temporary)
+
+
+def upload_parts(
+    bucket: Bucket,
+    name: str,
+    size: int,
+    open_part: Callable[[int, int], IO],
+    part_size: int,
+    workers: int,
+) -> Blob:
+    """
+    Uploads an object in one request, or as parallel parts composed into it
+    when it is larger than a part. If an upload fails, the parts already
+    uploaded are deleted.
+
+    Args:
+        bucket (Bucket): The bucket.
+        name (str): The object name.
+        size (int): The object size in bytes.
+        open_part (Callable[[int, int], IO]): Opens a reader positioned at
+        the start of a byte range.
+        part_size (int): The part size in bytes.
+        workers (int): The number of parts uploaded at once.
+
+    Returns:
+        Blob: The uploaded object.
+    """
+    start = time.perf_counter()
+    ranges = part_ranges(size, part_size)
+    if len(ranges) == 1:
+        blob = bucket.blob(name)
+        with open_part(0, size) as reader:
+            blob.upload_from_file(reader, size=size)
+        log_transfer("UPLOAD", name, size, 1, start)
+        return blob
+
+    prefix = f"{name}.parts/{uuid.uuid4().hex}"
+    uploaded: List[Blob] = []
+
+    def upload(part: int) -> Blob:
+        part_start, part_end = ranges[part]
+        blob = bucket.blob(f"{prefix}-{part:05d}")
+        with open_part(part_start, part_end) as reader:
+            blob.upload_from_file(reader, size=part_end - part_start)
+        uploaded.append(blob)
+        return blob
+
+    try:
+        # Every part has finished, or failed, once the pool is shut down.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(upload, range(len(ranges))))
+    except BaseException:
+        delete_parts(uploaded)
+        raise
+    blob = compose(bucket, name, parts)
+    log_transfer("UPLOAD", name, size, len(ranges), start)
+    return blob
+
+
+def upload_file(
+    bucket: Bucket,
+    name: str,
+    path: str,
+    part_size: int = GCS_PART_SIZE,
+    workers: int = GCS_TRANSFER_WORKERS,
+) -> Blob:
+    """
+    Uploads a file, streaming each part from its own file handle.
+
+    Args:
+        bucket (Bucket): The bucket.
+        name (str): The object name.
+        path (str): The file to upload.
+        part_size (int): The part size in bytes.
+        workers (int): The number of parts uploaded at once.
+
+    Returns:
+        Blob: The uploaded object.
+    """
+
+    def open_part(start: int, end: int) -> IO:
+        reader = open(path, "rb")
+        reader.seek(start)
+        return reader
+
+    return upload_parts(
+        bucket, name, os.path.getsize(path), open_part, part_size, workers
+    )
+
+
+def get_blob(bucket: Bucket, name: str) -> Blob:
+    blob = bucket.get_blob(name)
+    if blob is None:
+        raise NotFound(f"gs://{bucket.name}/{name}")
+    return blob
+
+
+def download_parts(
+    bucket: Bucket,
+    name: str,
+    write_part: Callable[[Blob, int, int], None],
+    allocate: Callable[[int], None],
+    part_size: int,
+    workers: int,
+) -> Blob:
+    """
+    Downloads an object in one request, or as parallel byte ranges of the
+    generation its metadata reported, so a concurrent overwrite cannot mix
+    two versions.
+
+    Args:
+        bucket (Bucket): The bucket.
+        name (str): The object name.
+        write_part (Callable[[Blob, int, int], None]): Downloads a byte range
+        from a blob into the destination.
+        allocate (Callable[[int], None]): Sizes the destination.
+        part_size (int): The slice size in bytes.
+        workers (int): The number of slices downloaded at once.
+
+    Returns:
+        Blob: The object, with its metadata.
+    """
+    start = time.perf_counter()
+    blob = get_blob(bucket, name)
+    size = blob.size or 0
+    allocate(size)
+    ranges = part_ranges(size, part_size)
+    source = bucket.blob(name, generation=blob.generation)
+    if len(ranges) == 1:
+        write_part(source, 0, size)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda part: write_part(source, *part), ranges))
+    log_transfer("DOWNLOAD", name, size, len(ranges), start)
+    return blob
+
+
+def download_file(
+    bucket: Bucket,
+    name: str,
+    path: str,
+    part_size: int = GCS_PART_SIZE,
+    workers: int = GCS_TRANSFER_WORKERS,
+) -> Blob:
+    """
+    Downloads an object to a file, writing the slices in place into a
+    unique temporary file next to it that then replaces it.
+
+    Args:
+        bucket (Bucket): The bucket.
+        name (str): The object name.
+        path (str): The file to write.
+        part_size (int): The slice size in bytes.
+        workers (int): The number of slices downloaded at once.
+
+    Returns:
+        Blob: The object, with its metadata.
+    """
+    dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".download-", dir=dir)
+    os.close(fd)
+
+    def allocate(size: int) -> None:
+        os.truncate(tmp_path, size)
+
+    def write_part(blob: Blob, start: int, end: int) -> None:
+        with open(tmp_path, "r+b") as writer:
+            writer.seek(start)
+            if end > start:
+                blob.download_to_file(writer, start=start, end=end - 1)
+
+    try:
+        blob = download_parts(bucket, name, write_part, allocate, part_size, workers)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return blob
+
+
+def upload_files(
+    bucket: Bucket, files: List[Tuple[str, str]], workers: int = GCS_TRANSFER_WORKERS
+) -> None:
+    """
+    Uploads files at once, each split into parallel parts if it is large.
+
+    Args:
+        bucket (Bucket): The bucket.
+        files (List[Tuple[str, str]]): The object name and path of each file.
+        workers (int): The number of files uploaded at once.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda file: upload_file(bucket, *file), files))
+
+
+def download_files(
+    bucket: Bucket, files: List[Tuple[str, str]], workers: int = GCS_TRANSFER_WORKERS
+) -> List[Blob]:
+    """
+    Downloads objects at once, each in parallel slices if it is large.
+
+    Args:
+        bucket (Bucket): The bucket.
+        files (List[Tuple[str, str]]): The object name and path of each file.
+        workers (int): The number of objects downloaded at once.
+
+    Returns:
+        List[Blob]: The objects, with their metadata, in order.
+
+    Raises:
+        NotFound: If an object does not exist.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda file: download_file(bucket, *file), files))
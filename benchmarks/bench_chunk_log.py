@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Compares writing chunks to one split_N.txt file each, as prepare used to,
+with appending them to the chunk log in embedding batches, and measures
+random access to the log.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_chunk_log --chunks 100000 --dir /path/on/disk
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import List
+
+from athenah_ai.indexer.base_index_client import EMBED_BATCH_SIZE
+from athenah_ai.indexer.chunk_log import Chunk, ChunkLog, ChunkLogWriter
+
+
+def make_chunks(count: int, size: int) -> List[Chunk]:
+    chunks = []
+    for i in range(count):
+        source = f"src/dir_{i % 97}/file_{i // 20}.cpp"
+        text = f"// chunk {i}\n" + ("int value = 0;\n" * (size // 15))
+        chunks.append((text, {"source": source, "chunk_index": i % 20}, str(i)))
+    return chunks
+
+
+def write_split_files(path: str, chunks: List[Chunk]):
+    # One file per chunk, named by global position so nothing is overwritten.
+    for i, (text, _, _) in enumerate(chunks):
+        with open(os.path.join(path, f"split_{i}.txt"), "w") as split_file:
+            split_file.write(text)
+
+
+def write_log(path: str, chunks: List[Chunk]):
+    with ChunkLogWriter(path) as log:
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            log.append(chunks[start : start + EMBED_BATCH_SIZE], "/repo")
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--size", type=int, default=1500)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks, args.size)
+    dir = tempfile.mkdtemp(dir=args.dir)
+    try:
+        split_path = os.path.join(dir, "splits")
+        log_path = os.path.join(dir, "log")
+        os.makedirs(split_path)
+        split = timed(write_split_files, split_path, chunks)
+        log = timed(write_log, log_path, chunks)
+        print(f"{args.chunks} chunks of ~{args.size} bytes")
+        print(f"  split files {split:7.2f}s | {args.chunks / split:9.0f} chunks/s")
+        print(f"  chunk log   {log:7.2f}s | {args.chunks / log:9.0f} chunks/s")
+        print(f"  speedup     {split / log:7.1f}x")
+
+        reader = ChunkLog(log_path)
+        rows = [random.randrange(len(reader)) for _ in range(args.lookups)]
+        elapsed = timed(lambda: [reader[row] for row in rows])
+        print(f"  by row      {elapsed / args.lookups * 1e6:7.1f} us/lookup")
+        index = timed(reader.get, "0")
+        ids = [str(row) for row in rows]
+        elapsed = timed(lambda: [reader.get(_id) for _id in ids])
+        print(
+            f"  by id       {elapsed / args.lookups * 1e6:7.1f} us/lookup"
+            f" after a {index:.2f}s id scan"
+        )
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Compares single-stream uploads and downloads of a saved FAISS index with
+composite uploads and sliced downloads, against a fake bucket whose requests
+have a fixed latency and a per-stream bandwidth, as GCS streams do.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_gcs_transfer --mb 128 --stream-mbps 50
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from athenah_ai.libs.google.transfer import download_file, upload_file
+from tests.fakes.gcs import FakeBucket
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=128)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--stream-mbps", type=float, default=50)
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--part-mb", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    count = args.mb * 1024 * 1024 // (args.dim * 4)
+    index = faiss.IndexFlatL2(args.dim)
+    index.add(np.random.default_rng(0).normal(size=(count, args.dim)).astype("f4"))
+    dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(dir, "index.faiss")
+        faiss.write_index(index, path)
+        size = os.path.getsize(path) / 1e6
+        print(f"{count} vectors, {size:.1f} MB saved")
+
+        for workers in args.workers:
+            bucket = FakeBucket(latency=args.latency, bandwidth=args.stream_mbps * 1e6)
+            # One worker is a single stream, as blob uploads and downloads were.
+            part_size = args.part_mb * 1024 * 1024 if workers > 1 else 1 << 40
+            start = time.perf_counter()
+            upload_file(bucket, "index.faiss", path, part_size, workers)
+            upload = time.perf_counter() - start
+            dest = os.path.join(dir, f"download-{workers}.faiss")
+            start = time.perf_counter()
+            download_file(bucket, "index.faiss", dest, part_size, workers)
+            download = time.perf_counter() - start
+            assert faiss.read_index(dest).ntotal == index.ntotal
+            os.remove(dest)
+            print(
+                f"workers {workers:2d}: upload {size / upload:7.1f} MB/s"
+                f" | download {size / download:7.1f} MB/s"
+                f" | {sum(bucket.requests.values())} requests"
+            )
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
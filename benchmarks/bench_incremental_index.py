@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Measures rebuild time against the fraction of files changed, for a full
+rebuild and an incremental one.
+
+Embedding calls are simulated with a fixed cost per call and per text so
+the numbers reflect the work saved rather than network variance.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_incremental_index --files 200
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from athenah_ai.indexer.index_client import IndexClient
+
+
+class SlowEmbedding(DeterministicFakeEmbedding):
+    call_cost: float = 0.02
+    text_cost: float = 0.0005
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.call_cost + self.text_cost * len(texts))
+        return super().embed_documents(texts)
+
+
+class BenchIndexClient(IndexClient):
+    def get_embedder(cls):
+        return SlowEmbedding(size=256)
+
+    @staticmethod
+    def load_file(path: str, kind: str = None) -> List[Document]:
+        with open(path) as file:
+            return [Document(page_content=file.read(), metadata={"source": path})]
+
+
+def source(i: int, revision: int) -> str:
+    body = "\n".join(
+        f"    value_{j} = compute({i}, {j}, {revision})" for j in range(120)
+    )
+    return f"def function_{i}():\n{body}\n    return value_0\n"
+
+
+def write_repo(root: str, files: int):
+    for i in range(files):
+        path = os.path.join(root, f"pkg_{i % 20}", f"module_{i}.py")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(source(i, 0))
+
+
+def change_files(root: str, files: int, fraction: float, revision: int):
+    for i in random.Random(revision).sample(range(files), int(files * fraction)):
+        path = os.path.join(root, f"pkg_{i % 20}", f"module_{i}.py")
+        with open(path, "w") as file:
+            file.write(source(i, revision))
+
+
+def timed_build(dir: str, incremental: bool) -> float:
+    start = time.perf_counter()
+    BenchIndexClient("local", "id", dir, "repo", "v1").build(
+        "repo", incremental=incremental
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument(
+        "--fractions", type=float, nargs="+", default=[0.0, 0.01, 0.1, 0.5, 1.0]
+    )
+    args = parser.parse_args()
+
+    dir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(dir, "repo")
+        write_repo(root, args.files)
+        timed_build(dir, incremental=True)
+        print(f"{'changed':>8} | {'full':>9} | {'incremental':>11}")
+        for revision, fraction in enumerate(args.fractions, start=1):
+            change_files(root, args.files, fraction, revision)
+            incremental = timed_build(dir, incremental=True)
+            full = timed_build(dir, incremental=False)
+            timed_build(dir, incremental=True)
+            print(f"{fraction:>7.0%} | {full:>8.2f}s | {incremental:>10.2f}s")
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
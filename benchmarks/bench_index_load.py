@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Compares cold-load time, RSS and size on disk of the pickled docstore and the
+compact docstore loaded in memory and mmap modes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_index_load --docs 50000 --dim 1536
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import faiss
+import numpy as np
+
+from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+from athenah_ai.client.docstore import write_docstore
+from athenah_ai.client.vector_store import VectorStore
+
+NAME: str = "bench_index_load"
+VERSION: str = "v1"
+# mode -> (directory holding the saved index, load mode)
+MODES = {
+    "pickle": ("pickle", "memory"),
+    "memory": ("compact", "memory"),
+    "mmap": ("compact", "mmap"),
+}
+
+
+class BenchVectorStore(VectorStore):
+    dim: int = 1536
+
+    def get_embedder(cls):
+        return DeterministicFakeEmbedding(size=cls.dim)
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+
+
+def build(dir: str, docs: int, dim: int):
+    rng = np.random.default_rng(0)
+    index = faiss.IndexFlatL2(dim)
+    index.add(rng.random((docs, dim), dtype=np.float32))
+    ids = [str(uuid.uuid4().int >> 65) for _ in range(docs)]
+    docstore = InMemoryDocstore(
+        {
+            _id: Document(
+                page_content=f"chunk {i} " + "lorem ipsum dolor sit amet " * 60,
+                metadata={
+                    "source": f"file_{i // 8}.cpp",
+                    "file_type": "cpp",
+                    "chunk_index": i % 8,
+                    "total_chunks": 8,
+                },
+            )
+            for i, _id in enumerate(ids)
+        }
+    )
+    index_to_docstore_id = dict(enumerate(ids))
+    embedder = DeterministicFakeEmbedding(size=dim)
+    store = FAISS(embedder, index, docstore, index_to_docstore_id)
+    store.save_local(os.path.join(dir, "pickle", f"{NAME}-{VERSION}"))
+    compact_path = os.path.join(dir, "compact", f"{NAME}-{VERSION}")
+    store.save_local(compact_path)
+    os.remove(os.path.join(compact_path, "index.pkl"))
+    write_docstore(compact_path, docstore, index_to_docstore_id)
+
+
+def docstore_mb(dir: str) -> float:
+    path = os.path.join(dir, f"{NAME}-{VERSION}")
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(
+            os.path.getsize(os.path.join(root, name))
+            for name in files
+            if name != "index.faiss"
+        )
+    return total / 1024**2
+
+
+def child(dir: str, mode: str, dim: int):
+    BenchVectorStore.dim = dim
+    format, load_mode = MODES[mode]
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    store = BenchVectorStore("local", load_mode=load_mode).load(
+        NAME, os.path.join(dir, format), VERSION
+    )
+    load_s = time.perf_counter() - start
+    load_rss = rss_mb()
+    start = time.perf_counter()
+    store.similarity_search("what does isNewerVersion return", k=4)
+    query_s = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "load_ms": load_s * 1000,
+                "first_query_ms": query_s * 1000,
+                "rss_mb": load_rss - base_rss,
+                "rss_after_query_mb": rss_mb() - base_rss,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--child", default=None)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.dir, args.child, args.dim)
+        return
+
+    dir = tempfile.mkdtemp()
+    try:
+        build(dir, args.docs, args.dim)
+        print(f"docs={args.docs} dim={args.dim}")
+        for mode, (format, _) in MODES.items():
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_index_load",
+                    "--child",
+                    mode,
+                    "--dir",
+                    dir,
+                    "--dim",
+                    str(args.dim),
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{mode:>6}: docstore {docstore_mb(os.path.join(dir, format)):7.1f} MB"
+                f" | load {result['load_ms']:9.1f} ms"
+                f" | first query {result['first_query_ms']:7.1f} ms"
+                f" | rss {result['rss_mb']:8.1f} MB"
+                f" | rss after query {result['rss_after_query_mb']:8.1f} MB"
+            )
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
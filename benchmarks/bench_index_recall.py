@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Measures recall@k against exact search and query latency for index factory
+specs over a sweep of their search parameters, on synthetic clustered
+vectors, to pick an INDEX_SPEC, INDEX_NPROBE and INDEX_EF_SEARCH per tenant.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_index_recall --vectors 50000 --dim 128 \
+        --specs Flat "IVF256,Flat" "IVF256,PQ16" HNSW32 "OPQ16,IVF256,PQ16"
+"""
+
+import argparse
+import time
+from typing import Dict
+
+import faiss
+import numpy as np
+
+from athenah_ai.client.index_spec import (
+    apply_search_params,
+    build_index,
+    search_params,
+)
+
+NPROBES = [1, 4, 16, 64]
+EF_SEARCHES = [16, 64, 256]
+
+
+def clustered_vectors(count: int, dim: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(count // 100, 1), dim))
+    noise = rng.normal(scale=1.0, size=(count, dim))
+    return (centers[rng.integers(0, len(centers), count)] + noise).astype(np.float32)
+
+
+def sweep(index) -> Dict[str, list]:
+    names = search_params(index)
+    if "nprobe" in names:
+        return {"nprobe": NPROBES}
+    if "efSearch" in names:
+        return {"efSearch": EF_SEARCHES}
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--specs",
+        nargs="+",
+        default=["Flat", "IVF256,Flat", "IVF256,PQ16", "HNSW32", "OPQ16,IVF256,PQ16"],
+    )
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.vectors, args.dim, 0)
+    rng = np.random.default_rng(1)
+    rows = rng.choice(args.vectors, args.queries, replace=False)
+    noise = rng.normal(scale=0.5, size=(args.queries, args.dim))
+    queries = (vectors[rows] + noise).astype(np.float32)
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    for spec in args.specs:
+        start = time.perf_counter()
+        index = build_index(spec, vectors)
+        build = time.perf_counter() - start
+        size = len(faiss.serialize_index(index)) / 1e6
+        print(f"{spec}: built in {build:.2f}s, {size:.1f} MB")
+        settings = [
+            {name: value}
+            for name, values in sweep(index).items()
+            for value in values
+        ] or [{}]
+        for params in settings:
+            apply_search_params(index, params)
+            start = time.perf_counter()
+            _, ids = index.search(queries, args.k)
+            latency = (time.perf_counter() - start) / args.queries * 1000
+            recall = np.mean(
+                [len(set(row) & set(ref)) / args.k for row, ref in zip(ids, truth)]
+            )
+            label = ",".join(f"{n}={v}" for n, v in params.items()) or "exact"
+            print(
+                f"  {label:<14} recall@{args.k} {recall:6.3f}"
+                f" | {latency:7.3f} ms/query"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Compares the native code and text loader with unstructured partitioning over
+tests/fixtures and a synthetic C++ repository, reporting files/s and MB/s.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_loader --files 400 --repeat 3
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Callable, List
+
+from langchain_community.document_loaders import UnstructuredFileLoader
+
+from athenah_ai.indexer.loaders import load_document
+from benchmarks.bench_prepare import write_repo
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "tests", "fixtures")
+
+
+def list_files(root: str) -> List[str]:
+    return sorted(
+        os.path.join(path, name)
+        for path, _, files in os.walk(root)
+        for name in files
+        if not name.startswith(".")
+    )
+
+
+def measure(name: str, paths: List[str], load: Callable, repeat: int):
+    size = sum(os.path.getsize(path) for path in paths)
+    try:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for path in paths:
+                load(path)
+        elapsed = (time.perf_counter() - start) / repeat
+    except Exception as e:
+        print(f"  {name:<12} unavailable: {type(e).__name__}: {e}".splitlines()[0])
+        return
+    print(
+        f"  {name:<12} {elapsed:7.3f}s"
+        f" | {len(paths) / elapsed:9.1f} files/s"
+        f" | {size / elapsed / 1e6:7.2f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--functions", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    dir = tempfile.mkdtemp()
+    try:
+        write_repo(os.path.join(dir, "repo"), args.files, args.functions)
+        for label, root in [("fixtures", FIXTURES), ("synthetic", dir)]:
+            paths = list_files(root)
+            print(f"{label}: {len(paths)} files")
+            measure("native", paths, load_document, args.repeat)
+            measure(
+                "unstructured",
+                paths,
+                lambda path: UnstructuredFileLoader(path).load(),
+                args.repeat,
+            )
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Measures merging saved indexes without re-embedding, and the index and chunk
+log sizes before and after a deduplicating merge, on synthetic stores whose
+chunks partly repeat across stores, as per-version indexes of one repo do.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_merge_index --stores 4 --chunks 50000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from athenah_ai.client.docstore import StoreWriter
+from athenah_ai.indexer.base_index_client import chunk_id
+from athenah_ai.indexer.chunk_log import CHUNK_LOG_FILE, ChunkLogWriter
+from athenah_ai.indexer.merge import merge_indexes
+
+
+def write_store(path: str, store: int, chunks: int, dim: int, overlap: float):
+    rng = np.random.default_rng(store)
+    shared = int(chunks * overlap)
+    with StoreWriter(path) as writer, ChunkLogWriter(path) as log:
+        for start in range(0, chunks, 4096):
+            batch = []
+            for i in range(start, min(start + 4096, chunks)):
+                # The first chunks are the same in every store.
+                owner = 0 if i < shared else store
+                text = f"// store {owner} chunk {i}\n" + "int value = 0;\n" * 50
+                source = f"src/file_{i // 20}.cpp"
+                metadata = {"source": source, "chunk_index": i % 20}
+                batch.append((text, metadata, chunk_id(f"{owner}/{source}", i, text)))
+            vectors = rng.normal(size=(len(batch), dim)).astype(np.float32)
+            texts, metadatas, ids = zip(*batch)
+            writer.add(vectors, texts, metadatas, ids)
+            log.append(batch, "/repo")
+
+
+def size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=4)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--overlap", type=float, default=0.5)
+    args = parser.parse_args()
+
+    dir = tempfile.mkdtemp()
+    try:
+        sources = []
+        for store in range(args.stores):
+            path = os.path.join(dir, f"store-{store}")
+            write_store(path, store, args.chunks, args.dim, args.overlap)
+            sources.append(path)
+        before = sum(size(path) for path in sources)
+        log_before = sum(
+            os.path.getsize(os.path.join(path, CHUNK_LOG_FILE)) for path in sources
+        )
+
+        dest = os.path.join(dir, "merged")
+        start = time.perf_counter()
+        stats = merge_indexes(sources, dest)
+        elapsed = time.perf_counter() - start
+        total = args.stores * args.chunks
+        print(
+            f"merged {total} chunks in {elapsed:.2f}s"
+            f" | {total / elapsed:9.0f} chunks/s"
+            f" | {stats['chunks']} kept, {stats['duplicates']} duplicates"
+        )
+        print(
+            f"  store bytes {before / 1e6:8.1f} MB -> {size(dest) / 1e6:8.1f} MB"
+            f" | chunk log {log_before / 1e6:8.1f} MB"
+            f" -> {os.path.getsize(os.path.join(dest, CHUNK_LOG_FILE)) / 1e6:8.1f} MB"
+        )
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Measures the load-and-split stage of BaseIndexClient.prepare on a synthetic
+C++ repository for several worker counts, reporting files/s and chunks/s.
+
+Files are read as plain text so the numbers cover splitting and the pool
+rather than unstructured's partitioners.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_prepare --files 400 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import List
+
+from langchain_core.documents import Document
+
+from athenah_ai.indexer.index_client import IndexClient
+
+
+class TextIndexClient(IndexClient):
+    @staticmethod
+    def load_file(path: str, kind: str = None) -> List[Document]:
+        with open(path) as file:
+            return [Document(page_content=file.read(), metadata={"source": path})]
+
+
+def cpp_source(i: int, functions: int) -> str:
+    body = []
+    for j in range(functions):
+        body.append(
+            f"bool\nisNewerVersion_{i}_{j}(std::uint64_t version)\n{{\n"
+            f"    if (version <= {j})\n        return false;\n"
+            f"    auto const v = encodeSoftwareVersion(\"{i}.{j}.0\");\n"
+            f"    return version > v && isRippledVersion(version);\n}}\n"
+        )
+    return "#include <cstdint>\n\nnamespace ripple {\n\n" + "\n".join(body) + "}\n"
+
+
+def write_repo(root: str, files: int, functions: int):
+    for i in range(files):
+        path = os.path.join(root, f"src_{i % 16}", f"File_{i}.cpp")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(cpp_source(i, functions))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=400)
+    parser.add_argument("--functions", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    dir = tempfile.mkdtemp()
+    try:
+        write_repo(os.path.join(dir, "repo"), args.files, args.functions)
+        for workers in args.workers:
+            client = TextIndexClient("local", "id", dir, "repo", "v1", workers=workers)
+            start = time.perf_counter()
+            chunks = len(client.prepare(client.name_path))
+            elapsed = time.perf_counter() - start
+            print(
+                f"workers {workers:>2}: {elapsed:7.2f}s"
+                f" | {args.files / elapsed:8.1f} files/s"
+                f" | {chunks / elapsed:9.1f} chunks/s"
+            )
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
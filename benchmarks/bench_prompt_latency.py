@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Measures the per-call overhead of AthenahClient.prompt with a fake LLM.
+
+The rebuilt path assembles a new ChatOpenAI, retriever and retrieval chain
+on every call, as prompt did before chains were cached. It does not include
+the hub.pull round trip, pass --hub to time that separately.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_prompt_latency --calls 200
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from langchain.chains import create_retrieval_chain
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.language_models import FakeListChatModel
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+from langchain_openai import ChatOpenAI
+
+from athenah_ai.client import AthenahClient
+from athenah_ai.client.prompts import prompt_registry, RETRIEVAL_QA_CHAT
+
+PROMPT: str = "What does the isNewerVersion function return?"
+
+
+class FakeLLMClient(AthenahClient):
+    def get_llm(
+        cls,
+        model_name: str,
+        max_tokens: int,
+        asynchronous: bool = False,
+        n: int = None,
+    ):
+        return FakeListChatModel(responses=["isNewerVersion returns a bool"])
+
+
+def rebuilt_prompt(client: FakeLLMClient, prompt: str) -> str:
+    ChatOpenAI(
+        openai_api_key=os.environ.get("OPENAI_API_KEY", "sk-bench"),
+        model_name=client.model_name,
+        max_tokens=2000,
+    )
+    llm = client.get_llm(client.model_name, 2000)
+    question_answer_chain = create_stuff_documents_chain(
+        llm, prompt_registry.get(RETRIEVAL_QA_CHAT)
+    )
+    rag_chain = create_retrieval_chain(client.db.as_retriever(), question_answer_chain)
+    return rag_chain.invoke({"input": prompt})["answer"]
+
+
+def time_calls(fn, calls: int) -> list:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: list):
+    timings = sorted(timings)
+    print(
+        f"{label:>8}: mean {statistics.mean(timings):7.2f} ms"
+        f" | p50 {timings[len(timings) // 2]:7.2f} ms"
+        f" | p95 {timings[int(len(timings) * 0.95)]:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--hub", action="store_true")
+    args = parser.parse_args()
+
+    client = FakeLLMClient("id", model_name=args.model)
+    client.db = FAISS.from_texts(
+        [f"chunk {i} bool isNewerVersion(std::uint64_t)" for i in range(args.docs)],
+        DeterministicFakeEmbedding(size=256),
+    )
+    client.prompt(PROMPT)
+
+    report("rebuilt", time_calls(lambda: rebuilt_prompt(client, PROMPT), args.calls))
+    report("cached", time_calls(lambda: client.prompt(PROMPT), args.calls))
+    if args.hub:
+        from langchain import hub
+
+        report("hub.pull", time_calls(lambda: hub.pull(RETRIEVAL_QA_CHAT), 5))
+
+
+if __name__ == "__main__":
+    main()
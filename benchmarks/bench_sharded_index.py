@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Compares a single-store build and search with a sharded build, one shard per
+top-level folder built in worker processes, and a search fanned out over the
+shards, on a synthetic C++ repository of 16 folders.
+
+Embeddings come from a deterministic fake with a fixed latency per request,
+so the numbers cover splitting, embedding concurrency and the pools rather
+than the embedding API.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sharded_index --files 800 --workers 4 8
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import List
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from athenah_ai.client.vector_store import search_by_vectors
+from benchmarks.bench_prepare import TextIndexClient, write_repo
+
+DIM: int = 256
+
+
+class SlowEmbedding(DeterministicFakeEmbedding):
+    latency: float = 0.05
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+class BenchIndexClient(TextIndexClient):
+    def get_embedder(cls):
+        return SlowEmbedding(size=DIM)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=800)
+    parser.add_argument("--functions", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    dir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(dir, "source")
+        write_repo(root, args.files, args.functions)
+        embedder = DeterministicFakeEmbedding(size=DIM)
+        queries = [embedder.embed_query(f"query {i}") for i in range(args.queries)]
+
+        client = BenchIndexClient("local", "id", dir, "single", "v1", workers=1)
+        start = time.perf_counter()
+        single = client.build("source", root=root)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        search_by_vectors(single, queries, args.k)
+        search = time.perf_counter() - start
+        print(
+            f"single      : build {build:7.2f}s | search {search * 1e3:7.1f}ms"
+            f" | {single.index.ntotal} chunks"
+        )
+
+        for workers in args.workers:
+            name = f"sharded-{workers}"
+            client = BenchIndexClient("local", "id", dir, name, "v1", workers=workers)
+            start = time.perf_counter()
+            store = client.build("source", root=root, sharded=True)
+            build = time.perf_counter() - start
+            search_by_vectors(store, queries[:1], args.k)
+            start = time.perf_counter()
+            search_by_vectors(store, queries, args.k)
+            search = time.perf_counter() - start
+            print(
+                f"{workers:2d} workers  : build {build:7.2f}s"
+                f" | search {search * 1e3:7.1f}ms | {len(store.names)} shards"
+            )
+    finally:
+        shutil.rmtree(dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
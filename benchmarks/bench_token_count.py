@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Measures token counting throughput over a synthetic source corpus.
+
+Compares the old per-call tiktoken.encoding_for_model path with the cached
+encoder, batched parallel counting and the byte length upper bound.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_token_count --files 2000 --model gpt-4o
+"""
+
+import argparse
+import random
+import time
+
+import tiktoken
+
+from athenah_ai.client.tokenizer import count_tokens, count_tokens_batch
+
+WORDS = [
+    "bool",
+    "isNewerVersion",
+    "std::uint64_t",
+    "version",
+    "return",
+    "const",
+    "auto",
+    "if",
+    "getEncodedVersion()",
+    "//",
+    "namespace",
+    "ripple",
+    "{",
+    "}",
+    "\n",
+]
+
+
+def corpus(files: int, words: int) -> list:
+    rng = random.Random(0)
+    return [" ".join(rng.choice(WORDS) for _ in range(words)) for _ in range(files)]
+
+
+def old_count(text: str, model: str) -> int:
+    encoding = tiktoken.encoding_for_model(model)
+    return len(encoding.encode(text))
+
+
+def run(label: str, fn, texts: list):
+    start = time.perf_counter()
+    total = fn()
+    elapsed = time.perf_counter() - start
+    mb = sum(len(text) for text in texts) / 1024**2
+    print(
+        f"{label:>16}: {len(texts) / elapsed:10.0f} files/s"
+        f" | {mb / elapsed:7.1f} MB/s | {sum(total)} tokens"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    texts = corpus(args.files, args.words)
+    count_tokens("warm up", args.model)
+    run("per-call", lambda: [old_count(t, args.model) for t in texts], texts)
+    run("cached", lambda: [count_tokens(t, args.model) for t in texts], texts)
+    run(
+        "batch",
+        lambda: count_tokens_batch(texts, args.model, num_threads=args.threads),
+        texts,
+    )
+    run(
+        "estimate",
+        lambda: count_tokens_batch(texts, args.model, estimate=True),
+        texts,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Measures time-to-first-token of blocking vs streaming prompts against a
+local fake OpenAI server that streams one word every --token-delay seconds.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ttft --calls 10 --words 50
+"""
+
+import argparse
+import statistics
+import time
+from unittest import mock
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import athenah_ai.client as client_module
+from athenah_ai.client import AthenahClient
+from tests.fakes.openai_server import FakeOpenAIServer
+
+
+def time_first_and_total(fn, calls: int) -> tuple:
+    firsts, totals = [], []
+    for _ in range(calls):
+        start = time.perf_counter()
+        first = None
+        for _ in fn():
+            if first is None:
+                first = time.perf_counter() - start
+        totals.append((time.perf_counter() - start) * 1000)
+        firsts.append(first * 1000)
+    return firsts, totals
+
+
+def report(label: str, firsts: list, totals: list):
+    print(
+        f"{label:>18}: ttft p50 {statistics.median(firsts):8.2f} ms"
+        f" | total p50 {statistics.median(totals):8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--words", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    prompt = " ".join(f"word{i}" for i in range(args.words))
+    with FakeOpenAIServer(
+        latency=args.latency, token_delay=args.token_delay
+    ) as server, mock.patch.multiple(
+        client_module, OPENAI_API_KEY="sk-bench", OPENAI_BASE_URL=server.base_url
+    ):
+        client = AthenahClient("id", model_name="gpt-4")
+        client.db = FAISS.from_texts(
+            [f"chunk {i} bool isNewerVersion(std::uint64_t)" for i in range(100)],
+            DeterministicFakeEmbedding(size=256),
+        )
+        cases = {
+            "base_prompt": lambda: [client.base_prompt("system", prompt, n=1)],
+            "stream_base_prompt": lambda: client.stream_base_prompt("system", prompt),
+            "prompt": lambda: [client.prompt(prompt)],
+            "stream_prompt": lambda: client.stream_prompt(prompt),
+        }
+        for label, fn in cases.items():
+            report(label, *time_first_and_total(fn, args.calls))
+
+
+if __name__ == "__main__":
+    main()
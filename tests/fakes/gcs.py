@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import base64
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from typing import IO, Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import google_crc32c
+from google.api_core.exceptions import NotFound
+from requests import PreparedRequest, Response
+from requests.adapters import BaseAdapter
+
+
+class FakeBlob(object):
+    """
+    A blob of a FakeBucket, with the parts of the google-cloud-storage Blob
+    interface the indexer uses.
+    """
+
+    def __init__(cls, bucket: "FakeBucket", name: str, generation: int = None) -> None:
+        cls.bucket = bucket
+        cls.name = name
+        cls.generation = generation
+        cls.size: Optional[int] = None
+        cls.etag: Optional[str] = None
+        cls.crc32c: Optional[str] = None
+        cls.updated: Optional[float] = None
+
+    def data(cls) -> bytes:
+        return cls.bucket.read(cls.name, cls.generation)
+
+    def reload(cls, **kwargs: Any) -> None:
+        cls.bucket.request("metadata")
+        cls.bucket.describe(cls)
+
+    def exists(cls, **kwargs: Any) -> bool:
+        cls.bucket.request("metadata")
+        return cls.name in cls.bucket.objects
+
+    def upload_from_file(cls, file_obj: IO, size: int = None, **kwargs: Any) -> None:
+        data = file_obj.read() if size is None else file_obj.read(size)
+        cls.bucket.request("upload", len(data))
+        cls.bucket.write(cls.name, data)
+        cls.bucket.describe(cls)
+
+    def upload_from_filename(cls, filename: str, **kwargs: Any) -> None:
+        with open(filename, "rb") as file:
+            cls.upload_from_file(file)
+
+    def upload_from_string(cls, data: Any, **kwargs: Any) -> None:
+        data = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+        cls.bucket.request("upload", len(data))
+        cls.bucket.write(cls.name, data)
+        cls.bucket.describe(cls)
+
+    def download_as_bytes(
+        cls, start: int = None, end: int = None, **kwargs: Any
+    ) -> bytes:
+        data = cls.data()
+        # Ranges are inclusive of end, as in the GCS API.
+        data = data[start or 0 : None if end is None else end + 1]
+        cls.bucket.request("download", len(data))
+        return data
+
+    def download_to_file(
+        cls, file_obj: IO, start: int = None, end: int = None, **kwargs: Any
+    ) -> None:
+        file_obj.write(cls.download_as_bytes(start=start, end=end))
+
+    def download_to_filename(cls, filename: str, **kwargs: Any) -> None:
+        with open(filename, "wb") as file:
+            cls.download_to_file(file)
+
+    def compose(cls, sources: List["FakeBlob"], **kwargs: Any) -> None:
+        if len(sources) > 32:
+            raise ValueError("compose takes at most 32 sources")
+        cls.bucket.request("compose")
+        cls.bucket.write(cls.name, b"".join(source.data() for source in sources))
+        cls.bucket.describe(cls)
+
+    def delete(cls, **kwargs: Any) -> None:
+        cls.bucket.request("delete")
+        with cls.bucket.lock:
+            if cls.name not in cls.bucket.objects:
+                raise NotFound(cls.name)
+            del cls.bucket.objects[cls.name]
+
+
+class FakeBucket(object):
+    """
+    An in-memory GCS bucket.
+
+    Objects keep every generation they were written with, so reads pinned to
+    a generation see that version. Every request is counted by kind in
+    ``requests`` and ``bytes``, waits ``latency`` seconds, and streams at
+    ``bandwidth`` bytes per second if set, so parallel transfers are faster
+    than one stream, as they are against GCS.
+    """
+
+    def __init__(
+        cls, name: str = "fake-bucket", latency: float = 0.0, bandwidth: float = 0.0
+    ) -> None:
+        cls.name = name
+        cls.latency = latency
+        cls.bandwidth = bandwidth
+        cls.objects: Dict[str, Tuple[int, float]] = {}
+        cls.versions: Dict[Tuple[str, int], bytes] = {}
+        cls.generation = 0
+        cls.requests: Counter = Counter()
+        cls.bytes: Counter = Counter()
+        cls.lock = threading.Lock()
+
+    def request(cls, kind: str, size: int = 0) -> None:
+        with cls.lock:
+            cls.requests[kind] += 1
+            cls.bytes[kind] += size
+        delay = cls.latency + (size / cls.bandwidth if cls.bandwidth else 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def write(cls, name: str, data: bytes) -> None:
+        with cls.lock:
+            cls.generation += 1
+            cls.objects[name] = (cls.generation, time.time())
+            cls.versions[(name, cls.generation)] = data
+
+    def read(cls, name: str, generation: int = None) -> bytes:
+        with cls.lock:
+            if generation is None:
+                if name not in cls.objects:
+                    raise NotFound(name)
+                generation = cls.objects[name][0]
+            if (name, generation) not in cls.versions:
+                raise NotFound(f"{name}#{generation}")
+            return cls.versions[(name, generation)]
+
+    def describe(cls, blob: FakeBlob) -> None:
+        with cls.lock:
+            if blob.name not in cls.objects:
+                raise NotFound(blob.name)
+            generation, updated = cls.objects[blob.name]
+            data = cls.versions[(blob.name, generation)]
+        blob.generation = generation
+        blob.size = len(data)
+        blob.etag = hashlib.md5(f"{blob.name}#{generation}".encode()).hexdigest()
+        crc32c = google_crc32c.value(data).to_bytes(4, "big")
+        blob.crc32c = base64.b64encode(crc32c).decode()
+        blob.updated = updated
+
+    def blob(cls, name: str, generation: int = None, **kwargs: Any) -> FakeBlob:
+        return FakeBlob(cls, name, generation)
+
+    def get_blob(cls, name: str, **kwargs: Any) -> Optional[FakeBlob]:
+        cls.request("metadata")
+        if name not in cls.objects:
+            return None
+        blob = FakeBlob(cls, name)
+        cls.describe(blob)
+        return blob
+
+    def list_blobs(cls, prefix: str = "", **kwargs: Any) -> List[FakeBlob]:
+        cls.request("list")
+        blobs = []
+        for name in sorted(cls.objects):
+            if name.startswith(prefix):
+                blob = FakeBlob(cls, name)
+                cls.describe(blob)
+                blobs.append(blob)
+        return blobs
+
+
+class FakeTransport(BaseAdapter):
+    """
+    A requests transport that answers GCS JSON API calls for objects in
+    ``objects`` without a network, and counts the round trips it serves by
+    method and path in ``requests``.
+    """
+
+    def __init__(cls, objects: Dict[str, bytes] = None) -> None:
+        super().__init__()
+        cls.objects = objects or {}
+        cls.requests: Counter = Counter()
+        cls.lock = threading.Lock()
+
+    def send(cls, request: PreparedRequest, **kwargs: Any) -> Response:
+        path = urlsplit(request.url).path
+        with cls.lock:
+            cls.requests[(request.method, path)] += 1
+        response = Response()
+        response.request = request
+        response.url = request.url
+        response.headers["Content-Type"] = "application/json"
+        bucket, _, name = path.partition("/storage/v1/b/")[2].partition("/o/")
+        name = unquote(name)
+        if request.method == "GET" and name in cls.objects:
+            data = cls.objects[name]
+            response.status_code = 200
+            body = {"bucket": bucket, "name": name, "size": str(len(data))}
+            response._content = json.dumps(body).encode()
+        else:
+            response.status_code = 404
+            response._content = json.dumps({"error": {"code": 404}}).encode()
+        return response
+
+    def close(cls) -> None:
+        pass
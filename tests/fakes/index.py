@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import shutil
+import tempfile
+from typing import List
+
+from testing_config import BaseTestConfig
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from athenah_ai.client.vector_store import VectorStore
+from athenah_ai.indexer import AthenahIndexer
+from athenah_ai.indexer.index_client import IndexClient
+
+EMBEDDING_SIZE: int = 8
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """
+    A DeterministicFakeEmbedding that records the documents it embedded in
+    ``texts``.
+    """
+
+    texts: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+class FakeIndexClient(IndexClient):
+    """
+    An index client that embeds offline, with one CountingEmbedding shared by
+    every instance.
+    """
+
+    embedder = CountingEmbedding(size=EMBEDDING_SIZE)
+
+    def get_embedder(cls):
+        return cls.embedder
+
+
+class FakeIndexer(AthenahIndexer):
+    def get_embedder(cls):
+        return FakeIndexClient.embedder
+
+
+class FakeVectorStore(VectorStore):
+    def get_embedder(cls):
+        return DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+
+
+class IndexTestConfig(BaseTestConfig):
+    """
+    A test case with a temporary directory in ``dir``, removed after each
+    test, and the texts of the shared fake embedder cleared before it.
+    """
+
+    def setUp(cls):
+        super().setUp()
+        cls.dir = tempfile.mkdtemp()
+        FakeIndexClient.embedder.texts = []
+
+    def tearDown(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+        super().tearDown()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+
+def fake_embedding(value: Any, dim: int) -> List[float]:
+    seed = hashlib.sha256(json.dumps(value).encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(seed[:8], "big"))
+    vector = rng.standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeOpenAIServer(object):
+    """
+    A local OpenAI-compatible server for chat completions and embeddings.
+
+    Answers echo the last user message, embeddings are deterministic per
+    input. Every request waits ``latency`` seconds. Streamed answers are sent
+    one word per event, ``token_delay`` seconds apart, and blocking answers
+    wait for all the words. Errors queued with ``fail_next`` are returned by
+    the next embedding requests.
+    """
+
+    def __init__(
+        cls, latency: float = 0.0, dim: int = 8, token_delay: float = 0.0
+    ) -> None:
+        cls.latency = latency
+        cls.dim = dim
+        cls.token_delay = token_delay
+        cls.requests: List[Dict[str, Any]] = []
+        cls.in_flight = 0
+        cls.max_in_flight = 0
+        cls.failures: List[Tuple[int, Dict[str, str]]] = []
+        cls.lock = threading.Lock()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), cls.handler())
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(cls) -> str:
+        return f"http://127.0.0.1:{cls.server.server_address[1]}/v1"
+
+    def __enter__(cls) -> "FakeOpenAIServer":
+        cls.thread.start()
+        return cls
+
+    def __exit__(cls, *args: Any) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def fail_next(cls, status: int, count: int = 1, retry_after: float = None):
+        headers = {} if retry_after is None else {"Retry-After": str(retry_after)}
+        with cls.lock:
+            cls.failures.extend([(status, headers)] * count)
+
+    def paths(cls) -> List[str]:
+        with cls.lock:
+            return [request["path"] for request in cls.requests]
+
+    @staticmethod
+    def answer(body: Dict[str, Any]) -> str:
+        return "answer: " + body["messages"][-1]["content"]
+
+    def chat_completion(cls, body: Dict[str, Any]) -> Dict[str, Any]:
+        content = cls.answer(body)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": i,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+                for i in range(body.get("n") or 1)
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    def chat_chunks(cls, body: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        tokens = re.findall(r"\S+\s*", cls.answer(body))
+        deltas = [{"role": "assistant", "content": ""}]
+        deltas += [{"content": token} for token in tokens] + [{}]
+        for i, delta in enumerate(deltas):
+            yield {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": delta,
+                        "finish_reason": "stop" if i == len(deltas) - 1 else None,
+                    }
+                ],
+            }
+
+    def embeddings(cls, body: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = body["input"]
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = []
+        for i, value in enumerate(inputs):
+            embedding: Any = fake_embedding(value, cls.dim)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(
+                    np.array(embedding, dtype=np.float32).tobytes()
+                ).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(value) for value in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body["model"],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def handler(cls) -> type:
+        server = cls
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def send_json(
+                self,
+                status: int,
+                payload: Dict[str, Any],
+                headers: Dict[str, str] = None,
+            ) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_events(self, events: Iterator[Dict[str, Any]]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for i, event in enumerate(events):
+                    if i > 1:
+                        time.sleep(server.token_delay)
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server.lock:
+                    server.requests.append({"path": self.path, "body": body})
+                    server.in_flight += 1
+                    failure = None
+                    if self.path.endswith("/embeddings") and server.failures:
+                        failure = server.failures.pop(0)
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                chat = self.path.endswith("/chat/completions")
+                try:
+                    time.sleep(server.latency)
+                    if failure is not None:
+                        status, headers = failure
+                        error = {"message": "injected", "type": "injected"}
+                        self.send_json(status, {"error": error}, headers)
+                    elif chat and body.get("stream"):
+                        self.send_events(server.chat_chunks(body))
+                    elif chat:
+                        words = len(server.answer(body).split())
+                        time.sleep(server.token_delay * max(words - 1, 0))
+                        self.send_json(200, server.chat_completion(body))
+                    elif self.path.endswith("/embeddings"):
+                        self.send_json(200, server.embeddings(body))
+                    else:
+                        self.send_json(404, {"error": {"message": "not found"}})
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+        return Handler
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import re
+import zlib
+from typing import Any, List
+from unittest import TestCase, mock
+
+import athenah_ai.client.tokenizer as tokenizer_module
+
+PRETOKENIZE = re.compile(r" ?\w+| ?[^\w\s]+|\s+")
+
+
+class FakeEncoding(object):
+    """
+    A tiktoken Encoding that needs no downloaded BPE ranks.
+
+    Texts are split into words, punctuation runs and whitespace, as the
+    cl100k_base pretokenizer does, and each piece is one token. Every token
+    covers at least one UTF-8 byte, as real BPE tokens do.
+    """
+
+    def __init__(cls, name: str) -> None:
+        cls.name = name
+
+    def encode_ordinary(cls, text: str) -> List[int]:
+        return [
+            zlib.crc32(piece.encode("utf-8")) % 100_000
+            for piece in PRETOKENIZE.findall(text)
+        ]
+
+    def encode(cls, text: str, **kwargs: Any) -> List[int]:
+        return cls.encode_ordinary(text)
+
+    def encode_ordinary_batch(
+        cls, texts: List[str], num_threads: int = 8
+    ) -> List[List[int]]:
+        return [cls.encode_ordinary(text) for text in texts]
+
+
+class FakeTiktoken(object):
+    """
+    Stands in for the tiktoken module, with one FakeEncoding per name.
+    """
+
+    def __init__(cls) -> None:
+        cls.encodings = {}
+
+    def get_encoding(cls, name: str) -> FakeEncoding:
+        if name not in cls.encodings:
+            cls.encodings[name] = FakeEncoding(name)
+        return cls.encodings[name]
+
+    def encoding_for_model(cls, model: str) -> FakeEncoding:
+        return cls.get_encoding(tokenizer_module.FALLBACK_ENCODING)
+
+
+def use_fake_tiktoken(test: TestCase) -> None:
+    """
+    Patches the tokenizer to FakeTiktoken for the duration of a test, so no
+    encoding is downloaded.
+
+    Args:
+        test (TestCase): The running test.
+    """
+    tokenizer_module.get_encoding.cache_clear()
+    patch = mock.patch.object(tokenizer_module, "tiktoken", FakeTiktoken())
+    patch.start()
+    test.addCleanup(tokenizer_module.get_encoding.cache_clear)
+    test.addCleanup(patch.stop)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from unittest import mock
+
+from testing_config import BaseTestConfig
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import athenah_ai.client as client_module
+from athenah_ai.client import AthenahClient
+from athenah_ai.client.answer_cache import SemanticAnswerCache
+from tests.fakes.openai_server import FakeOpenAIServer
+from tests.fakes.tokenizer import use_fake_tiktoken
+
+
+class FakeStore(object):
+    pass
+
+
+class TestSemanticAnswerCache(BaseTestConfig):
+    key = ("dist", "xrpl", "v1", "gpt-4")
+
+    def setUp(cls):
+        use_fake_tiktoken(cls)
+        cls.store = FakeStore()
+        cls.cache = SemanticAnswerCache(threshold=0.9, max_entries=2)
+
+    def test_near_duplicates_hit(cls):
+        cls.cache.put(cls.key, cls.store, [1.0, 0.0, 0.0], "true", 1.5)
+        cls.assertEqual(cls.cache.get(cls.key, cls.store, [0.95, 0.1, 0.0]), "true")
+        cls.assertIsNone(cls.cache.get(cls.key, cls.store, [0.5, 0.5, 0.5]))
+        cls.assertIsNone(
+            cls.cache.get(("dist", "xrpl", "v2", "gpt-4"), cls.store, [1.0, 0, 0])
+        )
+        stats = cls.cache.stats()
+        cls.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        cls.assertAlmostEqual(stats["hit_ratio"], 1 / 3)
+        cls.assertEqual(stats["saved_seconds"], 1.5)
+
+    def test_evicts_least_recently_used(cls):
+        cls.cache.put(cls.key, cls.store, [1.0, 0.0, 0.0], "x", 1.0)
+        cls.cache.put(cls.key, cls.store, [0.0, 1.0, 0.0], "y", 1.0)
+        cls.cache.get(cls.key, cls.store, [1.0, 0.0, 0.0])
+        cls.cache.put(cls.key, cls.store, [0.0, 0.0, 1.0], "z", 1.0)
+        cls.assertEqual(cls.cache.get(cls.key, cls.store, [1.0, 0.0, 0.0]), "x")
+        cls.assertIsNone(cls.cache.get(cls.key, cls.store, [0.0, 1.0, 0.0]))
+        cls.assertEqual(cls.cache.stats()["evictions"], 1)
+
+    def test_store_change_invalidates(cls):
+        cls.cache.put(cls.key, cls.store, [1.0, 0.0, 0.0], "x", 1.0)
+        cls.assertIsNone(cls.cache.get(cls.key, FakeStore(), [1.0, 0.0, 0.0]))
+        cls.assertEqual(cls.cache.stats()["invalidations"], 1)
+
+    def test_expired_answers_miss(cls):
+        cls.cache.ttl = -1
+        cls.cache.put(cls.key, cls.store, [1.0, 0.0, 0.0], "x", 1.0)
+        cls.assertIsNone(cls.cache.get(cls.key, cls.store, [1.0, 0.0, 0.0]))
+        cls.assertEqual(cls.cache.stats()["entries"], 0)
+
+    def test_prompt_skips_llm_on_hit(cls):
+        cache = SemanticAnswerCache(threshold=0.99)
+        client = AthenahClient("id", model_name="gpt-4", answer_cache=cache)
+        client.db = FAISS.from_texts(
+            ["isNewerVersion compares two versions"], DeterministicFakeEmbedding(size=8)
+        )
+        with FakeOpenAIServer() as server, mock.patch.multiple(
+            client_module, OPENAI_API_KEY="sk-test", OPENAI_BASE_URL=server.base_url
+        ):
+            first = client.prompt("what does isNewerVersion return?")
+            second = client.prompt("what does isNewerVersion return?")
+            cls.assertEqual(first, second)
+            cls.assertEqual(len(server.paths()), 1)
+        cls.assertEqual(cache.stats()["hits"], 1)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import asyncio
+from unittest import mock
+
+from testing_config import BaseTestConfig
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import athenah_ai.client as client_module
+from athenah_ai.client import AthenahClient
+from athenah_ai.client.pool import close_async_pool, get_async_openai
+from tests.fakes.openai_server import FakeOpenAIServer
+from tests.fakes.tokenizer import use_fake_tiktoken
+
+
+class TestAsyncClient(BaseTestConfig):
+    prompts = [f"What does function_{i} return?" for i in range(6)]
+
+    def setUp(cls):
+        use_fake_tiktoken(cls)
+        cls.server = FakeOpenAIServer(latency=0.05).__enter__()
+        cls.patches = mock.patch.multiple(
+            client_module, OPENAI_API_KEY="sk-test", OPENAI_BASE_URL=cls.server.base_url
+        )
+        cls.patches.start()
+        cls.client = AthenahClient("id", model_name="gpt-4", max_concurrency=2)
+
+    def tearDown(cls):
+        cls.patches.stop()
+        cls.server.__exit__()
+
+    def run_async(cls, coroutine):
+        async def run():
+            try:
+                return await coroutine
+            finally:
+                await close_async_pool()
+
+        return asyncio.run(run())
+
+    def test_abase_prompt(cls):
+        response = cls.run_async(cls.client.abase_prompt("system", "hello"))
+        cls.assertEqual(response, "answer: hello")
+
+    def test_abatch_caps_concurrency(cls):
+        responses = cls.run_async(cls.client.abatch(cls.prompts, "system"))
+        cls.assertEqual(responses, [f"answer: {prompt}" for prompt in cls.prompts])
+        cls.assertEqual(len(cls.server.paths()), len(cls.prompts))
+        cls.assertLessEqual(cls.server.max_in_flight, 2)
+
+    def test_aprompt_retrieves_and_generates(cls):
+        cls.client.db = FAISS.from_texts(
+            ["bool isNewerVersion(std::uint64_t version)", "unrelated"],
+            DeterministicFakeEmbedding(size=8),
+        )
+        responses = cls.run_async(cls.client.abatch(cls.prompts[:3]))
+        cls.assertEqual(responses, [f"answer: {prompt}" for prompt in cls.prompts[:3]])
+        body = cls.server.requests[0]["body"]
+        cls.assertIn("isNewerVersion", body["messages"][0]["content"])
+
+    def test_pool_shared_per_loop(cls):
+        async def clients():
+            return get_async_openai("sk-test"), get_async_openai("sk-test")
+
+        first, second = cls.run_async(clients())
+        cls.assertIs(first, second)
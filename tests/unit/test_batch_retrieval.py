@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from typing import List
+from unittest import mock
+
+from testing_config import BaseTestConfig
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import athenah_ai.client as client_module
+from athenah_ai.client import AthenahClient
+from tests.fakes.openai_server import FakeOpenAIServer
+from tests.fakes.tokenizer import use_fake_tiktoken
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return super().embed_documents(texts)
+
+
+class TestBatchRetrieval(BaseTestConfig):
+    texts = [f"chunk {i} of BuildInfo.cpp" for i in range(20)]
+    queries = ["chunk 3 of BuildInfo.cpp", "chunk 17 of BuildInfo.cpp", "version"]
+
+    def setUp(cls):
+        use_fake_tiktoken(cls)
+        cls.embedder = CountingEmbedding(size=16)
+        cls.client = AthenahClient("id", model_name="gpt-4")
+        cls.client.db = FAISS.from_texts(cls.texts, cls.embedder)
+        cls.embedder.calls = 0
+
+    def test_retrieve_many_matches_single_queries(cls):
+        results = cls.client.retrieve_many(cls.queries, k=3)
+        cls.assertEqual(cls.embedder.calls, 1)
+        for query, docs in zip(cls.queries, results):
+            cls.assertEqual(docs, cls.client.db.similarity_search(query, k=3))
+
+    def test_prompt_many(cls):
+        with FakeOpenAIServer() as server, mock.patch.multiple(
+            client_module, OPENAI_API_KEY="sk-test", OPENAI_BASE_URL=server.base_url
+        ):
+            responses = cls.client.prompt_many(cls.queries)
+            cls.assertEqual(responses, [f"answer: {query}" for query in cls.queries])
+            cls.assertEqual(cls.embedder.calls, 1)
+            system = server.requests[0]["body"]["messages"][0]["content"]
+            cls.assertIn("BuildInfo.cpp", system)
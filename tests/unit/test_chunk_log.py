@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+
+from athenah_ai.indexer.chunk_log import ChunkLog, ChunkLogWriter
+from tests.fakes.index import FakeIndexClient, IndexTestConfig
+
+
+def chunk(source: str, index: int, text: str):
+    return (text, {"source": source, "chunk_index": index}, f"{source}:{index}")
+
+
+class TestChunkLog(IndexTestConfig):
+    def test_records_are_read_back(cls):
+        with ChunkLogWriter(cls.dir) as log:
+            log.append([chunk("src/a.py", 0, "a0"), chunk("src/a.py", 1, "a1")], "/r")
+            log.append([chunk("src/b.py", 0, "naïve ☃ text")], "/r")
+        reader = ChunkLog(cls.dir)
+        cls.assertEqual(len(reader), 3)
+        cls.assertEqual(
+            reader[2],
+            {
+                "id": "src/b.py:0",
+                "path": "/r/src/b.py",
+                "source": "src/b.py",
+                "chunk_index": 0,
+                "text": "naïve ☃ text",
+            },
+        )
+        cls.assertEqual(
+            [record["text"] for record in reader], ["a0", "a1", "naïve ☃ text"]
+        )
+        cls.assertEqual(reader.get("src/a.py:1")["text"], "a1")
+        cls.assertIsNone(reader.get("missing"))
+
+    def test_append_supersedes_and_failed_rewrite_keeps_log(cls):
+        with ChunkLogWriter(cls.dir) as log:
+            log.append([chunk("a.py", 0, "old")], "/r")
+        with ChunkLogWriter(cls.dir, append=True) as log:
+            log.append([chunk("a.py", 0, "new"), chunk("b.py", 0, "b")], "/r")
+        reader = ChunkLog(cls.dir)
+        cls.assertEqual(len(reader), 3)
+        cls.assertEqual(reader.get("a.py:0")["text"], "new")
+
+        with cls.assertRaises(RuntimeError):
+            with ChunkLogWriter(cls.dir) as log:
+                log.append([chunk("c.py", 0, "c")], "/r")
+                raise RuntimeError("build failed")
+        cls.assertEqual(len(ChunkLog(cls.dir)), 3)
+        cls.assertEqual(sorted(os.listdir(cls.dir)), ["chunks.idx", "chunks.log"])
+
+    def test_build_writes_one_log(cls):
+        root = os.path.join(cls.dir, "repo")
+        for i in range(3):
+            path = os.path.join(root, f"pkg_{i}", "module.py")
+            os.makedirs(os.path.dirname(path))
+            with open(path, "w") as file:
+                file.write(f"def function_{i}():\n    return {i}\n")
+        client = FakeIndexClient("local", "id", cls.dir, "repo", "v1", workers=1)
+        store = client.build("repo")
+        reader = ChunkLog(client.name_version_path)
+        cls.assertEqual(len(reader), store.index.ntotal)
+        cls.assertEqual(
+            [record["path"] for record in reader],
+            [os.path.join(root, f"pkg_{i}", "module.py") for i in range(3)],
+        )
+        names = os.listdir(client.name_version_path)
+        cls.assertFalse(any(name.startswith("split_") for name in names))
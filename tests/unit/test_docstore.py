@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import threading
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+from athenah_ai.client.docstore import (
+    CompactDocstore,
+    has_docstore,
+    load_docstore,
+    save_store,
+    store_lock,
+)
+from athenah_ai.client.store_cache import StoreCache
+from tests.fakes.index import EMBEDDING_SIZE, FakeVectorStore, IndexTestConfig
+
+
+class CachedVectorStore(FakeVectorStore):
+    store_cache: StoreCache = StoreCache()
+
+
+class TestDocstore(IndexTestConfig):
+    texts = ["alpha", "beta", "gamma", "délta"]
+    metadatas = [
+        {"source": "a.cpp", "file_type": "cpp", "chunk_index": 0, "total_chunks": 2},
+        {"source": "a.cpp", "file_type": "cpp", "chunk_index": 1, "total_chunks": 2},
+        {"source": "b.py", "file_type": "py", "chunk_index": 0, "total_chunks": 1},
+        {"source": "c", "file_summary": "notes"},
+    ]
+    ids = ["11", "7", "42", "9000000000000000000"]
+
+    def setUp(cls):
+        super().setUp()
+        cls.path = os.path.join(cls.dir, "test_docstore-v1")
+        cls.store = FAISS.from_texts(
+            cls.texts,
+            DeterministicFakeEmbedding(size=EMBEDDING_SIZE),
+            metadatas=cls.metadatas,
+            ids=cls.ids,
+        )
+
+    def test_compact_round_trip(cls):
+        save_store(
+            cls.path,
+            cls.store.index,
+            cls.store.docstore,
+            cls.store.index_to_docstore_id,
+        )
+        for mode in ("memory", "mmap"):
+            db = CachedVectorStore("local", mode).load("test_docstore", cls.dir)
+            cls.assertIsInstance(db.docstore, CompactDocstore)
+            cls.assertEqual(dict(db.index_to_docstore_id), dict(enumerate(cls.ids)))
+            for _id, text, metadata in zip(cls.ids, cls.texts, cls.metadatas):
+                doc = db.docstore.search(_id)
+                cls.assertEqual(doc.page_content, text)
+                cls.assertEqual(doc.metadata, metadata)
+            cls.assertEqual(db.docstore.search("12"), "ID 12 not found.")
+            cls.assertEqual(
+                db.similarity_search("beta", k=1)[0].page_content, "beta"
+            )
+
+    def test_mmap_converts_pickled_store(cls):
+        cls.store.save_local(cls.path)
+        memory = CachedVectorStore("local", "memory").load("test_docstore", cls.dir)
+        cls.assertFalse(has_docstore(cls.path))
+        lazy = CachedVectorStore("local", "mmap").load("test_docstore", cls.dir)
+        cls.assertTrue(has_docstore(cls.path))
+        for text in cls.texts:
+            cls.assertEqual(
+                memory.similarity_search(text, k=2), lazy.similarity_search(text, k=2)
+            )
+
+    def test_swap_waits_for_readers(cls):
+        def save(count: int):
+            store = FAISS.from_texts(
+                cls.texts[:count], DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+            )
+            save_store(
+                cls.path, store.index, store.docstore, store.index_to_docstore_id
+            )
+
+        save(4)
+        with store_lock(cls.path):
+            swap = threading.Thread(target=save, args=(2,))
+            swap.start()
+            swap.join(0.5)
+            cls.assertTrue(swap.is_alive())
+            db = CachedVectorStore("local", "mmap").load_compact(
+                cls.path, DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+            )
+        swap.join()
+        cls.assertEqual(db.index.ntotal, 4)
+        cls.assertEqual(len(db.docstore), 4)
+        cls.assertEqual(len(load_docstore(cls.path)[0]), 2)
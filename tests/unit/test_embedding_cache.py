@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import multiprocessing
+import shutil
+import tempfile
+from typing import List
+from unittest import mock
+
+import numpy as np
+
+from testing_config import BaseTestConfig
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from athenah_ai.client.embedding_cache import (
+    CachedDocumentEmbeddings,
+    CachedEmbeddings,
+    DiskVectorCache,
+    DocumentEmbeddingCache,
+    EmbeddingCache,
+    embedding_key,
+)
+
+MODEL: str = "text-embedding-ada-002"
+
+
+def embed_chunks(path: str, worker: int):
+    cache = DocumentEmbeddingCache(path, max_bytes=1024**2)
+    embedder = CachedDocumentEmbeddings(
+        DeterministicFakeEmbedding(size=8), MODEL, cache
+    )
+    for i in range(20):
+        embedder.embed_documents([f"chunk {worker} {i}", f"shared {i}"])
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    batches: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.batches.append(list(texts))
+        return super().embed_documents(texts)
+
+
+class TestEmbeddingCache(BaseTestConfig):
+    def setUp(cls):
+        cls.dir = tempfile.mkdtemp()
+        cls.embedder = CountingEmbedding(size=8)
+        cls.embedder.batches = []
+
+    def tearDown(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+
+    def test_only_misses_are_embedded(cls):
+        cache = EmbeddingCache()
+        embedder = CachedEmbeddings(cls.embedder, "fake", cache)
+        first = embedder.embed_query("what does  isNewerVersion return?")
+        vectors = embedder.embed_queries(
+            ["what does isNewerVersion return?", "other", "other"]
+        )
+        cls.assertEqual(vectors[0], first)
+        cls.assertEqual(vectors[1], vectors[2])
+        cls.assertEqual(
+            cls.embedder.batches, [["what does isNewerVersion return?"], ["other"]]
+        )
+        cls.assertEqual(cache.stats()["memory_hits"], 1)
+        cls.assertEqual(cache.stats()["misses"], 3)
+
+    def test_disk_layer_survives_process_cache(cls):
+        embedder = CachedEmbeddings(
+            cls.embedder, "fake", EmbeddingCache(disk_dir=cls.dir, disk_bytes=4096)
+        )
+        vector = embedder.embed_query("persisted")
+        embedder.cache.flush()
+        cache = EmbeddingCache(disk_dir=cls.dir, disk_bytes=4096)
+        cls.assertTrue(np.allclose(cache.get("fake", "persisted"), vector))
+        cls.assertEqual(cache.stats()["disk_hits"], 1)
+        cls.assertIsNone(cache.get("other-model", "persisted"))
+
+    def test_ttl_expires_entries(cls):
+        cache = EmbeddingCache(ttl=-1, disk_dir=cls.dir, disk_bytes=4096)
+        cache.put("fake", "stale", [0.0] * 8)
+        cls.assertIsNone(cache.get("fake", "stale"))
+
+    def test_disk_evicts_least_recently_used(cls):
+        disk = DiskVectorCache(cls.dir, max_bytes=4 * (8 * 4 + 40))
+        keys = [embedding_key("fake", str(i)) for i in range(5)]
+        for key in keys[:4]:
+            disk.put(key, [1.0] * 8)
+        disk.get(keys[0])
+        disk.put(keys[4], [2.0] * 8)
+        cls.assertEqual(len(disk), 4)
+        cls.assertIsNotNone(disk.get(keys[0]))
+        cls.assertIsNone(disk.get(keys[1]))
+        cls.assertEqual(disk.get(keys[4]).tolist(), [2.0] * 8)
+
+    def test_disk_applies_changed_slots_from_other_caches(cls):
+        writer = DiskVectorCache(cls.dir, max_bytes=4 * (8 * 4 + 40))
+        reader = DiskVectorCache(cls.dir, max_bytes=4 * (8 * 4 + 40))
+        keys = [embedding_key("fake", str(i)) for i in range(6)]
+        writer.put_many(keys[:4], [[float(i)] * 8 for i in range(4)])
+        cls.assertEqual(reader.get(keys[3]).tolist(), [3.0] * 8)
+
+        writer.put_many(keys[4:], [[4.0] * 8, [5.0] * 8])
+        with mock.patch.object(reader, "reindex") as reindex:
+            vectors = reader.get_many(keys)
+        reindex.assert_not_called()
+        cls.assertEqual(sum(vector is None for vector in vectors), 2)
+        cls.assertEqual(vectors[5].tolist(), [5.0] * 8)
+        cls.assertEqual(reader.index, writer.index)
+
+    def test_document_cache_reports_savings(cls):
+        cache = DocumentEmbeddingCache(cls.dir, max_bytes=1024**2)
+        embedder = CachedDocumentEmbeddings(cls.embedder, MODEL, cache)
+        texts = ["int main() {}", "return 0;", "int main() {}"]
+        first = embedder.embed_documents(texts)
+        cls.assertEqual(cls.embedder.batches, [["int main() {}", "return 0;"]])
+        embedder = CachedDocumentEmbeddings(
+            cls.embedder, MODEL, DocumentEmbeddingCache(cls.dir, max_bytes=1024**2)
+        )
+        cls.assertTrue(np.allclose(embedder.embed_documents(texts), first))
+        cls.assertEqual(len(cls.embedder.batches), 1)
+        stats = embedder.cache.stats()
+        cls.assertEqual(stats["embeddings_saved"], 3)
+        cls.assertEqual(stats["chars_saved"], sum(len(text) for text in texts))
+
+    def test_document_cache_is_shared_between_processes(cls):
+        workers = [
+            multiprocessing.Process(target=embed_chunks, args=(cls.dir, worker))
+            for worker in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            cls.assertEqual(worker.exitcode, 0)
+        cache = DocumentEmbeddingCache(cls.dir, max_bytes=1024**2)
+        texts = [f"chunk {w} {i}" for w in range(4) for i in range(20)]
+        texts += [f"shared {i}" for i in range(20)]
+        vectors = cache.get_many(MODEL, texts)
+        cls.assertTrue(all(vector is not None for vector in vectors))
+        cls.assertEqual(len(cache.disk(MODEL)), 100)
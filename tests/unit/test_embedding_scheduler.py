@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import time
+
+import numpy as np
+import openai
+
+from testing_config import BaseTestConfig
+
+from athenah_ai.indexer.embedding_scheduler import (
+    ScheduledEmbeddings,
+    TokenBucket,
+    pack_batches,
+)
+from tests.fakes.openai_server import FakeOpenAIServer, fake_embedding
+from tests.fakes.tokenizer import use_fake_tiktoken
+
+
+class TestEmbeddingScheduler(BaseTestConfig):
+    def setUp(cls):
+        use_fake_tiktoken(cls)
+        cls.texts = [f"chunk {i} " + "word " * (i % 7) for i in range(64)]
+
+    def embedder(cls, server: FakeOpenAIServer, **kwargs) -> ScheduledEmbeddings:
+        options = dict(
+            concurrency=8, max_request_tokens=40, retry_base=0.01, rpm=0, tpm=0
+        )
+        options.update(kwargs)
+        return ScheduledEmbeddings(
+            "text-embedding-ada-002", "sk-test", server.base_url, **options
+        )
+
+    def assertVectors(cls, vectors, texts):
+        cls.assertEqual(len(vectors), len(texts))
+        for vector, text in zip(vectors, texts):
+            cls.assertTrue(np.allclose(vector, fake_embedding(text, 8), atol=1e-6))
+
+    def test_batches_run_concurrently_in_order(cls):
+        with FakeOpenAIServer(latency=0.1) as server:
+            embedder = cls.embedder(server)
+            start = time.perf_counter()
+            vectors = embedder.embed_documents(cls.texts)
+            elapsed = time.perf_counter() - start
+        cls.assertVectors(vectors, cls.texts)
+        requests = len(server.paths())
+        cls.assertGreater(requests, 8)
+        cls.assertGreater(server.max_in_flight, 1)
+        cls.assertLess(elapsed, requests * 0.1 / 2)
+
+    def test_rate_limits_are_retried(cls):
+        with FakeOpenAIServer() as server:
+            server.fail_next(429, count=3)
+            server.fail_next(500)
+            embedder = cls.embedder(server)
+            vectors = embedder.embed_documents(cls.texts)
+        cls.assertVectors(vectors, cls.texts)
+        cls.assertEqual(embedder.retries, 4)
+        cls.assertEqual(embedder.requests, len(server.paths()))
+
+    def test_retry_after_is_honoured(cls):
+        with FakeOpenAIServer() as server:
+            server.fail_next(429, retry_after=0.3)
+            embedder = cls.embedder(server, concurrency=1)
+            start = time.perf_counter()
+            embedder.embed_documents(["one"])
+        cls.assertGreaterEqual(time.perf_counter() - start, 0.3)
+
+    def test_client_errors_are_not_retried(cls):
+        with FakeOpenAIServer() as server:
+            server.fail_next(400)
+            embedder = cls.embedder(server)
+            with cls.assertRaises(openai.BadRequestError):
+                embedder.embed_documents(["one"])
+        cls.assertEqual(embedder.retries, 0)
+
+    def test_request_rate_is_limited(cls):
+        bucket = TokenBucket(per_minute=600, capacity=1)
+        start = time.perf_counter()
+        for _ in range(4):
+            bucket.acquire()
+        cls.assertGreaterEqual(time.perf_counter() - start, 0.28)
+
+    def test_pack_batches(cls):
+        cls.assertEqual(
+            pack_batches([5, 5, 5, 20, 1, 1], max_tokens=10),
+            [(0, 2), (2, 3), (3, 4), (4, 6)],
+        )
+        cls.assertEqual(
+            pack_batches([1] * 5, max_tokens=100, max_inputs=2),
+            [(0, 2), (2, 4), (4, 5)],
+        )
+        cls.assertEqual(pack_batches([]), [])
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+from unittest import mock
+
+import numpy as np
+from google.api_core.exceptions import NotFound
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+import athenah_ai.client.vector_store as vector_store_module
+from athenah_ai.client.vector_store import search_by_vectors
+from athenah_ai.libs.google.transfer import (
+    download_file,
+    download_files,
+    upload_file,
+    upload_files,
+)
+from tests.fakes.gcs import FakeBlob, FakeBucket
+from tests.fakes.index import (
+    EMBEDDING_SIZE,
+    FakeIndexClient,
+    FakeVectorStore,
+    IndexTestConfig,
+)
+
+
+class TestGcsTransfer(IndexTestConfig):
+    def setUp(cls):
+        super().setUp()
+        cls.bucket = FakeBucket()
+        cls.data = np.random.default_rng(0).integers(0, 256, 100_000, dtype=np.uint8)
+
+    def test_composite_upload_and_sliced_download(cls):
+        path = os.path.join(cls.dir, "blob")
+        cls.data.tofile(path)
+        upload_file(cls.bucket, "blob", path, part_size=1000, workers=4)
+        cls.assertEqual(list(cls.bucket.objects), ["blob"])
+        cls.assertEqual(cls.bucket.requests["upload"], 100)
+        # 100 parts take 4 composes into 4 groups of at most 32, then one.
+        cls.assertEqual(cls.bucket.requests["compose"], 5)
+
+        dest = os.path.join(cls.dir, "out")
+        download_file(cls.bucket, "blob", dest, part_size=3000, workers=4)
+        cls.assertTrue(np.array_equal(np.fromfile(dest, dtype=np.uint8), cls.data))
+        cls.assertEqual(cls.bucket.requests["download"], 34)
+
+    def test_failed_uploads_delete_their_parts(cls):
+        path = os.path.join(cls.dir, "blob")
+        cls.data.tofile(path)
+        upload = FakeBlob.upload_from_file
+
+        def fail_one_part(blob, file_obj, size=None, **kwargs):
+            if blob.name.endswith("-00042"):
+                raise ConnectionError("reset")
+            upload(blob, file_obj, size, **kwargs)
+
+        with mock.patch.object(FakeBlob, "upload_from_file", fail_one_part):
+            with cls.assertRaises(ConnectionError):
+                upload_file(cls.bucket, "blob", path, part_size=1000, workers=4)
+        cls.assertEqual(cls.bucket.objects, {})
+
+        compose = FakeBlob.compose
+
+        def fail_final_compose(blob, sources, **kwargs):
+            if blob.name == "blob":
+                raise ConnectionError("reset")
+            compose(blob, sources, **kwargs)
+
+        with mock.patch.object(FakeBlob, "compose", fail_final_compose):
+            with cls.assertRaises(ConnectionError):
+                upload_file(cls.bucket, "blob", path, part_size=1000, workers=4)
+        cls.assertEqual(cls.bucket.objects, {})
+
+    def test_files_stream_without_shared_temp_files(cls):
+        path = os.path.join(cls.dir, "index.faiss")
+        cls.data.tofile(path)
+        upload_file(cls.bucket, "index.faiss", path, part_size=7000)
+        dest = os.path.join(cls.dir, "out", "index.faiss")
+        download_file(cls.bucket, "index.faiss", dest, part_size=7000)
+        cls.assertTrue(np.array_equal(np.fromfile(dest, dtype=np.uint8), cls.data))
+        cls.assertEqual(os.listdir(os.path.dirname(dest)), ["index.faiss"])
+
+        open(path, "w").close()
+        upload_file(cls.bucket, "empty", path)
+        download_file(cls.bucket, "empty", dest)
+        cls.assertEqual(os.path.getsize(dest), 0)
+
+    def test_files_move_together_with_their_metadata(cls):
+        files = []
+        for i in range(3):
+            path = os.path.join(cls.dir, f"file_{i}")
+            cls.data[: (i + 1) * 1000].tofile(path)
+            files.append((f"files/file_{i}", path))
+        upload_files(cls.bucket, files)
+        blobs = download_files(
+            cls.bucket,
+            [(name, os.path.join(cls.dir, "out", name)) for name, _ in files],
+        )
+        cls.assertEqual([blob.size for blob in blobs], [1000, 2000, 3000])
+        cls.assertEqual(
+            [blob.generation for blob in blobs],
+            [cls.bucket.objects[name][0] for name, _ in files],
+        )
+        with cls.assertRaises(NotFound):
+            download_files(cls.bucket, [("missing", os.path.join(cls.dir, "x"))])
+
+    def test_index_saved_and_loaded_through_bucket(cls):
+        root = os.path.join(cls.dir, "repo")
+        os.makedirs(root)
+        for i in range(3):
+            with open(os.path.join(root, f"module_{i}.py"), "w") as file:
+                file.write(f"def function_{i}():\n    return {i}\n")
+        client = FakeIndexClient("local", "id", cls.dir, "repo", "v1", workers=1)
+        client.storage_type = "gcs"
+        client.bucket = cls.bucket
+        built = client.build("repo", root=root)
+        cls.assertIn("repo/v1/index.faiss", cls.bucket.objects)
+
+        store = FakeVectorStore("gcs")
+        store.bucket = cls.bucket
+        with mock.patch.object(vector_store_module, "basedir", cls.dir):
+            loaded = store.load_gcs("repo", "v1")
+        cls.assertEqual(store.name_version_path, os.path.join(cls.dir, "dist/repo-v1"))
+        query = [DeterministicFakeEmbedding(size=EMBEDDING_SIZE).embed_query("query")]
+        cls.assertEqual(
+            [doc.page_content for doc, _ in search_by_vectors(loaded, query, 3)[0]],
+            [doc.page_content for doc, _ in search_by_vectors(built, query, 3)[0]],
+        )
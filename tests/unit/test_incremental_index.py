@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+from typing import List
+
+import faiss
+
+from athenah_ai.client.docstore import load_mutable_store
+from athenah_ai.client.index_spec import load_spec
+from athenah_ai.indexer.manifest import Manifest
+from tests.fakes.index import FakeIndexClient, IndexTestConfig
+
+
+class TestIncrementalIndex(IndexTestConfig):
+    def setUp(cls):
+        super().setUp()
+        for i in range(4):
+            cls.write(f"src/module_{i}.py", f"def function_{i}():\n    return {i}\n")
+
+    def client(cls, index_spec: str = "Flat") -> FakeIndexClient:
+        return FakeIndexClient(
+            "local", "id", cls.dir, "repo", "v1", index_spec=index_spec
+        )
+
+    def write(cls, name: str, content: str):
+        path = os.path.join(cls.dir, "repo", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(content)
+
+    def sources(cls, client: FakeIndexClient) -> List[str]:
+        store = load_mutable_store(client.name_version_path, client.get_embedder())
+        return sorted(doc.metadata["source"] for doc in store.docstore._dict.values())
+
+    def test_rebuild_only_embeds_changes(cls):
+        cls.client().build("repo", incremental=True)
+        cls.assertEqual(len(FakeIndexClient.embedder.texts), 4)
+        manifest = Manifest.load(cls.client().name_version_path)
+        cls.assertEqual(
+            sorted(manifest.files), [f"src/module_{i}.py" for i in range(4)]
+        )
+
+        FakeIndexClient.embedder.texts = []
+        cls.client().build("repo", incremental=True)
+        cls.assertEqual(FakeIndexClient.embedder.texts, [])
+
+        cls.write("src/module_1.py", "def function_1():\n    return 'changed'\n")
+        cls.write("src/module_9.py", "def function_9():\n    return 9\n")
+        os.remove(os.path.join(cls.dir, "repo", "src/module_3.py"))
+        client = cls.client()
+        store = client.build("repo", incremental=True)
+        cls.assertEqual(
+            sorted(FakeIndexClient.embedder.texts),
+            [
+                "def function_1():\n    return 'changed'",
+                "def function_9():\n    return 9",
+            ],
+        )
+        cls.assertEqual(store.index.ntotal, 4)
+        cls.assertEqual(
+            cls.sources(client),
+            [f"src/module_{i}.py" for i in [0, 1, 2, 9]],
+        )
+        texts = [doc.page_content for doc in store.similarity_search("return", k=4)]
+        cls.assertNotIn("def function_3():\n    return 3", texts)
+
+    def test_full_build_drops_manifest(cls):
+        cls.client().build("repo", incremental=True)
+        client = cls.client()
+        client.build("repo")
+        cls.assertEqual(Manifest.load(client.name_version_path).files, {})
+
+    def test_rebuild_uses_index_spec(cls):
+        for i in range(4, 40):
+            cls.write(f"src/module_{i}.py", f"def function_{i}():\n    return {i}\n")
+        cls.client("IVF2,Flat").build("repo", incremental=True)
+        path = cls.client().name_version_path
+        cls.assertEqual(load_spec(path), "IVF2,Flat")
+
+        cls.write("src/module_1.py", "def function_1():\n    return 'changed'\n")
+        with cls.assertLogs("app", "INFO") as logs:
+            store = cls.client().build("repo", incremental=True)
+        cls.assertIn("KEEPING INDEX SPEC IVF2,Flat", "\n".join(logs.output))
+        cls.assertIsNotNone(faiss.try_extract_index_ivf(store.index))
+        cls.assertEqual(store.index.ntotal, 40)
+        cls.assertEqual(load_spec(path), "IVF2,Flat")
+
+        shutil.rmtree(path)
+        with cls.assertLogs("app", "WARNING") as logs:
+            store = cls.client("HNSW16").build("repo", incremental=True)
+        cls.assertIn("HNSW16 CANNOT REMOVE CHUNKS", logs.output[0])
+        cls.assertIsInstance(faiss.downcast_index(store.index), faiss.IndexFlatL2)
+        cls.assertEqual(load_spec(path), "Flat")
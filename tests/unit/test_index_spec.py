@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+
+import faiss
+import numpy as np
+
+from testing_config import BaseTestConfig
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from athenah_ai.client.docstore import StoreWriter, load_mutable_store, save_store
+from athenah_ai.client.index_spec import PARAMS_FILE, find_hnsw, load_params
+from athenah_ai.client.vector_store import VectorStore
+
+
+class TestIndexSpec(BaseTestConfig):
+    def setUp(cls):
+        cls.dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(7)
+        centers = rng.normal(size=(32, 16))
+        cls.vectors = (
+            centers[rng.integers(0, 32, 4000)] + rng.normal(scale=0.1, size=(4000, 16))
+        ).astype(np.float32)
+        cls.embedder = DeterministicFakeEmbedding(size=16)
+
+    def tearDown(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+
+    def write(cls, spec: str, vectors: np.ndarray):
+        with StoreWriter(cls.dir, spec) as writer:
+            for start in range(0, len(vectors), 1000):
+                rows = range(start, min(start + 1000, len(vectors)))
+                writer.add(
+                    vectors[start : start + 1000],
+                    [f"text {i}" for i in rows],
+                    [{"source": f"file_{i}.py"} for i in rows],
+                    [str(i) for i in rows],
+                )
+
+    def load(cls, load_mode: str = "mmap"):
+        return VectorStore("local", load_mode=load_mode).load_compact(
+            cls.dir, cls.embedder
+        )
+
+    def test_ivf_params_are_saved_and_applied(cls):
+        cls.write("IVF32,Flat", cls.vectors)
+        cls.assertEqual(load_params(cls.dir), {"nprobe": 16})
+        for store in [cls.load("mmap"), cls.load("memory")]:
+            cls.assertEqual(faiss.extract_index_ivf(store.index).nprobe, 16)
+            cls.assertEqual(store.index.ntotal, 4000)
+            _, ids = store.index.search(cls.vectors[:50], 1)
+            cls.assertGreaterEqual(np.mean(ids[:, 0] == np.arange(50)), 0.9)
+            doc = store.docstore.search(store.index_to_docstore_id[int(ids[0][0])])
+            cls.assertEqual(doc.page_content, "text 0")
+        store = load_mutable_store(cls.dir, cls.embedder)
+        cls.assertEqual(faiss.extract_index_ivf(store.index).nprobe, 16)
+        cls.assertFalse(os.path.exists(os.path.join(cls.dir, "vectors.f32")))
+
+    def test_hnsw_and_opq_specs(cls):
+        cls.write("HNSW16", cls.vectors)
+        cls.assertEqual(find_hnsw(cls.load().index).hnsw.efSearch, 64)
+        cls.write("OPQ4,IVF16,PQ4x4", cls.vectors)
+        cls.assertEqual(load_params(cls.dir), {"nprobe": 16})
+        cls.assertEqual(cls.load().index.ntotal, 4000)
+
+    def test_small_corpora_fall_back_to_flat(cls):
+        cls.write("IVF1024,Flat", cls.vectors[:100])
+        cls.assertEqual(load_params(cls.dir), {})
+        cls.assertIsInstance(faiss.downcast_index(cls.load().index), faiss.IndexFlat)
+
+    def test_flat_saves_no_params(cls):
+        cls.write("IVF32,Flat", cls.vectors)
+        store = cls.load("memory")
+        save_store(cls.dir, faiss.IndexFlatL2(16), store.docstore, {})
+        cls.assertEqual(load_params(cls.dir), {})
+        cls.assertTrue(os.path.exists(os.path.join(cls.dir, PARAMS_FILE)))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+from typing import List, Tuple
+from unittest import mock
+
+import athenah_ai.indexer as indexer_module
+from athenah_ai.client.docstore import load_mutable_store
+from athenah_ai.indexer.snapshot import reflink_file, snapshot
+from tests.fakes.index import FakeIndexer, IndexTestConfig
+
+
+class TestInplaceIndex(IndexTestConfig):
+    def setUp(cls):
+        super().setUp()
+        cls.source = os.path.join(cls.dir, "source")
+        for name in [
+            "src/main.py",
+            "src/lib/util.py",
+            "src/node_modules/pkg/index.js",
+            "src/build/out.py",
+            "src/.git/config",
+            "docs/readme.md",
+        ]:
+            path = os.path.join(cls.source, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(f"# {name}\nvalue = '{name}'\n")
+        cls.patch = mock.patch.object(indexer_module, "basedir", cls.dir)
+        cls.patch.start()
+
+    def tearDown(cls):
+        cls.patch.stop()
+        super().tearDown()
+
+    def indexer(cls) -> FakeIndexer:
+        return FakeIndexer(
+            "local", "id", os.path.join(cls.dir, "dist"), "repo", "v1", workers=1
+        )
+
+    def sources(cls, indexer: FakeIndexer) -> List[str]:
+        store = load_mutable_store(indexer.name_version_path, indexer.get_embedder())
+        return sorted(doc.metadata["source"] for doc in store.docstore._dict.values())
+
+    def test_inplace_skips_copy_and_ignored_paths(cls):
+        indexer = cls.indexer()
+        with mock.patch.object(shutil, "copytree") as copytree:
+            indexer.index_dir(cls.source, ["src"], "repo", source_mode="inplace")
+        copytree.assert_not_called()
+        cls.assertFalse(os.path.exists(os.path.join(indexer.name_path, "repo-source")))
+        cls.assertEqual(cls.sources(indexer), ["src/lib/util.py", "src/main.py"])
+
+    def ids(cls, indexer: FakeIndexer) -> List[Tuple[str, str]]:
+        store = load_mutable_store(indexer.name_version_path, indexer.get_embedder())
+        return sorted(
+            (doc.metadata["source"], _id) for _id, doc in store.docstore._dict.items()
+        )
+
+    def test_snapshot_modes_match_inplace(cls):
+        for files in [["src", "docs"], None]:
+            indexer = cls.indexer()
+            indexer.index_dir(cls.source, files, "repo", source_mode="inplace")
+            expected = cls.ids(indexer)
+            cls.assertIn("src/main.py", [source for source, _ in expected])
+            for source_mode in ["copy", "hardlink", "reflink"]:
+                indexer = cls.indexer()
+                indexer.index_dir(cls.source, files, "repo", source_mode=source_mode)
+                cls.assertEqual(cls.ids(indexer), expected, source_mode)
+
+        dest = os.path.join(indexer.name_path, "repo-source")
+        cls.assertFalse(os.path.exists(os.path.join(dest, "src/node_modules")))
+
+    def test_inplace_file(cls):
+        indexer = cls.indexer()
+        path = os.path.join(cls.source, "src/main.py")
+        indexer.index_file(path, "repo", source_mode="inplace")
+        cls.assertEqual(cls.sources(indexer), ["main.py"])
+        expected = cls.ids(indexer)
+        for source_mode in ["copy", "hardlink"]:
+            indexer.index_file(path, "repo", source_mode=source_mode)
+            cls.assertEqual(cls.ids(indexer), expected, source_mode)
+        with cls.assertRaises(ValueError):
+            indexer.index_file(path, "repo", source_mode="symlink")
+
+    def test_name_matching_ignore_patterns(cls):
+        path = os.path.join(cls.source, "src/main.py")
+        for source_mode in ["copy", "hardlink"]:
+            indexer = FakeIndexer(
+                "local", "id", os.path.join(cls.dir, "dist"), "build_info", "v1"
+            )
+            indexer.workers = 1
+            indexer.index_file(path, "build_info", source_mode=source_mode)
+            cls.assertEqual(len(cls.sources(indexer)), 1, source_mode)
+
+    def test_links(cls):
+        dest = os.path.join(cls.dir, "snapshot")
+        snapshot(cls.source, dest, "hardlink")
+        source_path = os.path.join(cls.source, "src/main.py")
+        cls.assertEqual(
+            os.stat(os.path.join(dest, "src/main.py")).st_ino,
+            os.stat(source_path).st_ino,
+        )
+        clone = reflink_file(source_path, os.path.join(cls.dir, "clone.py"))
+        with open(clone) as a, open(source_path) as b:
+            cls.assertEqual(a.read(), b.read())
+        cls.assertEqual(
+            os.stat(clone).st_mtime_ns, os.stat(source_path).st_mtime_ns
+        )
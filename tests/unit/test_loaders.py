@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from testing_config import BaseTestConfig
+
+from langchain_core.documents import Document
+
+from athenah_ai.indexer import loaders
+from athenah_ai.indexer.base_index_client import BaseIndexClient
+from athenah_ai.indexer.loaders import load_document
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "fixtures")
+
+
+class TestLoaders(BaseTestConfig):
+    def setUp(cls):
+        cls.dir = tempfile.mkdtemp()
+
+    def tearDown(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+
+    def write(cls, name: str, data: bytes) -> str:
+        path = os.path.join(cls.dir, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_code_is_read_verbatim(cls):
+        path = os.path.join(FIXTURES, "BuildInfo.cpp")
+        with open(path) as file:
+            content = file.read()
+        docs = BaseIndexClient.load_file(path)
+        cls.assertEqual(len(docs), 1)
+        cls.assertEqual(docs[0].page_content, content)
+        cls.assertEqual(docs[0].metadata, {"source": path})
+
+    def test_encodings_are_detected(cls):
+        text = (
+            "Les élèves étaient très préoccupés par les problèmes de l'été, "
+            "à côté de la forêt où ils réfléchissaient.\n"
+        ) * 5
+        for name, data in [
+            ("bom.txt", b"\xef\xbb\xbf" + text.encode("utf-8")),
+            ("latin.txt", text.encode("latin-1")),
+            ("wide.txt", text.encode("utf-16")),
+        ]:
+            docs = load_document(cls.write(name, data))
+            cls.assertEqual(docs[0].page_content, text, name)
+
+    def test_binary_files_are_skipped(cls):
+        path = cls.write("blob", b"\x00\xff\xfe\x01" * 64)
+        cls.assertEqual(load_document(path, "text"), [])
+        # Without a NUL to sniff, no encoding decodes it either.
+        path = cls.write("noise", bytes(range(1, 256)) * 40)
+        cls.assertEqual(load_document(path, "text"), [])
+
+    def test_rich_formats_go_to_unstructured(cls):
+        path = cls.write("page.html", b"<html><body><p>Page</p></body></html>")
+        doc = Document(page_content="Page", metadata={"source": path})
+        with mock.patch.object(loaders, "UnstructuredFileLoader") as loader:
+            loader.return_value.load.return_value = [doc]
+            cls.assertEqual(load_document(path), [doc])
+            load_document(cls.write("notes.md", b"# Notes\n"))
+        loader.assert_called_once_with(path)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+from typing import List
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from langchain_community.vectorstores import FAISS
+
+from athenah_ai.client.docstore import load_docstore, write_docstore
+from athenah_ai.client.vector_store import search_by_vectors
+from athenah_ai.indexer.chunk_log import ChunkLog
+from athenah_ai.indexer.manifest import Manifest
+from athenah_ai.indexer.merge import merge_indexes
+from tests.fakes.index import EMBEDDING_SIZE, FakeIndexClient, IndexTestConfig
+
+
+class TestMergeIndex(IndexTestConfig):
+    def write(cls, name: str, content: str):
+        path = os.path.join(cls.dir, "sources", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(content)
+
+    def client(cls, name: str) -> FakeIndexClient:
+        return FakeIndexClient("local", "id", cls.dir, name, "v1", workers=1)
+
+    def texts(cls, store) -> List[str]:
+        query = DeterministicFakeEmbedding(size=EMBEDDING_SIZE).embed_query("query")
+        results = search_by_vectors(store, [query], 50)[0]
+        return [doc.page_content for doc, _ in results]
+
+    def test_merge_copies_without_embedding_and_dedups(cls):
+        for i in range(3):
+            cls.write(f"a/module_{i}.py", f"def a_{i}():\n    return {i}\n")
+            cls.write(f"b/module_{i}.py", f"def b_{i}():\n    return {i}\n")
+        cls.write("a/shared.py", "SHARED = 1\n")
+        cls.write("b/lib/shared.py", "SHARED = 1\n")
+        root = os.path.join(cls.dir, "sources")
+        a = cls.client("a").build("a", root=os.path.join(root, "a"))
+        cls.client("b").build("b", root=os.path.join(root, "b"), sharded=True)
+        FakeIndexClient.embedder.texts = []
+
+        client = cls.client("combined")
+        store = client.merge([("a", "v1"), ("b", "v1")])
+        cls.assertEqual(FakeIndexClient.embedder.texts, [])
+        cls.assertEqual(store.index.ntotal, 7)
+        cls.assertEqual(sorted(cls.texts(store)).count("SHARED = 1"), 1)
+        cls.assertEqual(len(set(store.index_to_docstore_id.values())), 7)
+        log = ChunkLog(client.name_version_path)
+        cls.assertEqual(
+            [record["id"] for record in log],
+            [store.index_to_docstore_id[i] for i in range(7)],
+        )
+        cls.assertEqual(
+            log.get(a.index_to_docstore_id[0])["path"],
+            os.path.join(root, "a", "module_0.py"),
+        )
+
+        store = client.merge([("a", "v1"), ("b", "v1")], dedup=False)
+        cls.assertEqual(store.index.ntotal, 8)
+
+    def test_merge_keeps_chunks_with_positional_ids(cls):
+        sources = []
+        for name, texts in [("a", ["one", "two", "three"]), ("b", ["four", "one"])]:
+            path = os.path.join(cls.dir, name)
+            store = FAISS.from_texts(
+                texts, DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+            )
+            store.save_local(path)
+            # Converted stores number their chunks 0..n-1.
+            write_docstore(path, store.docstore, store.index_to_docstore_id)
+            sources.append(path)
+
+        dest = os.path.join(cls.dir, "merged")
+        stats = merge_indexes(sources, dest, "Flat", dedup=False)
+        cls.assertEqual(stats, {"chunks": 5, "duplicates": 0})
+        docstore, _ = load_docstore(dest)
+        cls.assertEqual(len(set(docstore.ids.tolist())), 5)
+        cls.assertEqual(
+            [docstore.document(row).page_content for row in range(5)],
+            ["one", "two", "three", "four", "one"],
+        )
+
+        stats = merge_indexes(sources, dest, "Flat", dedup=True)
+        cls.assertEqual(stats, {"chunks": 4, "duplicates": 1})
+
+    def test_compact_after_incremental_deletes(cls):
+        for i in range(4):
+            cls.write(f"repo/module_{i}.py", f"def function_{i}():\n    return {i}\n")
+        client = cls.client("repo")
+        root = os.path.join(cls.dir, "sources", "repo")
+        client.build("repo", root=root, incremental=True)
+        for version in range(3):
+            cls.write("repo/module_0.py", f"def changed():\n    return {version}\n")
+            store = client.build("repo", root=root, incremental=True)
+        os.remove(os.path.join(root, "module_1.py"))
+        store = client.build("repo", root=root, incremental=True)
+        cls.assertEqual(len(ChunkLog(client.name_version_path)), 7)
+
+        expected = cls.texts(store)
+        FakeIndexClient.embedder.texts = []
+        compacted = client.compact()
+        cls.assertEqual(FakeIndexClient.embedder.texts, [])
+        cls.assertEqual(compacted.index.ntotal, 3)
+        cls.assertEqual(cls.texts(compacted), expected)
+        log = ChunkLog(client.name_version_path)
+        cls.assertEqual(len(log), 3)
+        _id = compacted.index_to_docstore_id[0]
+        cls.assertEqual(
+            log.get(_id)["text"], compacted.docstore.search(_id).page_content
+        )
+
+        cls.assertTrue(Manifest.load(client.name_version_path).files)
+        cls.write("repo/module_2.py", "def again():\n    return 2\n")
+        store = client.build("repo", root=root, incremental=True)
+        cls.assertEqual(store.index.ntotal, 3)
+        cls.assertEqual(FakeIndexClient.embedder.texts, ["def again():\n    return 2"])
+
+    def test_compact_to_hnsw_then_incremental(cls):
+        for i in range(4):
+            cls.write(f"repo/module_{i}.py", f"def function_{i}():\n    return {i}\n")
+        client = cls.client("repo")
+        root = os.path.join(cls.dir, "sources", "repo")
+        client.build("repo", root=root, incremental=True)
+        client.compact(spec="HNSW16")
+        cls.assertFalse(Manifest.load(client.name_version_path).files)
+
+        FakeIndexClient.embedder.texts = []
+        cls.write("repo/module_2.py", "def again():\n    return 2\n")
+        store = client.build("repo", root=root, incremental=True)
+        cls.assertEqual(store.index.ntotal, 4)
+        cls.assertEqual(len(FakeIndexClient.embedder.texts), 4)
+        cls.assertIn("def again():\n    return 2", cls.texts(store))
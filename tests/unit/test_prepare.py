@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+from typing import List
+
+from testing_config import BaseTestConfig
+
+from langchain_core.documents import Document
+from langchain_text_splitters import Language
+
+from athenah_ai.indexer.base_index_client import Chunk
+from athenah_ai.indexer.index_client import IndexClient
+from athenah_ai.indexer.splitters import code_splitter
+
+
+class TextIndexClient(IndexClient):
+    @staticmethod
+    def load_file(path: str, kind: str = None) -> List[Document]:
+        with open(path) as file:
+            return [Document(page_content=file.read(), metadata={"source": path})]
+
+
+class TestPrepare(BaseTestConfig):
+    def setUp(cls):
+        cls.dir = tempfile.mkdtemp()
+        root = os.path.join(cls.dir, "repo")
+        for i in range(12):
+            ext = ["cpp", "py", "md"][i % 3]
+            path = os.path.join(root, f"dir_{i % 4}", f"file_{i}.{ext}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(
+                    "\n\n".join(f"int value_{i}_{j} = {j};" * 40 for j in range(8))
+                )
+
+    def tearDown(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+
+    def prepare(cls, workers: int) -> List[Chunk]:
+        client = TextIndexClient("local", "id", cls.dir, "repo", "v1", workers=workers)
+        return client.prepare(client.name_path)
+
+    def test_parallel_matches_serial(cls):
+        serial = cls.prepare(1)
+        cls.assertGreater(len(serial), 12)
+        cls.assertEqual(cls.prepare(3), serial)
+        cls.assertEqual(serial[0][1]["source"], "dir_0/file_0.cpp")
+
+    def test_splitters_are_cached(cls):
+        cls.assertIs(
+            code_splitter(Language.CPP, chunk_size=2000, chunk_overlap=0),
+            code_splitter(Language.CPP, chunk_size=2000, chunk_overlap=0),
+        )
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+from unittest import mock
+
+from google.api_core.exceptions import NotFound
+
+import athenah_ai.client.vector_store as vector_store_module
+from athenah_ai.client.remote_cache import get_remote_cache
+from athenah_ai.client.store_cache import StoreCache
+from tests.fakes.gcs import FakeBucket
+from tests.fakes.index import FakeIndexClient, FakeVectorStore, IndexTestConfig
+
+
+class TestRemoteCache(IndexTestConfig):
+    def setUp(cls):
+        super().setUp()
+        cls.bucket = FakeBucket()
+        cls.root = os.path.join(cls.dir, "repo")
+        os.makedirs(cls.root)
+        for i in range(3):
+            cls.write(f"module_{i}.py", f"def function_{i}():\n    return {i}\n")
+
+    def write(cls, name: str, text: str) -> None:
+        with open(os.path.join(cls.root, name), "w") as file:
+            file.write(text)
+
+    def build(cls, version: str = "v1"):
+        client = FakeIndexClient("local", "id", cls.dir, "repo", version, workers=1)
+        client.storage_type = "gcs"
+        client.bucket = cls.bucket
+        return client.build("repo", root=cls.root)
+
+    def store(cls) -> FakeVectorStore:
+        store = FakeVectorStore("gcs")
+        store.bucket = cls.bucket
+        store.store_cache = StoreCache()
+        return store
+
+    def test_revalidates_and_downloads_only_changed_objects(cls):
+        cls.build()
+        store = cls.store()
+        cache = get_remote_cache(os.path.join(cls.dir, "dist"))
+        cache.ttl = 0
+        with mock.patch.object(vector_store_module, "basedir", cls.dir):
+            first = store.load("repo")
+            cls.assertGreater(cls.bucket.requests["download"], 0)
+
+            cls.bucket.requests.clear()
+            cls.assertIs(store.load("repo"), first)
+            cls.assertEqual(dict(cls.bucket.requests), {"list": 1})
+
+            # A new generation with the same content is not downloaded.
+            data = cls.bucket.read("repo/v1/index.faiss")
+            cls.bucket.blob("repo/v1/index.faiss").upload_from_string(data)
+            cls.bucket.requests.clear()
+            cls.assertIs(store.load("repo"), first)
+            cls.assertEqual(cls.bucket.requests["download"], 0)
+
+            # A changed object is the only download.
+            data = cls.bucket.read("repo/v1/index.params.json")
+            cls.bucket.blob("repo/v1/index.params.json").upload_from_string(
+                data + b"\n"
+            )
+            cls.bucket.requests.clear()
+            cls.assertIsNot(store.load("repo"), first)
+            cls.assertEqual(cls.bucket.requests["download"], 1)
+
+            cls.write("module_3.py", "def function_3():\n    return 3\n")
+            cls.build()
+            docs = store.load("repo").similarity_search("function_3", k=4)
+            cls.assertIn("module_3.py", [doc.metadata["source"] for doc in docs])
+
+            cache.ttl = 60
+            cls.bucket.requests.clear()
+            store.load("repo")
+            cls.assertEqual(sum(cls.bucket.requests.values()), 0)
+        cls.assertEqual(cache.stats()["downloads"], 3)
+        cls.assertEqual(cache.stats()["revalidations"], 2)
+        cls.assertEqual(cache.stats()["hits"], 1)
+
+    def test_local_copy_is_used_when_the_bucket_fails(cls):
+        cls.build()
+        get_remote_cache(os.path.join(cls.dir, "dist")).ttl = 0
+        with mock.patch.object(vector_store_module, "basedir", cls.dir):
+            with cls.assertRaises(NotFound):
+                cls.store().load("repo", version="v2")
+            expected = cls.store().load("repo").index.ntotal
+
+            cls.bucket.objects.clear()
+            cls.assertEqual(cls.store().load("repo").index.ntotal, expected)
+            with mock.patch.object(
+                cls.bucket, "list_blobs", side_effect=ConnectionError("offline")
+            ):
+                cls.assertEqual(cls.store().load("repo").index.ntotal, expected)
+
+    def test_evicts_least_recently_used_versions(cls):
+        for version in ["v1", "v2", "v3"]:
+            cls.build(version)
+        dist = os.path.join(cls.dir, "dist")
+        # The indexer's own output is adopted without a download.
+        with mock.patch.object(vector_store_module, "basedir", cls.dir):
+            cls.store().load("repo", dir="", version="v1")
+        cls.assertEqual(cls.bucket.requests["download"], 0)
+
+        cache = get_remote_cache(dist)
+        with mock.patch.object(vector_store_module, "basedir", cls.dir):
+            cls.store().load("repo", version="v1")
+            size = sum(
+                os.path.getsize(os.path.join(path, name))
+                for path, _, files in os.walk(os.path.join(dist, "repo-v1"))
+                for name in files
+            )
+            cache.max_bytes = size * 2
+            cls.store().load("repo", version="v2")
+            cls.store().load("repo", version="v1")
+            cls.store().load("repo", version="v3")
+        cls.assertEqual(sorted(os.listdir(dist)), [".remote", "repo-v1", "repo-v3"])
+        cls.assertEqual(cache.stats()["evictions"], 1)
+        cls.assertTrue(os.path.exists(os.path.join(cls.dir, "repo-v2")))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from testing_config import BaseTestConfig
+
+from langchain_core.documents import Document
+
+from athenah_ai.indexer import scanner as scanner_module
+from athenah_ai.indexer.base_index_client import split_document
+from athenah_ai.indexer.index_client import IndexClient
+from athenah_ai.indexer.scanner import FILE_DOCUMENT, FILE_TEXT, FileScanner
+
+
+class TestScanner(BaseTestConfig):
+    def setUp(cls):
+        cls.dir = tempfile.mkdtemp()
+        cls.root = os.path.join(cls.dir, "repo")
+        cls.files = {
+            "src/main.cpp": "int main() { return 0; }\n",
+            "src/config.json": '{"key": "value"}\n',
+            "docs/page.html": "<html><body><p>Page</p></body></html>\n",
+            "LICENSE": "Permission is hereby granted, free of charge.\n",
+        }
+        for name, content in cls.files.items():
+            path = os.path.join(cls.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(content)
+
+    def tearDown(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+
+    def path(cls, name: str) -> str:
+        return os.path.join(cls.root, name)
+
+    def test_clean_classifies_without_renaming(cls):
+        client = IndexClient("local", "id", cls.dir, "repo", "v1")
+        with mock.patch.object(
+            scanner_module, "detect_filetype", wraps=scanner_module.detect_filetype
+        ) as detect:
+            kinds = client.clean(client.name_path)
+        cls.assertEqual(detect.call_count, 1)
+        cls.assertEqual(
+            kinds,
+            {
+                cls.path("LICENSE"): FILE_TEXT,
+                cls.path("docs/page.html"): FILE_DOCUMENT,
+                cls.path("src/config.json"): FILE_TEXT,
+                cls.path("src/main.cpp"): FILE_TEXT,
+            },
+        )
+        for name in cls.files:
+            cls.assertTrue(os.path.exists(cls.path(name)))
+        cls.assertEqual(client.file_kinds, kinds)
+
+    def test_cache_is_keyed_by_mtime_and_size(cls):
+        client = IndexClient("local", "id", cls.dir, "repo", "v1")
+        client.clean(client.name_path)
+
+        scanner = FileScanner.load(client.name_version_path)
+        with mock.patch.object(scanner_module, "detect_filetype") as detect:
+            scanner.scan(client.walk_files(client.name_path), client.name_path)
+        detect.assert_not_called()
+        cls.assertEqual(scanner.hits, 4)
+
+        with open(cls.path("LICENSE"), "a") as file:
+            file.write("Changed.\n")
+        os.remove(cls.path("src/config.json"))
+        scanner = FileScanner.load(client.name_version_path)
+        kinds = scanner.scan(client.walk_files(client.name_path), client.name_path)
+        cls.assertEqual((scanner.hits, scanner.sniffed), (2, 1))
+        cls.assertEqual(sorted(scanner.files), sorted(kinds))
+
+    def test_source_keeps_its_name(cls):
+        doc = Document(page_content="print('x')", metadata={"source": "text.py"})
+        cls.assertEqual(split_document(doc)[0][1]["source"], "text.py")
+        cls.assertEqual(split_document(doc)[0][1]["file_type"], "py")
+        doc = Document(page_content="<p>x</p>", metadata={"source": "index.html"})
+        cls.assertEqual(split_document(doc)[0][1]["file_type"], "text")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+from typing import List
+from unittest import mock
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+import athenah_ai.client as client_module
+from athenah_ai.client import AthenahClient
+from athenah_ai.client.vector_store import (
+    SHARDS_FILE,
+    ShardedStore,
+    read_shards,
+    search_by_vectors,
+)
+from athenah_ai.indexer.shards import ROOT_SHARD, plan_shards
+from tests.fakes.index import (
+    EMBEDDING_SIZE,
+    FakeIndexClient,
+    FakeVectorStore,
+    IndexTestConfig,
+)
+from tests.fakes.openai_server import FakeOpenAIServer
+from tests.fakes.tokenizer import use_fake_tiktoken
+
+
+class TestShardedIndex(IndexTestConfig):
+    def setUp(cls):
+        super().setUp()
+        cls.root = os.path.join(cls.dir, "repo")
+        for folder in ["api", "core", "web"]:
+            for i in range(3):
+                cls.write(
+                    f"{folder}/module_{i}.py", f"def {folder}_{i}():\n    return {i}\n"
+                )
+        cls.write("setup.py", "setup(name='repo')\n")
+
+    def write(cls, name: str, content: str):
+        path = os.path.join(cls.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(content)
+
+    def client(cls, name: str = "repo", workers: int = 2) -> FakeIndexClient:
+        return FakeIndexClient("local", "id", cls.dir, name, "v1", workers=workers)
+
+    def queries(cls) -> List[List[float]]:
+        embedder = DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+        return [embedder.embed_query(f"query {i}") for i in range(5)]
+
+    def test_plan_shards(cls):
+        files = list(cls.client().walk_files(cls.root))
+        shards = plan_shards(files, cls.root, 0, 2000)
+        cls.assertEqual(sorted(shards), [ROOT_SHARD, "api", "core", "web"])
+        cls.assertEqual(len(shards["api"]), 3)
+        shards = plan_shards(files, cls.root, 4, 2000)
+        cls.assertEqual(list(shards), ["shard-00000", "shard-00001", "shard-00002"])
+        cls.assertEqual(sum(map(len, shards.values())), len(files))
+
+    def test_sharded_search_matches_single_store(cls):
+        single = cls.client("single").build("repo", root=cls.root)
+        client = cls.client()
+        store = client.build("repo", root=cls.root, sharded=True)
+        cls.assertIsInstance(store, ShardedStore)
+        shards = read_shards(client.name_version_path)
+        cls.assertEqual(sorted(shard["name"] for shard in shards), store.names)
+        cls.assertEqual(sum(shard["chunks"] for shard in shards), single.index.ntotal)
+
+        for k in [1, 4, 20]:
+            expected = search_by_vectors(single, cls.queries(), k)
+            results = search_by_vectors(store, cls.queries(), k)
+            cls.assertEqual(
+                [[(doc.page_content, score) for doc, score in r] for r in results],
+                [[(doc.page_content, score) for doc, score in r] for r in expected],
+            )
+        docs = store.as_retriever(search_kwargs={"k": 2}).invoke("api")
+        cls.assertEqual(len(docs), 2)
+
+        store.evict("api")
+        cls.assertNotIn("api", store.shards)
+        cls.assertEqual(len(search_by_vectors(store, cls.queries(), 10)[0]), 10)
+        cls.assertIn("api", store.shards)
+
+        loaded = FakeVectorStore("local").load_local(cls.dir, "repo", "v1")
+        cls.assertIsInstance(loaded, ShardedStore)
+
+    def test_prompt_searches_every_shard(cls):
+        use_fake_tiktoken(cls)
+        single = cls.client("single").build("repo", root=cls.root)
+        store = cls.client().build("repo", root=cls.root, sharded=True)
+        cls.assertEqual(len(store), single.index.ntotal)
+        contexts = []
+        for db in [single, store]:
+            client = AthenahClient("id", model_name="gpt-4")
+            client.db = db
+            with FakeOpenAIServer() as server, mock.patch.multiple(
+                client_module,
+                OPENAI_API_KEY="sk-test",
+                OPENAI_BASE_URL=server.base_url,
+            ):
+                cls.assertEqual(client.prompt("web_2"), "answer: web_2")
+            contexts.append(server.requests[0]["body"]["messages"][0]["content"])
+        cls.assertEqual(contexts[0], contexts[1])
+        cls.assertEqual(sorted(store.shards), store.names)
+
+    def test_incremental_rebuilds_changed_shards(cls):
+        client = cls.client(workers=1)
+        client.build("repo", root=cls.root, sharded=True, incremental=True)
+        shards_path = os.path.join(client.name_version_path, "shards")
+        index_path = os.path.join(shards_path, "api", "index.faiss")
+        saved = os.stat(index_path).st_mtime_ns
+
+        cls.write("core/module_0.py", "def changed():\n    return 0\n")
+        shutil.rmtree(os.path.join(cls.root, "web"))
+        store = client.build("repo", root=cls.root, sharded=True, incremental=True)
+        cls.assertEqual(store.names, [ROOT_SHARD, "api", "core"])
+        cls.assertEqual(sorted(os.listdir(shards_path)), store.names)
+        cls.assertEqual(os.stat(index_path).st_mtime_ns, saved)
+        results = search_by_vectors(store, cls.queries(), 8)[0]
+        texts = [doc.page_content for doc, _ in results]
+        cls.assertIn("def changed():\n    return 0", texts)
+
+        client.build("repo", root=cls.root)
+        path = os.path.join(client.name_version_path, SHARDS_FILE)
+        cls.assertFalse(os.path.exists(path))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from google.auth.credentials import AnonymousCredentials
+from testing_config import BaseTestConfig
+
+from athenah_ai.libs.google.storage import GCPStorageClient, StorageClients
+from tests.fakes.gcs import FakeTransport
+
+
+class TestStorageClients(BaseTestConfig):
+    def setUp(cls):
+        cls.transport = FakeTransport({"repo/v1/index.faiss": b"index"})
+        cls.clients = StorageClients(
+            credentials=AnonymousCredentials(), adapter=cls.transport
+        )
+
+    def test_clients_and_buckets_are_shared_without_round_trips(cls):
+        with mock.patch.object(GCPStorageClient, "clients", cls.clients):
+            first = GCPStorageClient().add_client()
+            second = GCPStorageClient().add_client()
+            bucket = first.init_bucket("indexes")
+            cls.assertIs(first.client, second.client)
+            cls.assertIs(second.init_bucket("indexes"), bucket)
+        cls.assertEqual(sum(cls.transport.requests.values()), 0)
+
+        blob = bucket.get_blob("repo/v1/index.faiss")
+        cls.assertEqual(blob.size, 5)
+        cls.assertIsNone(bucket.get_blob("repo/v1/missing"))
+        # Newer clients also fetch bucket metadata once in the background.
+        requests = cls.transport.requests.items()
+        objects = {key: count for key, count in requests if "/o/" in key[1]}
+        cls.assertEqual(
+            objects,
+            {
+                ("GET", "/storage/v1/b/indexes/o/repo%2Fv1%2Findex.faiss"): 1,
+                ("GET", "/storage/v1/b/indexes/o/repo%2Fv1%2Fmissing"): 1,
+            },
+        )
+
+    def test_one_client_is_created_across_threads(cls):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: cls.clients.client(), range(32)))
+        cls.assertEqual(len({id(client) for client in clients}), 1)
+        cls.assertIs(clients[0]._http, cls.clients.session)
+
+    def test_session_pool_size_is_configurable(cls):
+        clients = StorageClients(pool_size=4, credentials=AnonymousCredentials())
+        adapter = clients.client()._http.get_adapter("https://storage.googleapis.com")
+        cls.assertEqual(adapter._pool_maxsize, 4)
+        cls.assertEqual(adapter._pool_connections, 4)
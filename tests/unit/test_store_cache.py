@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+from athenah_ai.client.store_cache import StoreCache
+from tests.fakes.index import EMBEDDING_SIZE, FakeVectorStore, IndexTestConfig
+
+
+class CachedVectorStore(FakeVectorStore):
+    store_cache: StoreCache = StoreCache()
+
+
+class TestStoreCache(IndexTestConfig):
+    def setUp(cls):
+        super().setUp()
+        cls.path = os.path.join(cls.dir, "test_store_cache-v1")
+        cls.texts = ["alpha", "beta", "gamma"]
+        FAISS.from_texts(
+            cls.texts, DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+        ).save_local(cls.path)
+
+    def test_load_shared_across_clients(cls):
+        cache = StoreCache()
+        CachedVectorStore.store_cache = cache
+        first = CachedVectorStore("local").load("test_store_cache", cls.dir, "v1")
+        second = CachedVectorStore("local").load("test_store_cache", cls.dir, "v1")
+        cls.assertIs(first, second)
+        cls.assertEqual(cache.stats()["hits"], 1)
+        cls.assertEqual(cache.stats()["misses"], 1)
+
+    def test_invalidated_when_files_change(cls):
+        cache = StoreCache()
+        CachedVectorStore.store_cache = cache
+        first = CachedVectorStore("local").load("test_store_cache", cls.dir, "v1")
+        store = FAISS.from_texts(cls.texts[:2], DeterministicFakeEmbedding(size=8))
+        store.save_local(cls.path)
+        second = CachedVectorStore("local").load("test_store_cache", cls.dir, "v1")
+        cls.assertIsNot(first, second)
+        cls.assertEqual(len(second.index_to_docstore_id), 2)
+        cls.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_lru_eviction_under_budget(cls):
+        cache = StoreCache(max_bytes=100)
+        cache.put("a", object(), cls.path, nbytes=40)
+        cache.put("b", object(), cls.path, nbytes=40)
+        cache.get("a")
+        cache.put("c", object(), cls.path, nbytes=40)
+        cls.assertIsNotNone(cache.get("a"))
+        cls.assertIsNone(cache.get("b"))
+        cls.assertEqual(cache.stats()["evictions"], 1)
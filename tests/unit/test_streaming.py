@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import asyncio
+import time
+from unittest import mock
+
+from testing_config import BaseTestConfig
+
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+import athenah_ai.client as client_module
+from athenah_ai.client import AthenahClient
+from athenah_ai.client.pool import close_async_pool
+from tests.fakes.openai_server import FakeOpenAIServer
+from tests.fakes.tokenizer import use_fake_tiktoken
+
+
+class TestStreaming(BaseTestConfig):
+    prompt = "what does isNewerVersion return for two equal versions?"
+
+    def setUp(cls):
+        use_fake_tiktoken(cls)
+        cls.server = FakeOpenAIServer(token_delay=0.05).__enter__()
+        cls.patches = mock.patch.multiple(
+            client_module, OPENAI_API_KEY="sk-test", OPENAI_BASE_URL=cls.server.base_url
+        )
+        cls.patches.start()
+        cls.client = AthenahClient("id", model_name="gpt-4")
+        cls.client.db = FAISS.from_texts(
+            ["isNewerVersion compares two versions"], DeterministicFakeEmbedding(size=8)
+        )
+
+    def tearDown(cls):
+        cls.patches.stop()
+        cls.server.__exit__()
+
+    def test_stream_base_prompt(cls):
+        start = time.perf_counter()
+        pieces = []
+        for piece in cls.client.stream_base_prompt("system", cls.prompt):
+            if not pieces:
+                first = time.perf_counter() - start
+            pieces.append(piece)
+        total = time.perf_counter() - start
+        cls.assertGreater(len(pieces), 1)
+        cls.assertEqual("".join(pieces), f"answer: {cls.prompt}")
+        cls.assertLess(first, total / 2)
+        body = cls.server.requests[0]["body"]
+        cls.assertEqual((body["stream"], body["n"]), (True, 1))
+
+    def test_base_prompt_single_completion(cls):
+        cls.client.base_prompt("system", "hello")
+        cls.client.base_prompt("system", "hello", n=1)
+        cls.assertEqual([r["body"]["n"] for r in cls.server.requests], [3, 1])
+
+    def test_stream_prompt(cls):
+        pieces = list(cls.client.stream_prompt(cls.prompt))
+        cls.assertGreater(len(pieces), 1)
+        cls.assertEqual("".join(pieces), f"answer: {cls.prompt}")
+        cls.assertEqual(cls.server.requests[0]["body"]["n"], 1)
+
+    def test_astream_prompt(cls):
+        async def collect():
+            try:
+                return [piece async for piece in cls.client.astream_prompt(cls.prompt)]
+            finally:
+                await close_async_pool()
+
+        pieces = asyncio.run(collect())
+        cls.assertGreater(len(pieces), 1)
+        cls.assertEqual("".join(pieces), f"answer: {cls.prompt}")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+import time
+from typing import List
+from unittest import mock
+
+from testing_config import BaseTestConfig
+
+from langchain_core.documents import Document
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+import athenah_ai.indexer.base_index_client as base_index_client
+from athenah_ai.indexer.base_index_client import BaseIndexClient
+from athenah_ai.indexer.index_client import IndexClient
+
+
+batches: List[int] = []
+loaded_at_batch: List[int] = []
+
+
+class SlowEmbedding(DeterministicFakeEmbedding):
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches.append(len(texts))
+        loaded_at_batch.append(len(StreamingIndexClient.loaded))
+        time.sleep(0.02)
+        return super().embed_documents(texts)
+
+
+class StreamingIndexClient(IndexClient):
+    loaded: List[str] = []
+    embedder = SlowEmbedding(size=8)
+
+    def get_embedder(cls):
+        return cls.embedder
+
+    @staticmethod
+    def load_file(path: str, kind: str = None) -> List[Document]:
+        StreamingIndexClient.loaded.append(path)
+        with open(path) as file:
+            return [Document(page_content=file.read(), metadata={"source": path})]
+
+
+class TestStreamingBuild(BaseTestConfig):
+    def setUp(cls):
+        cls.dir = tempfile.mkdtemp()
+        for i in range(40):
+            path = os.path.join(cls.dir, "repo", f"pkg_{i % 3}", f"module_{i}.py")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(f"def function_{i}():\n    return {i}\n")
+        StreamingIndexClient.loaded = []
+        batches.clear()
+        loaded_at_batch.clear()
+
+    def tearDown(cls):
+        shutil.rmtree(cls.dir, ignore_errors=True)
+
+    def test_streams_bounded_batches(cls):
+        client = StreamingIndexClient("local", "id", cls.dir, "repo", "v1", workers=1)
+        with mock.patch.multiple(
+            base_index_client, EMBED_BATCH_SIZE=4, PIPELINE_DEPTH=2
+        ):
+            store = client.build("repo")
+        cls.assertEqual(batches, [4] * 10)
+        # At most PIPELINE_DEPTH queued batches, one being built and one being
+        # embedded are ever split ahead of the embedder.
+        for batch, loaded in enumerate(loaded_at_batch):
+            cls.assertLessEqual(loaded - batch * 4, (2 + 2) * 4)
+        cls.assertEqual(store.index.ntotal, 40)
+        doc = store.similarity_search("def function_7():\n    return 7", k=1)[0]
+        cls.assertEqual(doc.metadata["source"], "pkg_1/module_7.py")
+        cls.assertFalse(any(name.startswith(".store-") for name in os.listdir(
+            client.name_version_path
+        )))
+
+    def test_no_shared_chunk_lists(cls):
+        cls.assertFalse(hasattr(BaseIndexClient, "splited_docs"))
+        cls.assertFalse(hasattr(BaseIndexClient, "splited_metadatas"))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from testing_config import BaseTestConfig
+
+from athenah_ai.client.tokenizer import (
+    count_tokens,
+    count_tokens_batch,
+    get_encoding,
+    PARALLEL_BATCH_SIZE,
+)
+from athenah_ai.labeler import count_file_tokens
+from tests.fakes.tokenizer import use_fake_tiktoken
+
+
+class TestTokenizer(BaseTestConfig):
+    model: str = "gpt-4"
+    texts = [
+        f"bool isNewerVersion(std::uint64_t v{i}) {{ return ü; }}" for i in range(3)
+    ]
+
+    def setUp(cls):
+        use_fake_tiktoken(cls)
+
+    def test_encoding_cached_per_model(cls):
+        cls.assertIs(get_encoding(cls.model), get_encoding(cls.model))
+
+    def test_batch_matches_single_counts(cls):
+        texts = cls.texts * PARALLEL_BATCH_SIZE
+        expected = [count_tokens(text, cls.model) for text in texts]
+        cls.assertEqual(count_tokens_batch(texts, cls.model), expected)
+        cls.assertEqual(count_tokens_batch(texts, cls.model, num_threads=1), expected)
+
+    def test_estimate_is_upper_bound(cls):
+        exact = count_tokens_batch(cls.texts, cls.model)
+        estimate = count_tokens_batch(cls.texts, cls.model, estimate=True)
+        for upper, total in zip(estimate, exact):
+            cls.assertGreaterEqual(upper, total)
+
+    def test_file_tokens_exact_only_over_limit(cls):
+        big = "isNewerVersion " * 10000
+        totals = count_file_tokens([cls.texts[0], big], cls.model)
+        cls.assertEqual(totals[0], len(cls.texts[0].encode("utf-8")))
+        cls.assertEqual(totals[1], count_tokens(big, cls.model))